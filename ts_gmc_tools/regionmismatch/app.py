@@ -1,31 +1,48 @@
+import os
 import sys
 import time
 import json
 import queue
 import threading
 import subprocess
-import shutil
-import base64
 import datetime
+import urllib.request
+import urllib.error
+from collections import deque
 from pathlib import Path
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List
 import streamlit as st
 import pandas as pd
-from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 import re
+import events
 import scheduler
+import results_store
+import metrics
+import comparison
+import feed_ingest
 
 @st.cache_resource
-def run_once():
-    scheduler.cleanup_old_folders()
+def retention_service():
+    # [수정] 1회 정리 대신 백그라운드 정리 서비스 (나이/용량 상한, retention_config.json)
+    return scheduler.RetentionService().start()
 
-run_once()
+retention = retention_service()
 
 st.set_page_config(page_title="GMC Region Mismatch Audit Tool", layout="wide")
 
 HERE = Path(__file__).resolve().parent
 SCRIPT = HERE / "region_mismatch.py"
 TRANS_FILE = HERE / "translations.json"
+# 상주 워커 (worker.py) 주소. 응답이 없으면 기존처럼 subprocess 로 실행
+WORKER_URL = os.environ.get("GMC_WORKER_URL", "http://127.0.0.1:8765")
+# [수정] 긴 배치 실행에서도 rerun 비용/메모리가 일정하도록: 로그는 최근 LOG_TAIL 줄만 메모리에 (전체는 app_logs/ 파일)
+# 실행 중에는 최근 LIVE_REGIONS 개 리전만 전체 렌더링 (schema 포함, deque), 완료 후에는 REGIONS_PAGE 개씩 페이지로
+# 전체 리전은 schema 없는 block(경로/상태)만 보관, 페이지에 보이는 리전의 schema 는 results.db 에서 조회
+LOG_DIR = HERE / "app_logs"
+LOG_TAIL = 500
+LOG_KEEP = 20
+LIVE_REGIONS = 8
+REGIONS_PAGE = 20
 
 # =========================================================
 # 1. Session State Initialization
@@ -34,20 +51,29 @@ if "running" not in st.session_state:
     st.session_state.running = False
     st.session_state.proc = None
     st.session_state.log_q = None
-    st.session_state.lines = []
-    st.session_state.realtime_results = []
+    st.session_state.ev_q = None
+    st.session_state.ev_srv = None
+    st.session_state.lines = deque(maxlen=LOG_TAIL)
+    st.session_state.log_path = None
+    st.session_state.realtime_results = deque(maxlen=LIVE_REGIONS)
+    st.session_state.region_blocks = []
     st.session_state.target_product_id = ""
     st.session_state.target_url = ""
     st.session_state.status_text = ""
     st.session_state.progress_val = 0.0
     st.session_state.progress_label = ""
-    st.session_state.analysis_df = None
+    st.session_state.comparison = None
     st.session_state.saved_blob = ""
     st.session_state.report_path = None
     st.session_state.schema_dir = None
+    st.session_state.run_ts = None
+    st.session_state.db_path = None
+    st.session_state.metrics_path = None
     st.session_state.returncode = None
     st.session_state.started_at = None
     st.session_state.final_duration = None
+    st.session_state.queue_info = None
+    st.session_state.replay_truncated = False
 
 # =========================================================
 # 2. CSS Styling
@@ -71,19 +97,35 @@ st.markdown("""
     """, unsafe_allow_html=True)
 
 # --- Helpers ---
-def parse_report_paths(stdout_text: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
-    report_path = images_dir = schema_dir = None
-    for line in (stdout_text or "").splitlines():
-        s = line.strip()
-        if s.startswith("- Report:"): report_path = s.split(":", 1)[1].strip()
-        elif s.startswith("- Images:"): images_dir = s.split(":", 1)[1].strip()
-        elif s.startswith("- Schema:"): schema_dir = s.split(":", 1)[1].strip()
-    return report_path, images_dir, schema_dir
 
 def safe_read_json(path: Path) -> Optional[Any]:
     try: return json.loads(path.read_text(encoding="utf-8"))
     except: return None
 
+def mtime_of(path: Path) -> Optional[float]:
+    try: return path.stat().st_mtime
+    except OSError: return None
+
+# [수정] rerun 마다 디스크를 다시 읽지 않도록 (경로, mtime) 키로 캐시 (파일이 바뀌면 mtime 이 달라져 다시 읽음)
+@st.cache_data(max_entries=512, show_spinner=False)
+def read_json_cached(path: str, mtime: float) -> Optional[Any]:
+    return safe_read_json(Path(path))
+
+@st.cache_data(max_entries=2 * (LIVE_REGIONS + REGIONS_PAGE), show_spinner=False)
+def read_image_cached(path: str, mtime: float) -> bytes:
+    return Path(path).read_bytes()
+
+@st.cache_data(ttl=60, show_spinner=False)
+def recent_metrics(outs_dir: str, limit: int) -> List[Dict]:
+    return metrics.load_recent(Path(outs_dir), limit=limit)
+
+def new_log_path() -> Path:
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    for old in sorted(LOG_DIR.glob("app_*.log"))[:-LOG_KEEP + 1]:
+        try: old.unlink()
+        except OSError: pass
+    return LOG_DIR / f"app_{datetime.datetime.now():%Y%m%d_%H%M%S_%f}.log"
+
 def clean_currency(val):
     if not val: return ""
     return re.sub(r'[^\d.,]', '', str(val)).strip()
@@ -111,21 +153,6 @@ def generate_standalone_html(df, groups, target_url, target_pid):
     html.append("</body></html>")
     return "\n".join(html)
 
-def translate_status_with_format(text, market):
-    if not text: return ""
-    trans_map = {}
-    if TRANS_FILE.exists():
-        try: trans_map = json.loads(TRANS_FILE.read_text(encoding="utf-8"))
-        except: pass
-    text_clean = " ".join(text.split()).lower()
-    found = None
-    for k, v in trans_map.get("market_map", {}).get(market, {}).items():
-        if k in text_clean: found = v; break
-    if not found:
-        for k, v in trans_map.get("global_map", {}).items():
-            if k in text_clean: found = v; break
-    return f"{found} ({text})" if found else text
-
 def normalize_gmc_status(val):
     v = val.lower().strip()
     if "in" in v and "stock" in v and "out" not in v: return "InStock"
@@ -133,68 +160,195 @@ def normalize_gmc_status(val):
     if "pre" in v: return "PreOrder"
     return val
 
-def run_post_audit_internal(schema_dir_str, mode, default_gmc, regional_text):
-    schema_dir = Path(schema_dir_str)
-    if not schema_dir.exists(): return
+def parse_regional_inventory(regional_text) -> Dict[str, str]:
     regional_map = {}
-    if regional_text:
-        lines = [l.strip() for l in regional_text.replace("\t", "\n").splitlines() if l.strip()]
-        cur_key = None
-        for line in lines:
-            if any(x in line for x in ["KST", "GMT", "AM", "PM"]) or ":" in line: continue
-            if any(k in line.lower() for k in ["in stock", "out of stock", "instock", "outofstock", "limited", "preorder"]):
-                if cur_key: regional_map[cur_key] = normalize_gmc_status(line); cur_key = None
-            else: cur_key = line
-    rows = []
-    # [수정] 밀리초 폴더 대응을 위한 와일드카드 유지
-    for f in sorted(schema_dir.glob("*__schema_*.json")):
+    if not regional_text: return regional_map
+    lines = [l.strip() for l in regional_text.replace("\t", "\n").splitlines() if l.strip()]
+    cur_key = None
+    for line in lines:
+        if any(x in line for x in ["KST", "GMT", "AM", "PM"]) or ":" in line: continue
+        if any(k in line.lower() for k in ["in stock", "out of stock", "instock", "outofstock", "limited", "preorder"]):
+            if cur_key: regional_map[cur_key] = normalize_gmc_status(line); cur_key = None
+        else: cur_key = line
+    return regional_map
+
+def load_run_into_comparison(db_path, run_ts):
+    # [수정] 실행 중에는 region_result 이벤트로 비교표가 채워짐. 이벤트를 못 받은 실행(새로고침 등)만 results.db 에서 조회
+    # 진행 중인 감사에 늦게 합류해 재생 기록이 잘린 경우에도 빠진 리전이 있으므로 다시 조회
+    if not db_path or not run_ts or not Path(db_path).exists(): return
+    if st.session_state.comparison is None: st.session_state.comparison = comparison.ComparisonTable(TRANS_FILE)
+    if st.session_state.get("replay_truncated") or not st.session_state.comparison.has_run(run_ts):
+        st.session_state.comparison.add_rows(results_store.ResultsStore(Path(db_path)).run_results(run_ts))
+        st.session_state.replay_truncated = False
+
+def refresh_expected(table, db_path):
+    # GMC 피드 기대값 (feed_ingest.py) 은 비교표에 새 제품이 들어왔을 때만 다시 조회
+    pids = set(table.product_ids())
+    if pids and pids != st.session_state.get("expected_pids"):
+        table.set_expected(results_store.ResultsStore(Path(db_path or HERE / "outs" / results_store.DB_NAME)).expected_for(list(pids)))
+        st.session_state.expected_pids = pids
+
+class WorkerBusy(Exception):
+    pass
+
+class WorkerJob:
+    """worker.py job 을 subprocess.Popen 과 같은 모양(stdout/poll/terminate)으로 감쌈"""
+    def __init__(self, resp):
+        self.resp, self.job_id, self.subscriber, self.returncode = resp, None, None, None
+        self.stdout = self._iter_lines()
+
+    def _iter_lines(self):
         try:
-            rid = f.name.split("__")[0].replace("region_", ""); rid = "" if rid == "default" else rid
-            sd = safe_read_json(f); off = sd.get("offers", {})
-            if isinstance(off, list): off = off[0] if off else {}
-            s_p, s_a = clean_currency(off.get("price", "")), off.get("availability", "").replace("https://schema.org/", "")
-            scrape_f = f.parent / f.name.replace("__schema_", "__scrape_")
-            vis = safe_read_json(scrape_f) if scrape_f.exists() else {}
-            gmc_v = regional_map.get(rid, normalize_gmc_status(default_gmc)) if rid else normalize_gmc_status(default_gmc)
-            row = {"Region": rid if rid else "Default", "GMC": gmc_v, "Schema": s_a if mode == "Availability" else s_p}
-            if mode == "Availability":
-                fmt = translate_status_with_format(vis.get("buy_button_text", ""), urlparse(st.session_state.target_url).path.split("/")[1])
-                row["Visual_Standard"], row["Visual_Full"] = (fmt.split('(')[0].strip() if '(' in fmt else fmt), fmt
-            else: row["Visual_Price"] = vis.get("visual_price", "")
-            rows.append(row)
-        except: continue
-    st.session_state.analysis_df = pd.DataFrame(rows)
-
-def start_process(cmd):
-    q = queue.Queue()
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding="utf-8", errors="replace", cwd=str(HERE), bufsize=1)
+            for raw in self.resp:
+                line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+                if line.startswith("[JOB] "):
+                    info = json.loads(line[6:])
+                    self.job_id, self.subscriber = info.get("id"), info.get("subscriber")
+                    continue
+                if line.startswith("[JOB_END] "): self.returncode = json.loads(line[10:]).get("returncode", 1); continue
+                yield line
+        finally:
+            self.resp.close()
+            if self.returncode is None: self.returncode = 1
+
+    def poll(self): return self.returncode
+
+    def terminate(self):
+        # 같은 감사에 합류한 다른 세션이 있으면 이 세션만 구독 해제 (job 은 계속)
+        if not self.job_id: return
+        body = json.dumps({"subscriber": self.subscriber}).encode("utf-8")
+        try: urllib.request.urlopen(urllib.request.Request(f"{WORKER_URL}/jobs/{self.job_id}/cancel", data=body, headers={"Content-Type": "application/json"}, method="POST"), timeout=3).close()
+        except Exception: pass
+
+def submit_to_worker(argv, priority: str = "normal") -> Optional[WorkerJob]:
+    # [수정] worker 의 공유 큐로 제출 (동시 실행 상한 / 같은 감사 합류 / 우선순위). 큐가 가득 차면 WorkerBusy
+    try: urllib.request.urlopen(f"{WORKER_URL}/health", timeout=0.5).close()
+    except Exception: return None
+    req = urllib.request.Request(f"{WORKER_URL}/jobs", data=json.dumps({"argv": argv, "priority": priority}).encode("utf-8"), headers={"Content-Type": "application/json"}, method="POST")
+    try: return WorkerJob(urllib.request.urlopen(req))
+    except urllib.error.HTTPError as e:
+        if e.code == 429: raise WorkerBusy(json.loads(e.read() or b"{}").get("detail", "queue full"))
+        return None
+    except Exception: return None
+
+def start_process(argv, priority: str = "normal") -> bool:
+    q, ev_q = queue.Queue(), queue.Queue()
+    # [수정] region_mismatch.py / worker 가 보내는 JSON lines 이벤트 수신 (events.listen)
+    srv = events.listen(ev_q.put, backlog=4)
+    argv = argv + ["--events_addr", events.address(srv)]
+    try: proc = submit_to_worker(argv, priority)
+    except WorkerBusy as e:
+        # 큐가 가득 차면 별도 프로세스로 우회하지 않음 (동시 실행 상한 유지)
+        srv.close()
+        st.error(f"Audit queue is full, try again later ({e})")
+        return False
+    if proc is None:
+        proc = subprocess.Popen([sys.executable, str(SCRIPT)] + argv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding="utf-8", errors="replace", cwd=str(HERE), bufsize=1)
+    log_path = new_log_path()
     def reader():
+        # 전체 로그는 파일로, 화면에는 drain_logs 가 최근 LOG_TAIL 줄만 유지
         try:
-            for line in proc.stdout: q.put(line.rstrip("\n"))
-        finally: proc.stdout.close()
+            with open(log_path, "w", encoding="utf-8") as log_f:
+                for line in proc.stdout:
+                    # subprocess 줄은 개행 포함, worker 스트림 줄은 개행 없음
+                    line = line.rstrip("\n")
+                    log_f.write(line + "\n"); log_f.flush()
+                    q.put(line)
+        finally:
+            proc.stdout.close()
+            ev_q.put({"type": "_eof"})  # 프로세스 종료 시 대기 중인 heartbeat 를 깨움
     threading.Thread(target=reader, daemon=True).start()
-    st.session_state.update({"running": True, "proc": proc, "log_q": q, "lines": [], "started_at": time.time(), "realtime_results": [], "analysis_df": None})
+    st.session_state.update({"running": True, "proc": proc, "log_q": q, "ev_q": ev_q, "ev_srv": srv, "lines": deque(maxlen=LOG_TAIL), "log_path": str(log_path), "started_at": time.time(), "realtime_results": deque(maxlen=LIVE_REGIONS), "region_blocks": [], "comparison": comparison.ComparisonTable(TRANS_FILE),
+                             "progress_val": 0.0, "progress_label": "", "status_text": "", "regions_total": 0, "regions_done": 0, "report_path": None, "images_dir": None, "schema_dir": None, "run_ts": None, "db_path": None, "metrics_path": None, "queue_info": None, "replay_truncated": False})
+    return True
 
 def drain_logs():
+    # stdout 은 사람이 읽는 로그 표시 용도로만 사용 (상태/결과는 drain_events 에서 처리)
     q = st.session_state.get("log_q")
     if not q: return
     while True:
-        try:
-            line = q.get_nowait()
-            if "[PROGRESS]" in line:
-                m = re.search(r"<(\d+)/(\d+)>", line)
-                if m: st.session_state.progress_val, st.session_state.progress_label = int(m.group(1))/int(m.group(2)), f"Region {m.group(1)} of {m.group(2)}"
-                st.session_state.status_text = line.split("]", 1)[-1].strip()
-            elif "[RESULT_JSON]" in line: st.session_state.realtime_results.append(json.loads(line.replace("[RESULT_JSON]", "").strip()))
-            st.session_state.lines.append(line)
+        try: line = q.get_nowait()
         except queue.Empty: break
+        # worker 대기열 상태 ([QUEUE] {"state", "position", "eta_sec"}) 는 로그 대신 상태 박스에 표시
+        if line.startswith("[QUEUE] "):
+            try: st.session_state.queue_info = json.loads(line[8:])
+            except ValueError: pass
+            continue
+        st.session_state.lines.append(line)
+
+def apply_event(ev: Dict[str, Any]):
+    t, ss = ev.get("type"), st.session_state
+    prefix = f"[{ev['region']}] " if ev.get("region") else ""
+    if t == "run_start":
+        ss.regions_total, ss.regions_done = ev.get("regions", 0), 0
+        ss.progress_val, ss.progress_label = 0.0, f"Region 0 of {ss.regions_total}"
+    elif t == "phase_start": ss.status_text = f"{prefix}{ev.get('phase', '')}..."
+    elif t in ("region_result", "region_error"):
+        if t == "region_result":
+            ss.region_blocks.append(dict(ev.get("block", {}), run_ts=ev.get("run_ts") or ss.run_ts))
+            ss.realtime_results.append(dict(ev.get("block", {}), schema=ev.get("schema", {})))
+            if ss.comparison is not None: ss.comparison.add_event(ev.get("block", {}), ev.get("schema"), ev.get("scrape"), ev.get("run_ts", ""), ev.get("market", ""), ev.get("product_id", ""))
+        else: ss.status_text = f"{prefix}❌ navigation {ev.get('block', {}).get('error', 'failed')}"
+        ss.regions_done += 1
+        if ss.regions_total: ss.progress_val, ss.progress_label = min(1.0, ss.regions_done / ss.regions_total), f"Region {ss.regions_done} of {ss.regions_total}"
+    elif t == "artifact":
+        if ev.get("report"):
+            ss.report_path, ss.images_dir, ss.schema_dir = ev["report"], ev.get("images_dir"), ev.get("schema_dir")
+            ss.run_ts, ss.db_path, ss.metrics_path = ev.get("run_ts"), ev.get("db"), ev.get("metrics")
+            retention.touch(Path(ev["report"]).parent)
+    elif t == "replay_truncated": ss.replay_truncated = True
+    elif t == "error": ss.status_text = f"{prefix}⚠️ {ev.get('kind', 'error')}: {ev.get('message') or ev.get('url', '')}"
+
+def drain_events(timeout: float = 0.0) -> bool:
+    # timeout > 0 이면 첫 이벤트가 올 때까지 대기 (고정 sleep 대신 이벤트 기반 rerun)
+    ev_q = st.session_state.get("ev_q")
+    if not ev_q: return False
+    got = False
+    try:
+        ev = ev_q.get(timeout=timeout) if timeout else ev_q.get_nowait()
+        while True:
+            got = True
+            apply_event(ev)
+            ev = ev_q.get_nowait()
+    except queue.Empty: pass
+    return got
+
+def render_metrics_panel(metrics_path: str):
+    # [수정] 실행별 metrics.json 요약 + 최근 실행들의 시장별 단계 시간 비교
+    m = read_json_cached(metrics_path, mtime_of(Path(metrics_path))) if metrics_path else None
+    if not m: return
+    with st.expander("⏱ Performance", expanded=False):
+        regions = m.get("regions", [])
+        dur_s = (m.get("duration_ms") or 0) / 1000
+        k1, k2, k3, k4 = st.columns(4)
+        k1.metric("Regions/min", f"{len(regions) / dur_s * 60:.1f}" if dur_s else "-")
+        k2.metric("Retries", m.get("retries", 0))
+        k3.metric("Downloaded", f"{m.get('bytes_downloaded', 0) / 1024 / 1024:.1f}MB")
+        k4.metric("Browser RSS", f"{m['browser_rss_mb_peak']:.0f}MB" if m.get("browser_rss_mb_peak") else "-")
+        if m.get("phases"):
+            st.caption("Phase timing (ms)")
+            st.dataframe(pd.DataFrame(m["phases"]).T[["count", "p50_ms", "p95_ms", "max_ms", "total_ms"]], use_container_width=True)
+        if regions:
+            st.caption("Slowest regions")
+            cols = ["region", "source", "total_ms", "attempts", "http_status", "bytes_downloaded", "js_heap_mb"]
+            st.dataframe(pd.DataFrame(regions).reindex(columns=cols).sort_values("total_ms", ascending=False).head(10), use_container_width=True, hide_index=True)
+        recent = recent_metrics(str(HERE / "outs"), 50)
+        rows = [{"market": r.get("market", ""), "phase": name, "p50_ms": ph["p50_ms"]} for r in recent for name, ph in r.get("phases", {}).items()]
+        if rows:
+            st.caption(f"By market — median of per-run p50 (last {len(recent)} runs)")
+            st.dataframe(pd.DataFrame(rows).pivot_table(index="market", columns="phase", values="p50_ms", aggfunc="median").round(0), use_container_width=True)
 
 def finalize_if_done():
     proc = st.session_state.get("proc")
     if proc and proc.poll() is not None and st.session_state.running:
         if st.session_state.started_at: st.session_state.final_duration = time.time() - st.session_state.started_at
+        drain_events()
         st.session_state.update({"returncode": proc.poll(), "running": False})
-        st.session_state.report_path, st.session_state.images_dir, st.session_state.schema_dir = parse_report_paths("\n".join(st.session_state.lines))
+        srv = st.session_state.get("ev_srv")
+        if srv:
+            try: srv.close()
+            except OSError: pass
+        st.session_state.ev_srv = None
         st.rerun()
 
 # --- [Main Layout] ---
@@ -209,15 +363,50 @@ with left_col:
     run_btn = b1.button("Run Audit", type="primary", use_container_width=True, disabled=st.session_state.running)
     if b2.button("Stop", use_container_width=True, disabled=not st.session_state.running):
         if st.session_state.proc: st.session_state.proc.terminate()
+    priority = st.radio("Priority", ["normal", "high", "low"], horizontal=True, disabled=st.session_state.running, help="worker 공유 큐에서의 실행 순서")
     
-    if st.session_state.running:
+    with st.expander("GMC Feed (XML / TSV / CSV)", expanded=False):
+        # [수정] 블롭 붙여넣기 대신 Merchant Center 피드 전체를 배치로 감사 (기대값은 results.db expected 에 저장)
+        feed_path = st.text_input("Feed file path", disabled=st.session_state.running)
+        regional_path = st.text_input("Regional inventory feed path (optional)", disabled=st.session_state.running)
+        f1, f2 = st.columns(2)
+        feed_markets = f1.text_input("Markets (e.g. uk,de)", disabled=st.session_state.running)
+        feed_limit = f2.number_input("Max products (0 = all)", min_value=0, value=0, step=100, disabled=st.session_state.running)
+        feed_btn = st.button("Run Feed Audit", use_container_width=True, disabled=st.session_state.running or not feed_path)
+
+    qi = st.session_state.get("queue_info")
+    if st.session_state.running and qi and qi.get("state") == "queued":
+        eta = int(qi.get("eta_sec") or 0)
+        st.markdown(f'<div class="status-box status-running"><div class="status-header">🕒 Queued #{qi.get("position")}</div><div class="status-text">{qi.get("running", 0)} audit(s) running on the shared worker</div><div class="time-text">ETA to start: ~{eta // 60}m {eta % 60:02d}s</div></div>', unsafe_allow_html=True)
+    elif st.session_state.running:
         elapsed = time.time() - st.session_state.started_at if st.session_state.started_at else 0
         st.markdown(f'<div class="status-box status-running"><div class="status-header">⏳ {st.session_state.progress_label}</div><div class="status-text">{st.session_state.status_text}</div><div class="time-text">Time: {elapsed:.1f}s</div></div>', unsafe_allow_html=True)
         st.progress(st.session_state.progress_val)
     elif st.session_state.returncode == 0:
         st.markdown(f'<div class="status-box status-done"><div class="status-header">✅ Done</div><div class="status-text">Audit completed successfully.</div><div class="time-text">Total Time: {st.session_state.final_duration:.1f}s</div></div>', unsafe_allow_html=True)
 
-    if not st.session_state.running and st.session_state.schema_dir:
+    if not st.session_state.running: render_metrics_panel(st.session_state.metrics_path)
+
+    if st.session_state.lines:
+        with st.expander(f"📜 Log (last {len(st.session_state.lines)} lines)", expanded=False):
+            st.code("\n".join(st.session_state.lines), language=None)
+            log_path = Path(st.session_state.log_path) if st.session_state.get("log_path") else None
+            # 전체 로그는 요청할 때만 파일에서 읽음
+            if log_path and log_path.is_file() and st.checkbox("Load full log", value=False):
+                full = log_path.read_text(encoding="utf-8", errors="replace")
+                st.download_button("⬇️ Download full log", full, log_path.name, "text/plain", use_container_width=True)
+
+    if retention.last_report:
+        r = retention.last_report
+        st.caption(f"🧹 Cleanup: {r['deleted']} runs removed, {r['reclaimed_bytes'] / 1024 / 1024:.1f}MB reclaimed in {r['duration_ms']:.0f}ms · outs/ {r['total_bytes'] / 1024 / 1024:.0f}MB")
+
+    if not st.session_state.running:
+        load_run_into_comparison(st.session_state.db_path, st.session_state.run_ts)
+        # [수정] 결과를 보고 있는 실행 폴더는 최근 사용으로 기록 (용량 초과 시 LRU 삭제 기준)
+        if st.session_state.report_path: retention.touch(Path(st.session_state.report_path).parent)
+    table = st.session_state.comparison
+    # [수정] 비교표는 리전 결과가 도착할 때마다 갱신 (Generate Table 없이, 정규화/판정은 comparison.py 에서 컬럼 단위로)
+    if table is not None and len(table):
         st.markdown("---")
         st.subheader("3. Comparison Table")
         with st.container():
@@ -227,35 +416,56 @@ with left_col:
             def_gmc = st.text_input("Default GMC Value", value=b_info["price"] if audit_mode=="Price" else b_info["availability"])
             reg_txt = st.text_area("Regional Inventory (Paste from GMC)", height=150) if audit_mode=="Availability" else ""
             show_orig = st.checkbox("Show LG.com Original", value=False)
-            if st.button("Generate Table", type="primary", use_container_width=True):
-                run_post_audit_internal(st.session_state.schema_dir, audit_mode, def_gmc, reg_txt)
             st.markdown("</div>", unsafe_allow_html=True)
-        if st.session_state.analysis_df is not None:
-            df_disp = st.session_state.analysis_df.copy()
-            if audit_mode == "Availability":
-                df_disp['LG.com'] = df_disp['Visual_Full'] if show_orig else df_disp['Visual_Standard']
-            else:
-                df_disp['LG.com'] = df_disp['Visual_Price']
-            def highlight(row):
-                g, l = str(row['GMC']).lower(), str(row['LG.com']).split('(')[0].strip().lower()
-                return ['background-color: #ffe6e6; color: #b30000'] * len(row) if g and l and g!=l else ['']*len(row)
-            st.dataframe(df_disp[["Region", "GMC", "LG.com", "Schema"]].style.apply(highlight, axis=1), use_container_width=True, hide_index=True)
-            st.download_button("📄 Download Result Report", generate_standalone_html(df_disp, st.session_state.realtime_results, st.session_state.target_url, st.session_state.target_product_id), "report.html", "text/html", use_container_width=True)
+        refresh_expected(table, st.session_state.db_path)
+        use_feed = st.checkbox("Use GMC feed values", value=True) if table.expected is not None and len(table.expected) else False
+        df = table.frame(audit_mode, def_gmc, parse_regional_inventory(reg_txt), use_expected=use_feed)
+        if audit_mode == "Availability" and table.config_error: st.error(f"translations.json 오류: {table.config_error}")
+        cols = (["product_id"] if df["product_id"].nunique() > 1 else []) + ["Region", "GMC", "LG.com", "Schema"]
+        df_disp = df[cols].assign(**{"LG.com": df["LG.com_Full"] if show_orig else df["LG.com"]})
+        st.caption(f"{int(df['Mismatch'].sum())} mismatches / {len(df)} regions" + (" · updating as regions finish" if st.session_state.running else ""))
+        st.dataframe(df_disp.style.apply(lambda _: comparison.row_styles(df, cols), axis=None), use_container_width=True, hide_index=True)
+        if not st.session_state.running:
+            st.download_button("📄 Download Result Report", generate_standalone_html(df_disp, st.session_state.region_blocks, st.session_state.target_url, st.session_state.target_product_id), "report.html", "text/html", use_container_width=True)
+            if st.session_state.db_path and st.session_state.run_ts:
+                raw = {"run_ts": st.session_state.run_ts, "results": results_store.ResultsStore(Path(st.session_state.db_path)).run_results(st.session_state.run_ts)}
+                st.download_button("🧾 Download Raw JSON", json.dumps(raw, indent=2, ensure_ascii=False), f"results_{st.session_state.run_ts}.json", "application/json", use_container_width=True)
 
 with right_col:
     st.subheader("2. Audit Result")
     if st.session_state.target_product_id:
         st.markdown(f'<div class="audit-info-box"><p><b>PRODUCT ID:</b> {st.session_state.target_product_id}</p><p><b>PRODUCT LINK:</b> <a href="{st.session_state.target_url}" target="_blank">{st.session_state.target_url}</a></p><p><b>RUNNED AT:</b> {datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p></div>', unsafe_allow_html=True)
     
-    for g in st.session_state.realtime_results:
+    results = st.session_state.region_blocks
+    if st.session_state.running:
+        # 실행 중에는 새로 도착한 리전만 전체 렌더링 (완료된 리전 수와 관계없이 rerun 비용 일정)
+        shown = list(st.session_state.realtime_results)[::-1]
+        if len(results) > len(shown): st.caption(f"Showing latest {len(shown)} of {len(results)} regions · all regions after the run finishes")
+    else:
+        pages = max(1, -(-len(results) // REGIONS_PAGE))
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1) if pages > 1 else 1
+        shown = results[(page - 1) * REGIONS_PAGE:page * REGIONS_PAGE]
+        if shown and st.session_state.db_path and Path(st.session_state.db_path).exists():
+            store, schemas = results_store.ResultsStore(Path(st.session_state.db_path)), {}
+            for run_ts in {g.get("run_ts") for g in shown if g.get("run_ts")}:
+                got = store.region_schemas(run_ts, [g.get("region_id") or "" for g in shown if g.get("run_ts") == run_ts])
+                schemas.update({(run_ts, rid): sd for rid, sd in got.items()})
+            shown = [dict(g, schema=schemas.get((g.get("run_ts"), g.get("region_id") or ""), {})) for g in shown]
+    for g in shown:
         rid = g.get("region_id") or "Default"
         lnk = g.get("final_url", "#")
-        st.markdown(f"#### region_{rid}" if rid != "Default" else "#### Default")
+        st.markdown((f"#### region_{rid}" if rid != "Default" else "#### Default") + (" ⛔ BLOCKED" if g.get("status") == "blocked" else ""))
         if lnk != "#": st.markdown(f"🔗 [Open Product Page]({lnk})")
         c1, c2 = st.columns([0.6, 0.4])
-        img_p = Path(g.get("schema_path_abs")).parent.parent / "images" / Path(g.get("website_png_rel")).name
-        if img_p.exists(): c1.image(str(img_p), use_container_width=True)
-        sd = safe_read_json(Path(g.get("schema_path_abs")))
+        # [수정] 결과 컬럼은 썸네일 우선 (원본은 링크로)
+        img_p, thumb_p = Path(g.get("image_path_abs") or ""), Path(g.get("thumb_path_abs") or "")
+        thumb_m, img_m = mtime_of(thumb_p) if g.get("thumb_path_abs") else None, mtime_of(img_p) if g.get("image_path_abs") else None
+        if thumb_m is not None: c1.image(read_image_cached(str(thumb_p), thumb_m), use_container_width=True, caption=img_p.name)
+        elif img_m is not None: c1.image(read_image_cached(str(img_p), img_m), use_container_width=True)
+        if g.get("image_dedup_of"): c1.caption(f"Same screenshot as {Path(g['image_dedup_of']).name}")
+        schema_p = Path(g["schema_path_abs"]) if g.get("schema_path_abs") else None
+        schema_m = mtime_of(schema_p) if schema_p else None
+        sd = g.get("schema") or (read_json_cached(str(schema_p), schema_m) if schema_m is not None else {})
         off = sd.get("offers", [{}])[0] if sd and isinstance(sd.get("offers"), list) else (sd.get("offers", {}) if sd else {})
         c2.markdown(f'<table class="comp-table"><tr><th>Field</th><th>Schema</th></tr><tr><td>Price</td><td>{off.get("price")}</td></tr><tr><td>Avail</td><td>{str(off.get("availability","")).split("/")[-1]}</td></tr></table>', unsafe_allow_html=True)
         with c2.expander("JSON"): st.json(sd)
@@ -269,10 +479,25 @@ if run_btn:
         if "product id" in l.lower() and i+1 < len(lines): pid = lines[i+1]
     if not url: st.error("URL not found"); st.stop()
     st.session_state.target_product_id, st.session_state.target_url = pid, url
-    start_process([sys.executable, str(SCRIPT), "--no_open", "--url", url, "--blob", blob])
+    start_process(["--no_open", "--url", url, "--blob", blob], priority)
+
+if feed_btn:
+    paths = [Path(p.strip().strip('"')) for p in (feed_path, regional_path) if p.strip()]
+    missing = [str(p) for p in paths if not p.is_file()]
+    if missing: st.error(f"File not found: {', '.join(missing)}"); st.stop()
+    jobs_path = feed_ingest.FEEDS_DIR / f"feed_{datetime.datetime.now():%Y%m%d_%H%M%S}.jsonl"
+    markets = {m.strip().lower() for m in feed_markets.split(",") if m.strip()} or None
+    with st.spinner("Reading feed..."):
+        stats = feed_ingest.ingest(paths, results_store.ResultsStore(HERE / "outs" / results_store.DB_NAME), jobs_path, markets, int(feed_limit))
+    if not stats["jobs"]: st.error(f"No products with a link found in feed ({stats})"); st.stop()
+    st.session_state.saved_blob, st.session_state.expected_pids = "", None
+    st.session_state.target_product_id, st.session_state.target_url = f"{stats['jobs']} products from feed", ""
+    start_process(["--no_open", "--batch", str(jobs_path)], priority)
 
 drain_logs()
+drain_events()
 finalize_if_done()
 if st.session_state.running:
-    time.sleep(0.5)
+    # 이벤트(또는 1.5s heartbeat) 가 올 때까지 대기 후 rerun
+    drain_events(timeout=1.5)
     st.rerun()
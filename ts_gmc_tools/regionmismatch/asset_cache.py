@@ -0,0 +1,204 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# 정적 에셋 캐시: context/리전/실행이 바뀌어도 해시가 붙은 JS 번들, CSS, 폰트를 디스크에서 바로 응답 (route.fulfill)
+# 저장은 내용 주소 방식 (blobs/<sha1>), URL -> sha1 은 index.json. 용량 상한 초과 시 마지막 사용 시각 기준 LRU 삭제
+# HTML 문서 / XHR / fetch (가격·재고 API) 는 항상 실제 요청. 설정: asset_cache.json
+CONFIG_FILE = "asset_cache.json"
+CACHE_DIR = Path("cache") / "assets"
+MB = 1024 * 1024
+
+DEFAULTS = {
+    "max_mb": 1024,
+    "mem_mb": 64,
+    "resource_types": ["script", "stylesheet", "font", "image"],
+    "always_types": ["font"],
+    "immutable_patterns": [r"[.-][0-9a-f]{8,}\.(js|css|woff2?|ttf|otf|svg|png|jpe?g|webp|gif)(\?|$)", r"[?&](v|ver|version|rev)=[\w.-]+"],
+    "live_patterns": [r"/api/", r"price", r"stock", r"inventory", r"/cart", r"\.json(\?|$)"],
+}
+# 캐시에서 응답할 때 되돌려줄 헤더 (본문은 이미 디코딩된 상태로 저장하므로 content-encoding 은 제외)
+KEEP_HEADERS = ("content-type", "access-control-allow-origin", "access-control-allow-credentials", "timing-allow-origin", "cache-control")
+
+
+def load_config(script_dir: Path) -> Dict:
+    path = script_dir / CONFIG_FILE
+    cfg = dict(DEFAULTS)
+    if path.exists(): cfg.update(json.loads(path.read_text(encoding="utf-8")))
+    return cfg
+
+
+class AssetCache:
+    def __init__(self, root: Path, cfg: Dict):
+        self.root = root
+        self.blobs = root / "blobs"
+        self.index_path = root / "index.json"
+        self.max_bytes = int(cfg["max_mb"] * MB)
+        self.mem_bytes = int(cfg["mem_mb"] * MB)
+        self.types = set(cfg["resource_types"])
+        self.always_types = set(cfg["always_types"])
+        self.immutable = [re.compile(p, re.I) for p in cfg["immutable_patterns"]]
+        self.live = [re.compile(p, re.I) for p in cfg["live_patterns"]]
+        self.lock = threading.Lock()
+        self.blobs.mkdir(parents=True, exist_ok=True)
+        try: self.index: Dict[str, Dict] = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError): self.index = {}
+        # 같은 프로세스 안에서 자주 쓰는 번들은 메모리에도 보관 (디스크 읽기 생략)
+        self.mem: "OrderedDict[str, bytes]" = OrderedDict()
+        self.mem_size = 0
+        self.totals = {"hits": 0, "misses": 0, "stored": 0, "bytes_served": 0, "bytes_fetched": 0, "evicted": 0}
+        self.dirty = False
+
+    def cacheable(self, url: str, resource_type: str) -> bool:
+        if resource_type not in self.types: return False
+        if any(p.search(url) for p in self.live): return False
+        return resource_type in self.always_types or any(p.search(url) for p in self.immutable)
+
+    @staticmethod
+    def storable(status: int, headers: Dict[str, str]) -> bool:
+        cc = headers.get("cache-control", "").lower()
+        return status == 200 and "no-store" not in cc and "private" not in cc
+
+    @staticmethod
+    def url_key(url: str) -> str:
+        return hashlib.sha1(url.split("#", 1)[0].encode("utf-8")).hexdigest()
+
+    def _blob_path(self, sha: str) -> Path:
+        return self.blobs / sha[:2] / sha
+
+    def _remember(self, sha: str, body: bytes):
+        if len(body) > self.mem_bytes // 4: return
+        self.mem[sha] = body
+        self.mem_size += len(body)
+        while self.mem_size > self.mem_bytes and self.mem:
+            _, old = self.mem.popitem(last=False)
+            self.mem_size -= len(old)
+
+    def get(self, url: str) -> Optional[Tuple[Dict, bytes]]:
+        key = self.url_key(url)
+        with self.lock:
+            entry = self.index.get(key)
+            if not entry: return None
+            body = self.mem.get(entry["sha"])
+            if body is not None: self.mem.move_to_end(entry["sha"])
+        if body is None:
+            try: body = self._blob_path(entry["sha"]).read_bytes()
+            except OSError:
+                with self.lock: self.index.pop(key, None)
+                return None
+            with self.lock: self._remember(entry["sha"], body)
+        with self.lock:
+            entry["last_access"] = time.time()
+            entry["hits"] = entry.get("hits", 0) + 1
+            self.totals["hits"] += 1
+            self.totals["bytes_served"] += len(body)
+            self.dirty = True
+        return entry, body
+
+    def put(self, url: str, body: bytes, headers: Dict[str, str]):
+        sha = hashlib.sha1(body).hexdigest()
+        path = self._blob_path(sha)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_bytes(body)
+            os.replace(tmp, path)
+        with self.lock:
+            self.index[self.url_key(url)] = {"url": url, "sha": sha, "size": len(body), "last_access": time.time(), "hits": 0,
+                                             "headers": {k: v for k, v in headers.items() if k.lower() in KEEP_HEADERS}}
+            self.totals["stored"] += 1
+            self._remember(sha, body)
+            self.dirty = True
+
+    def record_miss(self, size: int):
+        with self.lock:
+            self.totals["misses"] += 1
+            self.totals["bytes_fetched"] += size
+
+    def evict(self):
+        """blob 합계가 max_mb 를 넘으면 가장 오래 안 쓴 URL 부터 제거 (다른 URL 이 같은 blob 을 쓰면 blob 은 유지)"""
+        with self.lock:
+            sizes = {e["sha"]: e["size"] for e in self.index.values()}
+            total = sum(sizes.values())
+            if total <= self.max_bytes: return
+            last_use: Dict[str, float] = {}
+            for e in self.index.values(): last_use[e["sha"]] = max(last_use.get(e["sha"], 0), e["last_access"])
+            drop = set()
+            for sha in sorted(last_use, key=last_use.get):
+                if total <= self.max_bytes * 0.9: break
+                drop.add(sha)
+                total -= sizes[sha]
+            self.index = {k: e for k, e in self.index.items() if e["sha"] not in drop}
+            for sha in drop:
+                if sha in self.mem: self.mem_size -= len(self.mem.pop(sha))
+            self.totals["evicted"] += len(drop)
+            self.dirty = True
+        for sha in drop:
+            try: self._blob_path(sha).unlink()
+            except OSError: pass
+
+    def save(self):
+        # 다른 프로세스(coordinator 샤드)가 추가한 항목은 유지, 같은 URL 은 최근 사용 기준으로 병합
+        self.evict()
+        with self.lock:
+            if not self.dirty: return
+            try: on_disk = json.loads(self.index_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError): on_disk = {}
+            for k, e in on_disk.items():
+                if k not in self.index or e.get("last_access", 0) > self.index[k]["last_access"]: self.index[k] = e
+            tmp = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(self.index), encoding="utf-8")
+            os.replace(tmp, self.index_path)
+            self.dirty = False
+
+    def state(self) -> Dict:
+        with self.lock:
+            return dict(self.totals, entries=len(self.index), disk_mb=round(sum({e["sha"]: e["size"] for e in self.index.values()}.values()) / MB, 1))
+
+
+def open_cache(script_dir: Path, max_mb: Optional[float] = None) -> AssetCache:
+    cfg = load_config(script_dir)
+    if max_mb: cfg["max_mb"] = max_mb
+    return AssetCache(script_dir / CACHE_DIR, cfg)
+
+
+async def install(context, cache: AssetCache) -> Dict:
+    """context 에 캐시 route 를 검. resource_policy.install 보다 먼저 호출 (차단 판단이 먼저 실행되고 fallback 으로 넘어옴)"""
+    stats = {"hits": 0, "misses": 0, "stored": 0, "bytes_from_cache": 0}
+
+    async def handle(route):
+        req = route.request
+        if req.method != "GET" or not cache.cacheable(req.url, req.resource_type):
+            return await route.fallback()
+        hit = await asyncio.to_thread(cache.get, req.url)
+        if hit:
+            entry, body = hit
+            stats["hits"] += 1
+            stats["bytes_from_cache"] += len(body)
+            return await route.fulfill(status=200, headers=entry["headers"], body=body)
+        try:
+            resp = await route.fetch()
+            body = await resp.body()
+        except Exception:
+            return await route.fallback()
+        stats["misses"] += 1
+        cache.record_miss(len(body))
+        if cache.storable(resp.status, resp.headers):
+            await asyncio.to_thread(cache.put, req.url, body, resp.headers)
+            stats["stored"] += 1
+        await route.fulfill(response=resp, body=body)
+
+    await context.route("**/*", handle)
+    return stats
+
+
+def summary(stats: Dict) -> str:
+    total = stats["hits"] + stats["misses"]
+    return f"Assets: {stats['hits']}/{total} from cache ({stats['bytes_from_cache'] / 1024:.0f} KB), {stats['stored']} stored"
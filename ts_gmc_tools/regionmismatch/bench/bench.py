@@ -0,0 +1,152 @@
+import argparse
+import json
+import queue
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import fixture_server
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # regionmismatch/ 의 events / metrics 재사용
+import events
+import metrics
+
+try:
+    import psutil  # 선택 사항: 크롤러 + 브라우저 프로세스 트리 peak RSS 측정
+except ImportError:
+    psutil = None
+
+# 오프라인 벤치마크: 로컬 fixture 서버를 띄우고 region_mismatch.py 를 동시성 수준별로 실행
+# 단계별 지연(이벤트 채널의 phase_end), regions/min, peak RSS, 전송 바이트를 JSON 으로 저장
+HERE = Path(__file__).resolve().parent
+SCRIPT = HERE.parent / "region_mismatch.py"
+RESULTS_DIR = HERE / "results"
+# 로컬 fixture 서버(127.0.0.1)는 요청 조절 없이 측정 (운영 throttle_config.json 에는 실제 호스트만)
+THROTTLE_CONFIG = HERE / "throttle_config.json"
+PHASES = ["navigate", "overlay_removal", "lazy_load", "ready", "screenshot", "extract", "http_fetch"]
+
+
+def tree_rss(pid: int) -> int:
+    try:
+        proc = psutil.Process(pid)
+        return sum(p.memory_info().rss for p in [proc] + proc.children(recursive=True))
+    except psutil.Error: return 0
+
+
+def summarize_phases(evs: List[Dict]) -> Dict[str, Dict]:
+    # phase_end 이벤트 하나를 metrics.summarize_phases 의 리전 한 개처럼 넘겨 같은 통계를 사용
+    summary = metrics.summarize_phases([{"phases": {ev["phase"]: ev["duration_ms"]}} for ev in evs if ev.get("type") == "phase_end"])
+    return dict(sorted(summary.items(), key=lambda kv: PHASES.index(kv[0]) if kv[0] in PHASES else 99))
+
+
+def run_level(base_url: str, concurrency: int, args, extra: List[str]) -> Dict:
+    urllib.request.urlopen(urllib.request.Request(f"{base_url}/__reset", data=b"", method="POST")).close()
+    ev_q: queue.Queue = queue.Queue()
+    srv = events.listen(ev_q.put, backlog=4)
+    regions = ",".join(f"r{n:02d}" for n in range(1, args.regions + 1))
+    argv = [sys.executable, str(SCRIPT), "--no_open", "--url", f"{base_url}/uk/oled-tvs/{args.sku}", "--regions", regions,
+            "--concurrency", str(concurrency), "--cache", "off", "--db", str(RESULTS_DIR / "bench.db"),
+            "--throttle_config", str(THROTTLE_CONFIG), "--events_addr", events.address(srv),
+            # 레벨별 산출물은 운영용 outs/ 대신 results/ 아래로 (gitignore)
+            "--out_dir", str(RESULTS_DIR / "outs" / f"c{concurrency}_{datetime.now():%Y%m%d_%H%M%S_%f}")] + extra
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(argv, stdout=subprocess.DEVNULL if not args.verbose else None, stderr=subprocess.STDOUT, cwd=str(SCRIPT.parent))
+    peak = 0
+    while proc.poll() is None:
+        if psutil is not None: peak = max(peak, tree_rss(proc.pid))
+        try: proc.wait(timeout=0.2)
+        except subprocess.TimeoutExpired: pass
+        if time.perf_counter() - t0 > args.timeout:
+            proc.kill(); break
+    wall = time.perf_counter() - t0
+    time.sleep(0.2)  # 소켓에 남은 이벤트 수신
+    srv.close()
+    evs = []
+    while not ev_q.empty(): evs.append(ev_q.get_nowait())
+    with urllib.request.urlopen(f"{base_url}/__stats") as r: server = json.loads(r.read())
+
+    results = [ev["block"] for ev in evs if ev.get("type") == "region_result"]
+    run_end = next((ev for ev in evs if ev.get("type") == "run_end"), {})
+    crawl_s = run_end.get("duration_ms", wall * 1000) / 1000
+    return {
+        "concurrency": concurrency,
+        "returncode": proc.returncode,
+        "regions": len(results),
+        "blocked": sum(1 for b in results if b.get("status") == "blocked"),
+        "wall_s": round(wall, 2),
+        "crawl_s": round(crawl_s, 2),
+        "regions_per_min": round(len(results) / crawl_s * 60, 1) if crawl_s else 0.0,
+        "peak_rss_mb": round(peak / 1024 / 1024, 1) if psutil is not None else None,
+        "bytes_served": server["bytes_sent"],
+        "bytes_downloaded": sum((b.get("resources") or {}).get("bytes_downloaded", 0) for b in results),
+        "server_requests": server["requests"],
+        "server_asset_requests": server.get("asset_requests", 0),
+        "assets_from_cache": sum(((b.get("resources") or {}).get("assets") or {}).get("hits", 0) for b in results),
+        "phases": summarize_phases(evs),
+        "errors": [ev for ev in evs if ev.get("type") == "error"][:20],
+    }
+
+
+def git_rev() -> str:
+    try: return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=str(HERE), text=True).strip()
+    except (OSError, subprocess.CalledProcessError): return ""
+
+
+def compare(report: Dict, baseline: Dict):
+    # 같은 concurrency 끼리 regions/min 과 단계별 p50 변화율 출력
+    base = {lv["concurrency"]: lv for lv in baseline.get("levels", [])}
+    print(f"\n== vs baseline {baseline.get('version', '?')} ({baseline.get('created', '')}) ==")
+    for lv in report["levels"]:
+        b = base.get(lv["concurrency"])
+        if not b: continue
+        pct = lambda new, old: f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"c={lv['concurrency']}: regions/min {b['regions_per_min']} -> {lv['regions_per_min']} ({pct(lv['regions_per_min'], b['regions_per_min'])})")
+        for name, ph in lv["phases"].items():
+            if name in b["phases"]:
+                print(f"    {name:<16} p50 {b['phases'][name]['p50_ms']:>8.1f} -> {ph['p50_ms']:>8.1f} ms ({pct(ph['p50_ms'], b['phases'][name]['p50_ms'])})")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="로컬 fixture 서버 기반 크롤러 벤치마크")
+    ap.add_argument("--levels", default="1,2,4", help="측정할 --concurrency 값 (',' 구분)")
+    ap.add_argument("--regions", type=int, default=8, help="리전 수")
+    ap.add_argument("--sku", default="BENCH-SKU")
+    ap.add_argument("--delay_ms", type=int, default=0, help="페이지 응답 지연")
+    ap.add_argument("--jitter_ms", type=int, default=0)
+    ap.add_argument("--jsonld_delay_ms", type=int, default=fixture_server.DEFAULTS["jsonld_delay_ms"])
+    ap.add_argument("--block_regions", default="", help="403 을 돌려줄 리전 (예: r03,r07)")
+    ap.add_argument("--timeout", type=float, default=600, help="수준별 최대 실행 시간(초)")
+    ap.add_argument("--out", default="", help="결과 JSON 경로 (기본: bench/results/bench_<ts>.json)")
+    ap.add_argument("--baseline", default="", help="비교할 이전 결과 JSON")
+    ap.add_argument("--verbose", action="store_true", help="region_mismatch.py 로그 출력")
+    args, extra = ap.parse_known_args()  # 나머지 인자는 region_mismatch.py 로 전달 (예: --resource_policy schema-only)
+
+    settings = {"delay_ms": args.delay_ms, "jitter_ms": args.jitter_ms, "jsonld_delay_ms": args.jsonld_delay_ms,
+                "block_regions": [r for r in args.block_regions.split(",") if r]}
+    srv = fixture_server.start(0, **settings)
+    base_url = f"http://127.0.0.1:{srv.server_address[1]}"
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+
+    levels = []
+    for c in [int(x) for x in args.levels.split(",") if x.strip()]:
+        print(f"[BENCH] concurrency={c} regions={args.regions} ...")
+        lv = run_level(base_url, c, args, extra)
+        print(f"[BENCH]   {lv['regions']} regions in {lv['crawl_s']}s -> {lv['regions_per_min']} regions/min, "
+              f"peak RSS {lv['peak_rss_mb']}MB, served {lv['bytes_served'] / 1024:.0f}KB")
+        levels.append(lv)
+    srv.shutdown()
+
+    report = {"version": git_rev(), "created": datetime.now().isoformat(timespec="seconds"), "python": sys.version.split()[0],
+              "config": dict(settings, regions=args.regions, sku=args.sku, extra_args=extra), "levels": levels}
+    out = Path(args.out) if args.out else RESULTS_DIR / f"bench_{datetime.now():%Y%m%d_%H%M%S}.json"
+    out.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"- Bench: {out}")
+    if args.baseline: compare(report, json.loads(Path(args.baseline).read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
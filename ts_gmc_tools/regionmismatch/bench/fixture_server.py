@@ -0,0 +1,146 @@
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict
+from urllib.parse import urlparse, parse_qs
+
+# 벤치마크용 로컬 PDP 서버: /<market>/<...>/<sku>?region_id=<rid>
+# fixtures/<sku>.html 이 있으면 그 파일(녹화본), 없으면 fixtures/pdp.html 템플릿 사용. {{...}} 치환
+# 지연/차단 주입: delay_ms, jitter_ms, block_regions, jsonld_delay_ms, price_delay_ms
+# /assets/ 는 해시가 붙은 이름 + Cache-Control immutable (asset_cache 측정용, 요청 수는 /__stats 의 asset_requests)
+HERE = Path(__file__).resolve().parent
+FIXTURES = HERE / "fixtures"
+
+DEFAULTS = {
+    "delay_ms": 0,
+    "jitter_ms": 0,
+    "jsonld_delay_ms": 150,
+    "price_delay_ms": 100,
+    "lazy_images": 6,
+    "block_regions": [],
+    "block_rate": 0.0,
+}
+
+DENIED = b"<html><head><title>Access Denied</title></head><body><h1>Access Denied</h1>You don't have permission to access this server.</body></html>"
+
+
+def region_price(sku: str, rid: str) -> float:
+    # 리전마다 고정된 가격 (일부 리전은 기본 가격과 다르게)
+    h = int(hashlib.md5(f"{sku}|{rid}".encode()).hexdigest(), 16)
+    return 1299.0 - (h % 4) * 50 if rid else 1299.0
+
+
+class FixtureState:
+    def __init__(self, settings: Dict):
+        self.settings = dict(DEFAULTS, **settings)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.stats = {"requests": 0, "pages": 0, "blocked": 0, "bytes_sent": 0, "asset_requests": 0}
+
+    def count(self, key: str, n: int = 1):
+        with self.lock: self.stats[key] += n
+
+
+def render_page(sku: str, market: str, rid: str, settings: Dict) -> bytes:
+    recorded = FIXTURES / f"{sku}.html"
+    html = (recorded if recorded.exists() else FIXTURES / "pdp.html").read_text(encoding="utf-8")
+    price = region_price(sku, rid)
+    cta = "Buy Now" if price != 1149.0 else "Out of Stock"
+    availability = "https://schema.org/InStock" if cta == "Buy Now" else "https://schema.org/OutOfStock"
+    jsonld = {"@context": "https://schema.org", "@type": "Product", "sku": sku, "name": sku,
+              "offers": {"@type": "Offer", "price": f"{price:.2f}", "priceCurrency": "GBP", "availability": availability}}
+    values = {
+        "SKU": sku, "MARKET_UPPER": market.upper(), "CTA": cta, "PRICE_TEXT": f"£{price:,.2f}",
+        "JSONLD": json.dumps(jsonld), "JSONLD_DELAY_MS": settings["jsonld_delay_ms"],
+        "PRICE_DELAY_MS": settings["price_delay_ms"], "LAZY_IMAGES": settings["lazy_images"],
+        "JSONLD_INLINE": f'<script type="application/ld+json">{json.dumps(jsonld)}</script>' if settings["jsonld_delay_ms"] <= 0 else "",
+    }
+    for k, v in values.items(): html = html.replace("{{" + k + "}}", str(v))
+    return html.encode("utf-8")
+
+
+def make_handler(state: FixtureState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *a): pass
+
+        def _send(self, code: int, body: bytes, ctype: str, cache_control: str = "no-store"):
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", cache_control)
+            self.end_headers()
+            self.wfile.write(body)
+            state.count("bytes_sent", len(body))
+
+        def do_POST(self):
+            if self.path == "/__reset":
+                state.reset()
+                return self._send(200, b"{}", "application/json")
+            self._send(404, b"", "text/plain")
+
+        def do_GET(self):
+            u = urlparse(self.path)
+            q = parse_qs(u.query)
+            state.count("requests")
+            if u.path == "/__stats":
+                return self._send(200, json.dumps(state.stats).encode(), "application/json")
+            if u.path.startswith("/assets/"):
+                state.count("asset_requests")
+                kb = int(q.get("kb", ["20"])[0])
+                ctype = {"css": "text/css", "js": "application/javascript"}.get(u.path.rsplit(".", 1)[-1], "image/jpeg")
+                body = b"\xff\xd8" + b"\x00" * (kb * 1024) if ctype == "image/jpeg" else b"/*" + b"0" * (kb * 1024) + b"*/"
+                return self._send(200, body, ctype, "public, max-age=31536000, immutable")
+            if u.path == "/favicon.ico":
+                return self._send(404, b"", "text/plain")
+
+            s = state.settings
+            delay = s["delay_ms"] + random.uniform(0, s["jitter_ms"])
+            if delay: time.sleep(delay / 1000)
+            rid = q.get("region_id", [""])[0]
+            if rid in s["block_regions"] or (s["block_rate"] and random.random() < s["block_rate"]):
+                state.count("blocked")
+                return self._send(403, DENIED, "text/html")
+            seg = [p for p in u.path.split("/") if p]
+            market, sku = (seg[0] if seg else "uk"), (seg[-1] if seg else "BENCH-SKU")
+            state.count("pages")
+            self._send(200, render_page(sku, market, rid, s), "text/html; charset=utf-8")
+
+    return Handler
+
+
+def start(port: int = 0, **settings) -> ThreadingHTTPServer:
+    srv = ThreadingHTTPServer(("127.0.0.1", port), make_handler(FixtureState(settings)))
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8890)
+    ap.add_argument("--delay_ms", type=int, default=0)
+    ap.add_argument("--jitter_ms", type=int, default=0)
+    ap.add_argument("--jsonld_delay_ms", type=int, default=DEFAULTS["jsonld_delay_ms"])
+    ap.add_argument("--block_regions", default="", help="403 Access Denied 를 돌려줄 region_id (',' 구분)")
+    ap.add_argument("--block_rate", type=float, default=0.0)
+    args = ap.parse_args()
+    srv = start(args.port, delay_ms=args.delay_ms, jitter_ms=args.jitter_ms, jsonld_delay_ms=args.jsonld_delay_ms,
+                block_regions=[r for r in args.block_regions.split(",") if r], block_rate=args.block_rate)
+    print(f"fixture server: http://127.0.0.1:{srv.server_address[1]}/uk/oled-tvs/BENCH-SKU")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt: pass
+
+
+if __name__ == "__main__":
+    main()
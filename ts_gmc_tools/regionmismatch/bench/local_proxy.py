@@ -0,0 +1,121 @@
+import argparse
+import select
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# coordinator 테스트용 로컬 포워드 프록시 (HTTP 절대 URI + HTTPS CONNECT 터널)
+# block_after: N 번째 요청 이후 403 을 돌려줘 "차단된 출구 IP" 를 흉내냄 (0 이면 차단 없음)
+# 실행 예: python local_proxy.py --port 8901 --block_after 20  ->  coordinator.py --proxy http://127.0.0.1:8901
+#         (8901/8902 두 개를 띄우면 region_mismatch.py --proxy_pool bench/proxy_pool.json 으로 프록시 풀 확인)
+DENIED = b"<html><head><title>Access Denied</title></head><body><h1>Access Denied</h1>proxy egress blocked</body></html>"
+HOP_HEADERS = {"proxy-connection", "proxy-authorization", "connection", "keep-alive", "transfer-encoding", "te", "upgrade"}
+
+
+class ProxyState:
+    def __init__(self, block_after: int = 0, delay_ms: int = 0):
+        self.block_after = block_after
+        self.delay_ms = delay_ms
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "blocked": 0, "tunnels": 0}
+
+    def admit(self) -> bool:
+        with self.lock:
+            self.stats["requests"] += 1
+            if self.block_after and self.stats["requests"] > self.block_after:
+                self.stats["blocked"] += 1
+                return False
+            return True
+
+
+def make_handler(state: ProxyState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *a): pass
+
+        def _deny(self):
+            self.send_response(403)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(DENIED)))
+            self.end_headers()
+            self.wfile.write(DENIED)
+
+        def do_CONNECT(self):
+            if not state.admit(): return self._deny()
+            host, _, port = self.path.partition(":")
+            try: upstream = socket.create_connection((host, int(port or 443)), timeout=15)
+            except OSError:
+                self.send_error(502); return
+            with state.lock: state.stats["tunnels"] += 1
+            self.send_response(200, "Connection Established")
+            self.end_headers()
+            self.close_connection = True
+            conns = [self.connection, upstream]
+            try:
+                while True:
+                    ready, _, err = select.select(conns, [], conns, 30)
+                    if err or not ready: break
+                    for s in ready:
+                        data = s.recv(65536)
+                        if not data: return
+                        (upstream if s is self.connection else self.connection).sendall(data)
+            except OSError:
+                pass
+            finally:
+                upstream.close()
+
+        def _forward(self):
+            if not state.admit(): return self._deny()
+            if state.delay_ms: time.sleep(state.delay_ms / 1000)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else None
+            headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_HEADERS}
+            req = urllib.request.Request(self.path, data=body, headers=headers, method=self.command)
+            try:
+                resp = urllib.request.urlopen(req, timeout=30)
+            except urllib.error.HTTPError as e:
+                resp = e
+            except OSError:
+                self.send_error(502); return
+            with resp:
+                data = resp.read()
+                self.send_response(resp.status if hasattr(resp, "status") else resp.code)
+                for k, v in resp.headers.items():
+                    if k.lower() not in HOP_HEADERS and k.lower() != "content-length": self.send_header(k, v)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        do_GET = do_POST = do_HEAD = _forward
+
+    return Handler
+
+
+def start(port: int = 0, **settings) -> ThreadingHTTPServer:
+    state = ProxyState(**settings)
+    srv = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    srv.daemon_threads = True
+    srv.state = state  # 테스트 쪽에서 srv.state.stats 로 요청/차단 수 확인
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def main():
+    ap = argparse.ArgumentParser(description="coordinator 샤드 테스트용 로컬 프록시")
+    ap.add_argument("--port", type=int, default=8901)
+    ap.add_argument("--block_after", type=int, default=0, help="이 요청 수 이후 403 (차단 흉내, 0: 끔)")
+    ap.add_argument("--delay_ms", type=int, default=0, help="요청마다 추가 지연 (느린 프록시 흉내)")
+    args = ap.parse_args()
+    srv = start(args.port, block_after=args.block_after, delay_ms=args.delay_ms)
+    print(f"local proxy: http://127.0.0.1:{srv.server_address[1]}")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt: pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+import config_cache
+import results_store
+
+# GMC vs LG.com 비교표: 가격/재고/CTA 정규화와 불일치 판정을 행 단위 루프 대신 컬럼 단위(pandas)로 처리
+# 리전 결과는 도착할 때마다 add_* 로 누적 (정규화는 새 행만), GMC 값이 바뀌면 플래그 컬럼만 다시 계산
+# 배치 실행처럼 제품 x 리전 행이 수천 개여도 rerun 마다 같은 결과를 재사용
+PRICE_TOL = 0.005
+KEY = ["run_ts", "product_id", "region_id"]
+BASE_COLS = ["run_ts", "product_id", "market", "region_id", "status", "schema_price", "schema_availability", "visual_price", "cta_text"]
+BLOCKED = "BLOCKED"
+MISMATCH_STYLE = "background-color: #ffe6e6; color: #b30000"
+SCHEMA_STYLE = "background-color: #fff4d6"
+
+
+def parse_prices(values: pd.Series, markets: Optional[pd.Series] = None) -> pd.Series:
+    """"1.299,00" / "1,299.00" / "£1,299" -> 1299.0 (파싱 불가면 NaN). results_store.price_value 를 (값, 시장) 고유 조합마다 한 번만 실행"""
+    pairs = pd.DataFrame({"v": values.astype("string").fillna(""),
+                          "m": markets.astype("string").fillna("") if markets is not None else ""}, index=values.index)
+    uniq = pairs.drop_duplicates()
+    uniq = uniq.assign(num=[results_store.price_value(v, m) for v, m in zip(uniq["v"], uniq["m"])])
+    num = pd.to_numeric(pairs.merge(uniq, on=["v", "m"], how="left")["num"], errors="coerce")
+    num.index = values.index
+    return num
+
+
+# schema.org ItemAvailability 토큰 (GMC 피드 값 in_stock / out of stock / preorder 도 구분자를 빼면 같은 토큰)
+AVAILABILITY_TOKENS = {t.lower(): t for t in ["InStock", "OutOfStock", "PreOrder", "BackOrder", "LimitedAvailability", "SoldOut",
+                                               "Discontinued", "OnlineOnly", "InStoreOnly", "PreSale", "MadeToOrder", "Reserved"]}
+
+
+def normalize_availability(values: pd.Series) -> pd.Series:
+    """GMC 값 / schema.org URL·토큰 -> InStock | OutOfStock | PreOrder ... (토큰과 정확히 일치할 때만, 그 외 값은 그대로)
+    CTA 문구는 여기서 추측하지 않음 (translate_cta 의 번역표가 담당)"""
+    raw = values.astype("string").fillna("").str.strip()
+    token = raw.str.lower().str.replace(r"^https?://schema\.org/", "", regex=True).str.replace(r"[\s_-]+", "", regex=True)
+    return token.map(AVAILABILITY_TOKENS).astype("string").fillna(raw)
+
+
+def translate_cta(texts: pd.Series, markets: pd.Series, trans: config_cache.Translations) -> Tuple[pd.Series, pd.Series]:
+    """CTA 문구 -> (표준 상태, "표준 (원문)"). 번역 매처는 (문구, 시장) 고유 조합마다 한 번만 실행"""
+    raw = texts.astype("string").fillna("")
+    pairs = pd.DataFrame({"t": raw.str.split().str.join(" ").str.lower().fillna(""), "m": markets.astype("string").fillna("")})
+    uniq = pairs.drop_duplicates()
+    uniq = uniq.assign(std=[trans.lookup(t, m) if t else None for t, m in zip(uniq["t"], uniq["m"])])
+    std = pairs.merge(uniq, on=["t", "m"], how="left")["std"].astype("string")
+    std.index = texts.index
+    full = (std + " (" + raw + ")").fillna(raw)
+    return std.fillna(raw), full
+
+
+class ComparisonTable:
+    def __init__(self, trans_path: Path):
+        self.trans_path = trans_path
+        self.df = pd.DataFrame(columns=BASE_COLS)
+        self.pending: List[Dict] = []
+        self.version = 0
+        self.config_error: Optional[str] = None
+        self.expected: Optional[pd.DataFrame] = None
+        self._cache: Optional[Tuple[tuple, pd.DataFrame]] = None
+
+    def __len__(self) -> int:
+        return len(self.df) + len(self.pending)
+
+    def has_run(self, run_ts: str) -> bool:
+        self._flush()
+        return bool(len(self.df)) and self.df["run_ts"].eq(run_ts).any()
+
+    def product_ids(self) -> List[str]:
+        self._flush()
+        return self.df["product_id"].unique().tolist() if len(self.df) else []
+
+    def add_rows(self, rows: Iterable[Dict]):
+        """results_store 의 results 행 (run_results / latest_per_region)"""
+        self.pending.extend({k: r.get(k) or "" for k in BASE_COLS} for r in rows)
+
+    def add_event(self, block: Dict, schema: Optional[Dict], scrape: Optional[Dict], run_ts: str, market: str, product_id: str = ""):
+        """region_result 이벤트 1건 (results.db 에 기록되는 행과 같은 필드로 변환)"""
+        run = {"run_ts": run_ts or "", "product_id": product_id or "", "market": market or ""}
+        self.add_rows([results_store.make_row(run, block.get("region_id", ""), block.get("final_url", ""), schema, scrape or {}, block)])
+
+    def set_expected(self, rows: Iterable[Dict]):
+        """GMC 피드 기대값 (results_store.expected_for). 가격은 sale_price 가 있으면 sale_price"""
+        exp = pd.DataFrame(list(rows), columns=["product_id", "region_id", "price", "sale_price", "availability"]).fillna("")
+        exp["price"] = exp["sale_price"].where(exp["sale_price"].astype(str).str.strip() != "", exp["price"])
+        self.expected = exp.drop_duplicates(["product_id", "region_id"], keep="last").set_index(["product_id", "region_id"])[["price", "availability"]]
+        self.version += 1
+
+    def _gmc(self, df: pd.DataFrame, rid: pd.Series, field: str, fallback: pd.Series) -> pd.Series:
+        # 피드 기대값 (제품 x 리전) > 피드 기본값 (제품) > 화면 입력값
+        if self.expected is None or self.expected.empty: return fallback
+        exp = self.expected[field].replace("", pd.NA)
+        by_region = exp.reindex(pd.MultiIndex.from_arrays([df["product_id"], rid])).to_numpy()
+        by_product = exp.reindex(pd.MultiIndex.from_arrays([df["product_id"], pd.Series("", index=df.index)])).to_numpy()
+        return pd.Series(by_region, index=df.index).fillna(pd.Series(by_product, index=df.index)).fillna(fallback).astype("string")
+
+    def _normalize(self, new: pd.DataFrame) -> pd.DataFrame:
+        new["schema_price_num"] = parse_prices(new["schema_price"], new["market"])
+        new["visual_price_num"] = parse_prices(new["visual_price"], new["market"])
+        new["schema_avail_norm"] = normalize_availability(new["schema_availability"])
+        try:
+            trans, self.config_error = config_cache.translations(self.trans_path), None
+        except config_cache.ConfigError as e:
+            # 번역 설정이 깨져 있으면 CTA 원문 그대로 비교 (가격 비교는 계속 동작)
+            trans, self.config_error = config_cache.Translations({}, {}), str(e)
+        new["cta_standard"], new["cta_full"] = translate_cta(new["cta_text"], new["market"], trans)
+        # 번역표 결과(InStock 등)를 그대로 사용. 번역되지 않은 CTA 원문은 부분 문자열로 추측하지 않음
+        new["cta_norm"] = new["cta_standard"].astype("string").fillna("").str.strip()
+        new["blocked"] = new["status"].eq("blocked")
+        return new
+
+    def _flush(self):
+        if not self.pending: return
+        new = self._normalize(pd.DataFrame(self.pending, columns=BASE_COLS))
+        self.pending = []
+        df = pd.concat([self.df, new], ignore_index=True) if len(self.df) else new
+        # 같은 리전이 다시 들어오면 (coordinator 재배정 / DB 재조회) 나중 값 사용
+        self.df = df.drop_duplicates(KEY, keep="last").reset_index(drop=True)
+        self.version += 1
+
+    def frame(self, mode: str, default_gmc: str = "", regional: Optional[Dict[str, str]] = None, run_ts: Optional[str] = None,
+              use_expected: bool = True) -> pd.DataFrame:
+        """mode: Price | Availability. 반환 컬럼: Region, GMC, Schema, LG.com, LG.com_Full, Mismatch, Schema_Mismatch (+ product_id, run_ts)"""
+        self._flush()
+        regional = regional or {}
+        key = (self.version, mode, default_gmc, tuple(sorted(regional.items())), run_ts, use_expected)
+        if self._cache and self._cache[0] == key: return self._cache[1]
+        df = self.df if run_ts is None else self.df[self.df["run_ts"].eq(run_ts)]
+        if df.empty: return pd.DataFrame(columns=["run_ts", "product_id", "Region", "GMC", "LG.com", "LG.com_Full", "Schema", "Mismatch", "Schema_Mismatch"])
+        rid = df["region_id"].astype("string").fillna("")
+        # 리전별 GMC 값 (붙여넣은 Regional Inventory) > 기본 GMC 값, 기본 리전은 항상 기본 값
+        gmc = rid.map(regional).where(rid != "").fillna(default_gmc).astype("string")
+        if use_expected: gmc = self._gmc(df, rid, "availability" if mode == "Availability" else "price", gmc)
+        blocked = df["blocked"].astype(bool)
+        if mode == "Availability":
+            gmc = normalize_availability(gmc)
+            lg, lg_full, schema = df["cta_standard"], df["cta_full"], df["schema_availability"]
+            filled = gmc.ne("") & df["cta_norm"].ne("")
+            mismatch = filled & gmc.str.lower().ne(df["cta_norm"].str.lower())
+            schema_mismatch = df["schema_avail_norm"].ne("") & df["cta_norm"].ne("") & df["schema_avail_norm"].str.lower().ne(df["cta_norm"].str.lower())
+        else:
+            gmc_num = parse_prices(gmc, df["market"])
+            lg = lg_full = df["visual_price"]
+            schema = df["schema_price"]
+            mismatch = gmc_num.notna() & df["visual_price_num"].notna() & (gmc_num - df["visual_price_num"]).abs().gt(PRICE_TOL)
+            schema_mismatch = df["schema_price_num"].notna() & df["visual_price_num"].notna() & (df["schema_price_num"] - df["visual_price_num"]).abs().gt(PRICE_TOL)
+        out = pd.DataFrame({
+            "run_ts": df["run_ts"], "product_id": df["product_id"],
+            "Region": rid.mask(rid == "", "Default"), "GMC": gmc,
+            "LG.com": lg.astype("string").mask(blocked, BLOCKED), "LG.com_Full": lg_full.astype("string").mask(blocked, BLOCKED),
+            "Schema": schema.astype("string").mask(blocked, BLOCKED),
+            "Mismatch": (mismatch & ~blocked).astype(bool), "Schema_Mismatch": (schema_mismatch & ~blocked).astype(bool),
+        }).sort_values(["product_id", "Region"], kind="stable").reset_index(drop=True)
+        self._cache = (key, out)
+        return out
+
+
+def row_styles(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """Styler.apply(axis=None) 용: 불일치 행 전체 + schema 불일치 셀 (행마다 Python 함수를 호출하지 않음)"""
+    styles = pd.DataFrame("", index=df.index, columns=columns)
+    styles.loc[df["Mismatch"].to_numpy(), :] = MISMATCH_STYLE
+    if "Schema" in columns:
+        styles["Schema"] = styles["Schema"].mask(df["Schema_Mismatch"] & ~df["Mismatch"], SCHEMA_STYLE)
+    return styles
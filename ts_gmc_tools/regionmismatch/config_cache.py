@@ -0,0 +1,114 @@
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+# translations.json / regions_config.json 을 한 번만 읽고 파일 mtime 이 바뀔 때만 다시 로드
+# 형식 오류는 로드 시점에 ConfigError 로 보고 (이전에 정상 로드된 값이 있으면 그 값을 계속 사용)
+
+
+class ConfigError(ValueError):
+    pass
+
+
+class ConfigFile:
+    def __init__(self, path: Path, build: Callable[[Any], Any], default: Any = None):
+        self.path = path
+        self.build = build
+        self.default = default
+        self.lock = threading.Lock()
+        self.mtime: Optional[float] = None
+        self.value: Any = None
+        self.error: Optional[str] = None
+
+    def get(self) -> Any:
+        try: mtime = self.path.stat().st_mtime
+        except OSError: return self.default
+        with self.lock:
+            if mtime == self.mtime: return self.value
+            try:
+                value = self.build(json.loads(self.path.read_text(encoding="utf-8")))
+            except ValueError as e:  # JSONDecodeError 포함
+                self.error = f"{self.path.name}: {e}"
+                if self.mtime is None: raise ConfigError(self.error) from e
+                print(f"[CONFIG] {self.error} (이전 설정 유지)")
+                return self.value
+            self.mtime, self.value, self.error = mtime, value, None
+            return value
+
+
+def _require(cond: bool, msg: str):
+    if not cond: raise ConfigError(msg)
+
+
+class Translations:
+    """market_map[market] 키를 먼저, 그 다음 global_map 키를 정의 순서대로 검사 (먼저 정의된 키가 우선)"""
+
+    def __init__(self, market_map: Dict[str, Dict[str, str]], global_map: Dict[str, str]):
+        self.market_map = market_map
+        self.global_map = global_map
+        self.matchers: Dict[str, Tuple[Optional[re.Pattern], List[str]]] = {}
+
+    def _matcher(self, market: str) -> Tuple[Optional[re.Pattern], List[str]]:
+        # 키마다 lookahead 하나씩 두고 0번 위치에서 alternation -> 정의 순서상 첫 번째로 포함된 키의 그룹만 매칭됨
+        if market not in self.matchers:
+            pairs = list(self.market_map.get(market, {}).items()) + list(self.global_map.items())
+            pattern = "|".join(f"(?=.*?({re.escape(k)}))" for k, _ in pairs)
+            self.matchers[market] = (re.compile(pattern, re.S) if pairs else None, [v for _, v in pairs])
+        return self.matchers[market]
+
+    def lookup(self, text_clean: str, market: str) -> Optional[str]:
+        rx, values = self._matcher(market)
+        m = rx.match(text_clean) if rx else None
+        return values[m.lastindex - 1] if m else None
+
+
+def build_translations(raw: Any) -> Translations:
+    _require(isinstance(raw, dict), "최상위는 object 여야 합니다")
+    market_map, global_map = raw.get("market_map", {}), raw.get("global_map", {})
+    _require(isinstance(market_map, dict) and isinstance(global_map, dict), "market_map / global_map 은 object 여야 합니다")
+    for where, mapping in [("global_map", global_map)] + [(f"market_map.{m}", v) for m, v in market_map.items()]:
+        _require(isinstance(mapping, dict), f"{where} 는 object 여야 합니다")
+        for k, v in mapping.items():
+            _require(k.strip() != "", f"{where} 에 빈 키가 있습니다")
+            _require(isinstance(v, str) and v != "", f"{where}[{k!r}] 값은 비어 있지 않은 문자열이어야 합니다")
+    return Translations(market_map, global_map)
+
+
+def build_regions(raw: Any) -> Dict[str, Dict]:
+    _require(isinstance(raw, dict), "최상위는 object 여야 합니다")
+    for market, entry in raw.items():
+        _require(isinstance(entry, dict), f"{market} 는 object 여야 합니다")
+        regions = entry.get("regions", [])
+        _require(isinstance(regions, list) and all(isinstance(r, str) for r in regions), f"{market}.regions 는 문자열 배열이어야 합니다")
+        _require(isinstance(entry.get("param", "region_id"), str), f"{market}.param 은 문자열이어야 합니다")
+    return raw
+
+
+_files: Dict[Tuple[str, str], ConfigFile] = {}
+_files_lock = threading.Lock()
+
+
+def _file(path: Path, build: Callable[[Any], Any], default: Any) -> ConfigFile:
+    key = (str(path), build.__name__)
+    with _files_lock:
+        if key not in _files: _files[key] = ConfigFile(path, build, default)
+        return _files[key]
+
+
+def translations(path: Path) -> Translations:
+    return _file(path, build_translations, Translations({}, {})).get()
+
+
+def regions(path: Path) -> Dict[str, Dict]:
+    return _file(path, build_regions, {}).get()
+
+
+def market_from_url(url: str) -> str:
+    """PDP URL -> regions_config.json / translations.json 의 시장 키 (캐나다는 ca_en / ca_fr)"""
+    seg = [s for s in urlparse(url).path.split("/") if s]
+    market = seg[0].lower() if seg else ""
+    if market == "ca" and len(seg) >= 2: market = f"ca_{seg[1].lower()}"
+    return market
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import re
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from playwright_stealth import Stealth
+
+# 컨텍스트 템플릿: 시장 x 브라우저 프로필마다 한 번만 세션을 준비 (동의 배너 수락 + stealth/init script)
+# 그 세션의 storage_state 를 cache/contexts/ 에 저장하고 리전마다 새 context 를 이 스냅샷으로 생성 (리전끼리는 계속 격리)
+# 스냅샷에는 동의 관련 쿠키/localStorage 만 남김 -> 기본 리전에서 받은 지역 선택 쿠키가 다른 리전으로 새지 않게
+# 설정: context_templates.json (ttl_sec 가 지나면 다음 리전에서 다시 준비)
+CONFIG_FILE = "context_templates.json"
+SNAPSHOT_DIR = Path("cache") / "contexts"
+
+DEFAULTS = {
+    "ttl_sec": 21600,
+    "warmup_timeout_ms": 30000,
+    "consent_wait_ms": 6000,
+    "settle_ms": 1000,
+    "consent_selectors": ["#onetrust-accept-btn-handler", ".osano-cm-accept-all", "#truste-consent-button"],
+    "keep_storage": ["optanon", "osano", "consent", "truste", "didomi", "cookielaw"],
+}
+
+# 배너/팝업은 뜨는 즉시 숨김 (force_remove_overlays 를 리전마다 두 번 돌리던 것을 대체)
+OVERLAY_INIT_JS = """
+(selectors) => {
+    const css = selectors.join(',') + '{display:none !important} html,body{overflow:auto !important}';
+    const add = () => {
+        const style = document.createElement('style');
+        style.textContent = css;
+        (document.head || document.documentElement).appendChild(style);
+    };
+    if (document.documentElement) add(); else document.addEventListener('DOMContentLoaded', add);
+}
+"""
+
+_stealth: Optional[Stealth] = None
+_locks: Dict[str, asyncio.Lock] = {}
+
+
+def load_config(script_dir: Path) -> Dict:
+    path = script_dir / CONFIG_FILE
+    cfg = dict(DEFAULTS)
+    if path.exists(): cfg.update(json.loads(path.read_text(encoding="utf-8")))
+    cfg["dir"] = script_dir / SNAPSHOT_DIR
+    return cfg
+
+
+async def install(context, overlay_selectors: List[str]):
+    """context 단위로 stealth + 오버레이 숨김 init script 설치 (페이지마다 Stealth() 를 새로 만들지 않음)"""
+    global _stealth
+    if _stealth is None: _stealth = Stealth()
+    await _stealth.apply_stealth_async(context)
+    await context.add_init_script(script=f"({OVERLAY_INIT_JS})({json.dumps(overlay_selectors)})")
+
+
+def _keep(name: str, patterns: List[str]) -> bool:
+    return not patterns or any(p in name.lower() for p in patterns)
+
+
+def _filter_state(state: Dict, patterns: List[str]) -> Dict:
+    return {
+        "cookies": [c for c in state.get("cookies", []) if _keep(c["name"], patterns)],
+        "origins": [dict(o, localStorage=[kv for kv in o.get("localStorage", []) if _keep(kv["name"], patterns)]) for o in state.get("origins", [])],
+    }
+
+
+async def snapshot(browser, cfg: Dict, market: str, profile_idx: int, warm_url: str, context_kwargs: Dict, overlay_selectors: List[str],
+                   host_throttle=None, refreshed: Optional[set] = None, log: Optional[Callable[[str], None]] = None) -> Optional[str]:
+    """storage_state 스냅샷 경로 (없거나 만료되면 준비). 준비 실패 시 None -> 호출 측은 기존처럼 빈 context 사용
+    refreshed: refresh 실행이면 이번 실행(run_jobs, 배치 전체)에서 이미 다시 준비한 key 집합, 아니면 None"""
+    key = f"{re.sub(r'[^a-z0-9_]', '_', market or 'default')}_{profile_idx}"
+    path = cfg["dir"] / f"{key}.json"
+    lock = _locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        fresh = path.exists() and time.time() - path.stat().st_mtime < cfg["ttl_sec"]
+        if fresh and (refreshed is None or key in refreshed): return str(path)
+        if refreshed is not None: refreshed.add(key)
+        if log: log(f"[PROGRESS] 🔥 Preparing context template {key} ...")
+        t0 = time.perf_counter()
+        context = await browser.new_context(**context_kwargs)
+        try:
+            await install(context, overlay_selectors)
+            page = await context.new_page()
+            if host_throttle is not None: await host_throttle.acquire(log)
+            await page.goto(warm_url, wait_until="domcontentloaded", timeout=cfg["warmup_timeout_ms"])
+            accepted = ""
+            try:
+                # 배너는 init script 로 숨겨져 있으므로 보이는지가 아니라 DOM 에 붙었는지로 기다린 뒤 JS 로 클릭
+                sel = ", ".join(cfg["consent_selectors"])
+                await page.wait_for_selector(sel, state="attached", timeout=cfg["consent_wait_ms"])
+                accepted = await page.evaluate("(s) => { const b = document.querySelector(s); if (!b) return ''; b.click(); return b.id || b.className; }", sel)
+            except Exception:
+                pass
+            await page.wait_for_timeout(cfg["settle_ms"])
+            state = _filter_state(await context.storage_state(), cfg["keep_storage"])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(state), encoding="utf-8")
+            tmp.replace(path)
+            if log: log(f"[PROGRESS] 🔥 Context template {key} ready in {(time.perf_counter() - t0):.1f}s"
+                        f" ({len(state['cookies'])} cookies{', consent accepted' if accepted else ', no consent banner'})")
+            return str(path)
+        except Exception as e:
+            if log: log(f"[PROGRESS] ⚠️ Context template {key} failed: {e}")
+            return str(path) if path.exists() else None
+        finally:
+            await context.close()
@@ -0,0 +1,378 @@
+import argparse
+import json
+import math
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import events
+import metrics
+import region_mismatch as rm
+import results_store
+
+# 샤드 실행: 리전(및 제품)을 조각(chunk)으로 나눠 N 개의 worker.py 프로세스에 분배
+# 샤드마다 자체 Chromium + 자체 프록시. 멈춘 샤드는 취소/재시작 후 남은 리전을 다른 샤드로, 차단된 리전은 다른 프록시로 재배정
+# 결과는 하나의 out_<ts> 폴더 / 하나의 [RESULT_JSON] 스트림 / 하나의 이벤트 스트림으로 병합
+# 실행 예: python coordinator.py --url <PDP> --shards 3 --proxies proxies.json --concurrency 2
+HERE = Path(__file__).resolve().parent
+WORKER = HERE / "worker.py"
+BASE_PORT = 8800
+DETAIL_WAIT_SEC = 5  # [RESULT_JSON](stdout) 보다 늦게 오는 region_result(schema/scrape, 이벤트 소켓)를 기다리는 상한
+# 샤드 워커의 브라우저/프록시는 coordinator 가 정함 (--headless, --proxies/--proxy). 그대로 넘기면 워커가 모든 job 을 400 으로 거부
+SHARD_BROWSER_FLAGS = ("--proxy_pool", "--proxy_server", "--proxy_user", "--proxy_pass", "--headed")
+
+
+def emit(line: str):
+    print(line, flush=True)
+
+
+def load_proxies(args) -> List[Dict]:
+    # proxies.json: [{"server": "http://host:port", "user": "", "pass": ""}, ...] / --proxy server[,user,pass] 반복 가능
+    proxies = []
+    if args.proxies: proxies = json.loads(Path(args.proxies).read_text(encoding="utf-8"))
+    for p in args.proxy:
+        server, user, pw = (p.split(",") + ["", ""])[:3]
+        proxies.append({"server": server, "user": user, "pass": pw})
+    return proxies
+
+
+class Chunk:
+    def __init__(self, product: Dict, regions: List[str]):
+        self.product = product
+        self.regions = regions
+        self.tried: Set[int] = set()  # 이 리전 조각을 맡았던 샤드 (차단 재배정 시 제외)
+        self.tag = ""  # 현재 실행 중인 샤드 job 태그 (--shard, region_result 이벤트의 shard 필드)
+
+
+class Shard:
+    def __init__(self, idx: int, proxy: Optional[Dict], args):
+        self.idx = idx
+        self.proxy = proxy or {}
+        self.port = args.base_port + idx
+        self.args = args
+        self.proc: Optional[subprocess.Popen] = None
+        self.last_seen = time.time()
+        self.job_id: Optional[str] = None
+        self.busy = False
+        self.blocked_strikes = 0
+        self.cooling_until = 0.0
+        self.chunks_done = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def label(self) -> str:
+        return f"shard{self.idx}" + (f"@{self.proxy['server']}" if self.proxy.get("server") else "")
+
+    def start(self):
+        argv = [sys.executable, str(WORKER), "--port", str(self.port), "--browsers", "1", "--headless", self.args.headless]
+        if self.proxy.get("server"):
+            argv += ["--proxy_server", self.proxy["server"], "--proxy_user", self.proxy.get("user", ""), "--proxy_pass", self.proxy.get("pass", "")]
+        self.proc = subprocess.Popen(argv, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT, cwd=str(HERE))
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            if self.proc.poll() is not None: raise RuntimeError(f"{self.label} 시작 실패 (exit {self.proc.returncode})")
+            try:
+                urllib.request.urlopen(f"{self.url}/health", timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.5)
+        raise RuntimeError(f"{self.label} 시작 시간 초과")
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+    def stop(self):
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+            try: self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired: self.proc.kill()
+
+    def cancel(self):
+        if not self.job_id: return
+        try: urllib.request.urlopen(urllib.request.Request(f"{self.url}/jobs/{self.job_id}/cancel", data=b"{}", method="POST"), timeout=3).close()
+        except OSError: pass
+
+    def run_chunk(self, argv: List[str], on_line) -> int:
+        """job 을 제출하고 [JOB_END] 까지 스트림을 읽음. 반환: returncode"""
+        self.job_id, self.last_seen, returncode = None, time.time(), 1
+        req = urllib.request.Request(f"{self.url}/jobs", data=json.dumps({"argv": argv}).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+        try:
+            with urllib.request.urlopen(req) as resp:
+                for raw in resp:
+                    self.last_seen = time.time()
+                    line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+                    if line.startswith("[JOB] "): self.job_id = json.loads(line[6:]).get("id"); continue
+                    if line.startswith("[JOB_END] "): returncode = json.loads(line[10:]).get("returncode", 1); continue
+                    on_line(line)
+        except OSError as e:
+            on_line(f"[PROGRESS] ⚠️ {self.label} 연결 끊김: {e}")
+        finally:
+            self.job_id = None
+        return returncode
+
+
+class Coordinator:
+    def __init__(self, args, passthrough: List[str]):
+        self.args = args
+        self.passthrough = passthrough
+        proxies = load_proxies(args)
+        n = max(args.shards, len(proxies), 1)
+        self.shards = [Shard(i, proxies[i % len(proxies)] if proxies else None, args) for i in range(n)]
+        self.pending: "queue.Queue[Chunk]" = queue.Queue()
+        self.lock = threading.Lock()
+        self.detail_ready = threading.Condition(self.lock)
+        self.outstanding = 0
+        self.all_done = threading.Event()
+        self.products: List[Dict] = []
+        self.details: Dict[tuple, Dict] = {}  # (run_ts, shard 태그, region) -> region_result 이벤트의 schema/scrape
+        self.closed_tags: Set[str] = set()  # 끝난 샤드 job: 늦게 온 region_result 는 버림 (재배정된 리전의 다음 결과와 섞이지 않게)
+        self.chunk_seq = 0
+        self.ev_srv: Optional[socket.socket] = None
+
+    # --- 이벤트 병합: 샤드 이벤트를 받아 run_start/run_end/artifact/region_result/region_error 는 coordinator 가 직접 발행
+    def _on_event(self, ev: Dict):
+        t = ev.pop("type", "")
+        if t == "region_result":
+            with self.detail_ready:
+                if ev.get("shard") in self.closed_tags: return
+                self.details[(ev.get("run_ts"), ev.get("shard", ""), ev["block"].get("region_id", ""))] = ev
+                self.detail_ready.notify_all()
+        elif t not in ("run_start", "run_end", "artifact", "region_error"):
+            for k in ("ts", "seq"): ev.pop(k, None)
+            events.emit_event(t, **ev)
+
+    def _listen_events(self) -> str:
+        self.ev_srv = events.listen(self._on_event)
+        return events.address(self.ev_srv)
+
+    def plan(self, jobs: List[Dict]):
+        # 제품마다 out_<ts> 하나, 리전은 chunk_size 단위로 분할 (작게 나눌수록 재배정이 빠름)
+        for job in jobs:
+            regions, param = rm.target_regions_for(job, HERE)
+            run_ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            product = dict(job, param=param, regions_all=regions, run_ts=run_ts, out_dir=HERE / "outs" / f"out_{run_ts}",
+                           results={}, started=time.perf_counter(), started_at=time.time(), done=threading.Event())
+            product["out_dir"].mkdir(parents=True, exist_ok=True)
+            self.products.append(product)
+            size = self.args.chunk_size or max(1, math.ceil(len(regions) / (len(self.shards) * 2)))
+            for k in range(0, len(regions), size): self._enqueue(Chunk(product, regions[k:k + size]))
+            events.emit_event("run_start", url=job["url"], regions=len(regions), out_dir=str(product["out_dir"]), run_ts=run_ts,
+                              product_id=job.get("product_id", ""), shards=len(self.shards))
+
+    def _enqueue(self, chunk: Chunk):
+        with self.lock: self.outstanding += 1
+        self.pending.put(chunk)
+
+    def _finish_chunk(self):
+        with self.lock:
+            self.outstanding -= 1
+            if self.outstanding == 0: self.all_done.set()
+
+    def _argv(self, chunk: Chunk, shard: Shard, events_addr: str) -> List[str]:
+        p = chunk.product
+        with self.lock:
+            self.chunk_seq += 1
+            tag = chunk.tag = f"s{shard.idx}c{self.chunk_seq}"
+        return ["--url", p["url"], "--product_id", p.get("product_id", ""), "--param", p["param"],
+                "--regions", ",".join(r or "default" for r in chunk.regions), "--exact_regions",
+                "--out_dir", str(p["out_dir"]), "--run_ts", p["run_ts"], "--shard", tag,
+                "--throttle_share", str(len(self.shards)), "--events_addr", events_addr, "--no_open"] + self.passthrough
+
+    def _close_tag(self, tag: str):
+        with self.lock:
+            self.closed_tags.add(tag)
+            for key in [k for k in self.details if k[1] == tag]: del self.details[key]
+
+    def _accept(self, product: Dict, block: Dict, shard: Shard, tag: str):
+        rid = block.get("region_id", "")
+        product["results"][rid] = dict(block, shard=shard.idx)
+        key = (product["run_ts"], tag, rid)
+        with self.detail_ready:
+            # 두 스트림은 도착 순서가 보장되지 않으므로 이 리전의 상세가 올 때까지 대기 (시간 초과 시 상세 없이 전달)
+            if not self.detail_ready.wait_for(lambda: key in self.details, timeout=DETAIL_WAIT_SEC):
+                emit(f"[PROGRESS] ⚠️ [{rid or 'default'}] region_result 상세가 {DETAIL_WAIT_SEC}s 내에 도착하지 않아 상세 없이 전달")
+            detail = self.details.pop(key, {})
+        emit(f"[RESULT_JSON] {json.dumps(block)}")
+        events.emit_event("region_result", block=block, schema=detail.get("schema", {}), scrape=detail.get("scrape", {}),
+                          market=rm.market_from_url(product["url"]), run_ts=product["run_ts"], region=rid or "default",
+                          product_id=product.get("product_id", ""))
+
+    def _fail(self, product: Dict, block: Dict, shard: Optional[Shard]):
+        # 모든 샤드에서 실패한 리전: 결과로 저장하지 않고 에러로 확정 (재배정 종료)
+        rid = block.get("region_id", "")
+        product["results"][rid] = dict(block, shard=shard.idx if shard else None)
+        emit(f"[RESULT_JSON] {json.dumps(block)}")
+        events.emit_event("region_error", block=block, run_ts=product["run_ts"], region=rid or "default", product_id=product.get("product_id", ""))
+
+    def _shard_loop(self, shard: Shard, events_addr: str):
+        while not self.all_done.is_set():
+            if time.time() < shard.cooling_until:
+                time.sleep(1); continue
+            try: chunk = self.pending.get(timeout=0.5)
+            except queue.Empty: continue
+            if shard.idx in chunk.tried and len(chunk.tried) < len(self.shards):
+                # 이 샤드(프록시)에서 이미 차단된 리전 -> 다른 샤드가 가져가도록 되돌림
+                self.pending.put(chunk); time.sleep(0.2); continue
+            chunk.tried.add(shard.idx)
+            shard.busy = True
+            got: Dict[str, Dict] = {}
+
+            def on_line(line: str):
+                if line.startswith("[RESULT_JSON] "):
+                    try: block = json.loads(line[len("[RESULT_JSON] "):])
+                    except ValueError: return
+                    got[block.get("region_id", "")] = block
+                elif line.startswith("[PROGRESS]"):
+                    emit(f"[PROGRESS] [{shard.label}] {line[len('[PROGRESS]'):].strip()}")
+
+            rc = shard.run_chunk(self._argv(chunk, shard, events_addr), on_line)
+            shard.busy = False
+            missing, blocked = [], []
+            # 샤드마다 한 번씩만 시도: 모든 샤드가 맡아 봤으면 더 재배정하지 않음
+            can_retry = len(chunk.tried) < len(self.shards)
+            for rid in chunk.regions:
+                block = got.get(rid)
+                if block is None or block.get("status") == "error":
+                    if can_retry: missing.append(rid)
+                    else: self._fail(chunk.product, block or {"region_id": rid, "status": "error", "error": f"incomplete (rc={rc})"}, shard)
+                elif block.get("status") == "blocked" and can_retry and self.args.reassign_blocked: blocked.append(rid)
+                else: self._accept(chunk.product, block, shard, chunk.tag)
+            # 이 job 의 상세는 더 쓰지 않음 (재배정된 리전은 새 태그로 다시 기다림)
+            self._close_tag(chunk.tag)
+            if blocked:
+                # 같은 프록시로 계속 막히면 이 샤드는 잠시 쉬게 함
+                shard.blocked_strikes += 1
+                if shard.blocked_strikes >= self.args.block_strikes:
+                    shard.cooling_until = time.time() + self.args.cooldown_sec
+                    shard.blocked_strikes = 0
+                    emit(f"[PROGRESS] ⛔ {shard.label} 차단 반복, {self.args.cooldown_sec:.0f}s 휴식")
+                emit(f"[PROGRESS] ↪ {shard.label} 에서 차단된 리전 {','.join(r or 'default' for r in blocked)} 을 다른 샤드로 재배정")
+                retry = Chunk(chunk.product, blocked); retry.tried = set(chunk.tried)
+                self._enqueue(retry)
+            else:
+                shard.blocked_strikes = 0
+            if missing:
+                emit(f"[PROGRESS] ↪ {shard.label} 미완료 리전 {','.join(r or 'default' for r in missing)} 재배정 (rc={rc})")
+                retry = Chunk(chunk.product, missing); retry.tried = set(chunk.tried)
+                self._enqueue(retry)
+                if rc not in (0, -15):
+                    try: shard.restart()
+                    except RuntimeError as e: emit(f"[PROGRESS] ❌ {e}"); shard.cooling_until = time.time() + self.args.cooldown_sec
+            shard.chunks_done += 1
+            self._finish_chunk()
+
+    def _watchdog(self):
+        # 출력이 stall_sec 동안 없으면 job 취소 -> 그래도 안 끝나면 워커 프로세스 재시작 (남은 리전은 재배정됨)
+        while not self.all_done.wait(2):
+            for shard in self.shards:
+                idle = time.time() - shard.last_seen
+                if not shard.busy or idle < self.args.stall_sec: continue
+                if idle < self.args.stall_sec + 15:
+                    emit(f"[PROGRESS] ⚠️ {shard.label} {idle:.0f}s 동안 응답 없음, job 취소")
+                    shard.cancel()
+                else:
+                    emit(f"[PROGRESS] ⚠️ {shard.label} 취소 후에도 멈춤, 워커 재시작")
+                    shard.last_seen = time.time()
+                    shard.stop()
+
+    def finalize(self, store: Optional[results_store.ResultsStore]) -> List[Dict]:
+        entries = []
+        for p in self.products:
+            order = {r: k for k, r in enumerate(p["regions_all"])}
+            blocks = sorted(p["results"].values(), key=lambda b: order.get(b.get("region_id", ""), 1 << 30))
+            out_dir, run_ts = p["out_dir"], p["run_ts"]
+            run_ms = round((time.perf_counter() - p["started"]) * 1000, 1)
+            report_path = out_dir / f"report_{run_ts}.html"
+            rm.generate_html_report(report_path, p.get("product_id", ""), p["url"], blocks)
+            parts = []
+            for f in sorted(out_dir.glob("metrics_*.json")):
+                try: parts.append(dict(json.loads(f.read_text(encoding="utf-8")), shard=f.stem[len("metrics_"):]))
+                except (OSError, ValueError): continue
+                f.unlink()
+            metrics_path = out_dir / metrics.METRICS_FILE
+            metrics_path.write_text(json.dumps(dict(metrics.merge(parts, run_ms), run_ts=run_ts), indent=2, ensure_ascii=False), encoding="utf-8")
+            if store is not None:
+                store.record_run({"run_ts": run_ts, "product_id": p.get("product_id", ""), "url": p["url"], "market": rm.market_from_url(p["url"]),
+                                  "param": p["param"], "out_dir": str(out_dir), "report_path": str(report_path),
+                                  "started_at": p["started_at"], "finished_at": time.time()}, [])
+            emit(f"- Report: {report_path}")
+            emit(f"- Images: {out_dir / 'images'}")
+            events.emit_event("artifact", report=str(report_path), images_dir=str(out_dir / "images"), schema_dir="", run_ts=run_ts,
+                              db=str(store.path) if store is not None else "", metrics=str(metrics_path))
+            events.emit_event("run_end", duration_ms=run_ms, regions=len(blocks), run_ts=run_ts)
+            entries.append({"product_id": p.get("product_id", ""), "url": p["url"], "param": p["param"], "run_ts": run_ts,
+                            "out_dir": str(out_dir), "report": str(report_path), "metrics": str(metrics_path), "schema_dir": "", "regions": blocks})
+        return entries
+
+    def run(self, jobs: List[Dict]) -> List[Dict]:
+        events_addr = self._listen_events()
+        emit(f"[PROGRESS] 샤드 {len(self.shards)}개 시작 중...")
+        started = []
+        for shard in self.shards:
+            try:
+                shard.start(); started.append(shard)
+            except RuntimeError as e:
+                emit(f"[PROGRESS] ❌ {e}")
+        if not started: raise RuntimeError("시작된 샤드가 없습니다")
+        self.shards = started
+        try:
+            self.plan(jobs)
+            if self.outstanding == 0: self.all_done.set()
+            threads = [threading.Thread(target=self._shard_loop, args=(s, events_addr), daemon=True) for s in self.shards]
+            threads.append(threading.Thread(target=self._watchdog, daemon=True))
+            for t in threads: t.start()
+            self.all_done.wait()
+        finally:
+            for shard in self.shards: shard.stop()
+            if self.ev_srv: self.ev_srv.close()
+        store = results_store.ResultsStore(Path(self.args.db) if self.args.db else HERE / "outs" / results_store.DB_NAME)
+        return self.finalize(store)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="리전/제품을 여러 worker.py 프로세스(샤드)로 나눠 실행")
+    ap.add_argument("--url", default="")
+    ap.add_argument("--blob", default="")
+    ap.add_argument("--product_id", default="")
+    ap.add_argument("--regions", default="")
+    ap.add_argument("--param", default="")
+    ap.add_argument("--batch", default="", help="CSV/JSONL 파일 (product_id, url, regions, param)")
+    ap.add_argument("--shards", type=int, default=2, help="샤드(워커 프로세스) 수. 프록시가 더 많으면 프록시 수만큼")
+    ap.add_argument("--proxies", default="", help='프록시 목록 JSON ([{"server", "user", "pass"}])')
+    ap.add_argument("--proxy", action="append", default=[], help="server[,user,pass] (반복 가능)")
+    ap.add_argument("--chunk_size", type=int, default=0, help="한 번에 샤드에 넘길 리전 수 (0: 자동)")
+    ap.add_argument("--stall_sec", type=float, default=180, help="이 시간 동안 출력이 없으면 멈춘 것으로 보고 재배정")
+    ap.add_argument("--reassign_blocked", type=int, default=1, help="차단된 리전을 다른 샤드(프록시)로 재시도 (0: 끔)")
+    ap.add_argument("--block_strikes", type=int, default=2, help="연속 차단 chunk 수가 이만큼이면 샤드 휴식")
+    ap.add_argument("--cooldown_sec", type=float, default=120)
+    ap.add_argument("--base_port", type=int, default=BASE_PORT)
+    ap.add_argument("--headless", default="off", choices=rm.HEADLESS_MODES, help="샤드 워커의 브라우저 모드 (디스플레이 없는 서버: new)")
+    ap.add_argument("--db", default="")
+    ap.add_argument("--events_addr", default="")
+    ap.add_argument("--no_open", action="store_true")
+    args, passthrough = ap.parse_known_args()  # 나머지 인자는 각 샤드의 region_mismatch 로 전달 (--concurrency 등)
+    if not args.url and not args.blob and not args.batch: ap.error("--url, --blob 또는 --batch 중 하나는 필요합니다")
+    bad = [f for f in SHARD_BROWSER_FLAGS if any(a == f or a.startswith(f + "=") for a in passthrough)]
+    if bad: ap.error(f"{', '.join(bad)} 는 샤드에 전달할 수 없습니다 (프록시: --proxies/--proxy, 브라우저 모드: --headless)")
+    if args.events_addr: events.connect(args.events_addr)
+    if args.db: passthrough += ["--db", args.db]
+
+    jobs = rm.load_batch_jobs(Path(args.batch)) if args.batch else rm.build_jobs(args)
+    entries = Coordinator(args, passthrough).run(jobs)
+    if args.batch: rm.write_manifest(args, entries, HERE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import contextvars
+import itertools
+import json
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+# 구조화된 진행 이벤트 채널 (JSON lines). 사람이 읽는 [PROGRESS] 로그(stdout)와 분리된 로컬 소켓으로 전송
+# 이벤트 타입: run_start / run_end / phase_start / phase_end / region_result / artifact / error
+_sink = contextvars.ContextVar("event_sink", default=None)
+_bound = contextvars.ContextVar("event_fields", default={})
+_metrics = contextvars.ContextVar("region_metrics", default=None)
+_default_sink: Optional[Callable[[str], None]] = None
+_seq = itertools.count(1)
+
+
+class SocketSink:
+    """host:port 로 접속해 한 줄에 이벤트 하나씩 전송. 연결이 끊겨도 크롤링은 계속됨"""
+
+    def __init__(self, addr: str):
+        host, port = addr.rsplit(":", 1)
+        self.lock = threading.Lock()
+        self.sock = None
+        try: self.sock = socket.create_connection((host, int(port)), timeout=5)
+        except OSError: pass
+
+    def __call__(self, line: str):
+        if self.sock is None: return
+        with self.lock:
+            try: self.sock.sendall((line + "\n").encode("utf-8"))
+            except OSError:
+                self.close()
+
+    def close(self):
+        if self.sock is not None:
+            try: self.sock.close()
+            except OSError: pass
+            self.sock = None
+
+
+def listen(handler: Callable[[Dict], None], backlog: int = 16) -> socket.socket:
+    """127.0.0.1 임의 포트에서 이벤트 수신 (연결마다 스레드, 이벤트마다 handler(dict)). 주소는 address(srv), 종료는 srv.close()"""
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.bind(("127.0.0.1", 0)); srv.listen(backlog)
+    def serve(conn):
+        with conn, conn.makefile("r", encoding="utf-8", errors="replace") as f:
+            for raw in f:
+                try: ev = json.loads(raw)
+                except ValueError: continue
+                handler(ev)
+    def accept_loop():
+        while True:
+            try: conn, _ = srv.accept()
+            except OSError: return
+            threading.Thread(target=serve, args=(conn,), daemon=True).start()
+    threading.Thread(target=accept_loop, daemon=True).start()
+    return srv
+
+
+def address(srv: socket.socket) -> str:
+    return f"127.0.0.1:{srv.getsockname()[1]}"
+
+
+def connect(addr: str):
+    """프로세스 기본 이벤트 대상 설정 (region_mismatch.py --events_addr)"""
+    global _default_sink
+    _default_sink = SocketSink(addr)
+
+
+def use_sink(sink: Callable[[str], None]):
+    """현재 task(및 하위 task) 에서만 쓰는 이벤트 대상 설정 (worker.py job 단위)"""
+    return _sink.set(sink)
+
+
+def bind(**fields):
+    """이후 현재 task 에서 발생하는 모든 이벤트에 공통 필드(run_ts, region 등)를 붙임"""
+    _bound.set({**_bound.get(), **fields})
+
+
+def collect(metrics: dict):
+    """현재 task 의 phase() 시간과 note() 값을 metrics dict 에 누적 (metrics.RunMetrics.region)"""
+    _metrics.set(metrics)
+
+
+def note(**fields):
+    m = _metrics.get()
+    if m is not None: m.update(fields)
+
+
+def emit_event(type_: str, **fields):
+    sink = _sink.get() or _default_sink
+    if sink is None: return
+    event = {"type": type_, "ts": round(time.time(), 3), "seq": next(_seq)}
+    event.update(_bound.get())
+    event.update(fields)
+    sink(json.dumps(event, ensure_ascii=False, default=str))
+
+
+@contextmanager
+def phase(name: str, **fields):
+    t0 = time.perf_counter()
+    emit_event("phase_start", phase=name, **fields)
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        duration_ms = round((time.perf_counter() - t0) * 1000, 1)
+        m = _metrics.get()
+        if m is not None: m["phases"][name] = round(m["phases"].get(name, 0) + duration_ms, 1)
+        emit_event("phase_end", phase=name, ok=ok, duration_ms=duration_ms, **fields)
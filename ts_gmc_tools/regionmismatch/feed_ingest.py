@@ -0,0 +1,180 @@
+import argparse
+import csv
+import gzip
+import io
+import json
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO
+
+import config_cache
+import results_store
+
+# GMC 피드(XML/RSS/Atom, TSV, CSV, .gz 가능)를 스트리밍으로 읽어 배치 감사 작업(JSONL) + 기대값(results.db expected) 생성
+# 아이템은 하나씩 처리하고 바로 버림 (XML 은 iterparse 후 요소 제거) -> 수만 개 피드도 메모리 일정
+# 링크 -> 시장은 regions_config.json 기준. 지역 재고(regional_inventory / region_id 열)는 제품 x 리전 기대값으로 저장
+# 실행 예: python feed_ingest.py --feed products.xml.gz --regional regional.tsv --markets uk,de
+#          -> outs/feeds/feed_<ts>.jsonl 을 region_mismatch.py / coordinator.py --batch 로 실행
+HERE = Path(__file__).resolve().parent
+FEEDS_DIR = HERE / "outs" / "feeds"
+ITEM_TAGS = {"item", "entry"}
+# 피드/열 이름 변형 -> 표준 이름
+ALIASES = {"item_id": "id", "product_id": "id", "sale price": "sale_price", "region id": "region_id", "store_code": "region_id"}
+FLUSH_ROWS = 1000
+
+
+def _norm_key(name: str) -> str:
+    key = name.strip().lower()
+    if key.startswith("g:"): key = key[2:]
+    key = ALIASES.get(key, key)
+    return key.replace(" ", "_")
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1].lower()
+
+
+def _open_text(path: Path) -> TextIO:
+    raw = gzip.open(path, "rb") if path.suffix.lower() == ".gz" else open(path, "rb")
+    return io.TextIOWrapper(raw, encoding="utf-8-sig", errors="replace", newline="")
+
+
+def _kind(path: Path) -> str:
+    name = path.name.lower()
+    if name.endswith(".gz"): name = name[:-3]
+    if name.endswith((".xml", ".rss", ".atom")): return "xml"
+    if name.endswith((".tsv", ".txt")): return "tsv"
+    if name.endswith(".csv"): return "csv"
+    with _open_text(path) as f: head = f.read(2048).lstrip()
+    return "xml" if head.startswith("<") else ("tsv" if "\t" in head.split("\n", 1)[0] else "csv")
+
+
+def _xml_item(el: ET.Element) -> Dict:
+    item: Dict = {"regional": {}}
+    for child in el:
+        name = _norm_key(_local(child.tag))
+        if name == "regional_inventory":
+            sub = {_norm_key(_local(c.tag)): (c.text or "").strip() for c in child}
+            if sub.get("region_id"): item["regional"][sub.pop("region_id")] = sub
+        elif name == "link" and child.get("href"):  # Atom
+            item.setdefault("link", child.get("href"))
+        elif name not in item:
+            item[name] = (child.text or "").strip()
+    return item
+
+
+def _iter_xml(f: TextIO) -> Iterator[Dict]:
+    stack: List[ET.Element] = []
+    for ev, el in ET.iterparse(f.buffer, events=("start", "end")):
+        if ev == "start":
+            stack.append(el); continue
+        stack.pop()
+        if _local(el.tag) in ITEM_TAGS:
+            yield _xml_item(el)
+            # 처리한 아이템은 트리에서 제거 (root 아래에 쌓이지 않게)
+            if stack: stack[-1].remove(el)
+            el.clear()
+
+
+def _iter_delimited(f: TextIO, delimiter: str) -> Iterator[Dict]:
+    reader = csv.reader(f, delimiter=delimiter)
+    header = [_norm_key(h) for h in next(reader, [])]
+    for values in reader:
+        if not any(values): continue
+        row = dict(zip(header, (v.strip() for v in values)))
+        rid = row.pop("region_id", "")
+        # 지역 재고 피드 형식 (id, region_id, price, availability ...) 은 리전 1행
+        if rid: yield {"id": row.get("id", ""), "regional": {rid: row}, "regional_only": True}
+        else: yield dict(row, regional={})
+
+
+def iter_items(path: Path) -> Iterator[Dict]:
+    """피드 아이템을 하나씩: {id, link, price, sale_price, availability, regional: {region_id: {...}}}"""
+    kind = _kind(path)
+    with _open_text(path) as f:
+        if kind == "xml": yield from _iter_xml(f)
+        else: yield from _iter_delimited(f, "\t" if kind == "tsv" else ",")
+
+
+def expected_row(product_id: str, region_id: str, market: str, link: str, values: Dict, feed: str) -> Dict:
+    return {"product_id": product_id, "region_id": region_id, "market": market, "link": link,
+            "price": values.get("price", ""), "sale_price": values.get("sale_price", ""), "availability": values.get("availability", ""),
+            "feed": feed, "updated_at": time.time()}
+
+
+def ingest(feeds: List[Path], store: results_store.ResultsStore, jobs_path: Path, markets: Optional[set] = None,
+           limit: int = 0, script_dir: Path = HERE, log=print) -> Dict:
+    """피드를 스트리밍으로 읽어 jobs_path(JSONL) 와 store.expected 에 기록. 반환: 통계"""
+    regions_cfg = config_cache.regions(script_dir / "regions_config.json")
+    stats = {"items": 0, "jobs": 0, "regional_rows": 0, "skipped": 0, "unconfigured_market": 0, "filtered": 0, "markets": {}}
+    pending: List[Dict] = []
+    pid_markets: Dict[str, Optional[str]] = {}  # 제품 시장 (--markets 필터용: 이번 실행의 상품 피드 -> 없으면 저장소)
+    jobs_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def flush():
+        if pending: store.record_expected(pending); pending.clear()
+
+    with open(jobs_path, "w", encoding="utf-8") as out:
+        for feed in feeds:
+            for item in iter_items(feed):
+                pid = item.get("id", "")
+                if not pid:
+                    stats["skipped"] += 1; continue
+                if item.get("regional_only"):
+                    # 별도 지역 재고 피드: 기대값만 추가 (감사 리전은 regions_config.json 기준)
+                    # market/link 는 상품 피드에서 저장된 값을 유지 (record_expected). --markets 는 그 시장 기준 (모르는 제품은 제외)
+                    if markets:
+                        if pid not in pid_markets: pid_markets[pid] = store.expected_market(pid)
+                        if pid_markets[pid] not in markets:
+                            stats["filtered"] += 1; continue
+                    for rid, values in item["regional"].items():
+                        pending.append(expected_row(pid, rid, "", "", values, feed.name))
+                        stats["regional_rows"] += 1
+                else:
+                    link = item.get("link", "")
+                    if not link.startswith("http"):
+                        stats["skipped"] += 1; continue
+                    market = config_cache.market_from_url(link)
+                    # 시장 필터는 지역 재고 행에도 적용되지만 --limit 은 작업 수 상한일 뿐 (잘린 제품의 지역 기대값은 유지)
+                    if markets: pid_markets[pid] = market if market in markets else None
+                    if (markets and market not in markets) or (limit and stats["jobs"] >= limit):
+                        stats["filtered"] += 1; continue
+                    if market not in regions_cfg: stats["unconfigured_market"] += 1
+                    stats["items"] += 1
+                    stats["markets"][market] = stats["markets"].get(market, 0) + 1
+                    pending.append(expected_row(pid, "", market, link, item, feed.name))
+                    for rid, values in item["regional"].items():
+                        pending.append(expected_row(pid, rid, market, link, values, feed.name))
+                        stats["regional_rows"] += 1
+                    # 피드에 지역 재고가 있으면 그 리전만, 없으면 regions_config.json 의 리전 전체 (region_mismatch 기본 동작)
+                    out.write(json.dumps({"product_id": pid, "url": link, "regions": ",".join(item["regional"]), "param": ""}, ensure_ascii=False) + "\n")
+                    stats["jobs"] += 1
+                    if stats["items"] % 5000 == 0: log(f"[FEED] {stats['items']} items...")
+                if len(pending) >= FLUSH_ROWS: flush()
+            flush()
+    return stats
+
+
+def main():
+    ap = argparse.ArgumentParser(description="GMC 피드 -> 배치 감사 작업 + 기대값")
+    ap.add_argument("--feed", action="append", required=True, help="상품 피드 (XML/RSS/TSV/CSV, .gz 가능, 반복 가능)")
+    ap.add_argument("--regional", action="append", default=[], help="지역 재고 피드 (id, region_id, price, sale_price, availability)")
+    ap.add_argument("--markets", default="", help="이 시장만 포함 (',' 구분, 예: uk,de,ca_fr)")
+    ap.add_argument("--limit", type=int, default=0, help="최대 작업 수 (0: 전체)")
+    ap.add_argument("--jobs", default="", help="작업 JSONL 경로 (기본: outs/feeds/feed_<ts>.jsonl)")
+    ap.add_argument("--db", default="", help="결과 저장소 SQLite 경로 (기본: outs/results.db)")
+    args = ap.parse_args()
+
+    store = results_store.ResultsStore(Path(args.db) if args.db else HERE / "outs" / results_store.DB_NAME)
+    jobs_path = Path(args.jobs) if args.jobs else FEEDS_DIR / f"feed_{datetime.now():%Y%m%d_%H%M%S}.jsonl"
+    markets = {m.strip().lower() for m in args.markets.split(",") if m.strip()} or None
+    t0 = time.perf_counter()
+    stats = ingest([Path(p) for p in args.feed + args.regional], store, jobs_path, markets, args.limit)
+    print(json.dumps(dict(stats, duration_s=round(time.perf_counter() - t0, 2)), ensure_ascii=False))
+    print(f"- Jobs: {jobs_path}")
+
+
+if __name__ == "__main__":
+    main()
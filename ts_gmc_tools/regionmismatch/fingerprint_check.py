@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import json
+import sys
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from playwright.async_api import async_playwright
+
+import region_mismatch as rm
+
+# 헤드리스 지문 점검: 로컬 테스트 페이지에서 헤드 모드(off)와 헤드리스(new / shell)의 브라우저 신호를 비교
+# 감사와 같은 launch 옵션 / context 옵션 / stealth / 프로필 init script 를 그대로 사용
+# critical 신호가 헤드 모드와 다르면 exit 1 (워커 배포 전 확인용)
+# 실행 예: python fingerprint_check.py --modes off,new,shell
+#          디스플레이 없는 서버: 디스플레이가 있는 PC 에서 --save_baseline 으로 헤드 모드 결과를 저장 -> 서버에서 --baseline 으로 비교
+HERE = Path(__file__).resolve().parent
+BASELINE_FILE = Path("cache") / "fingerprint_headed.json"
+
+# 다르면 봇 탐지에 바로 걸리는 신호 (나머지는 GPU/폰트 등 환경 차이일 수 있어 경고만)
+CRITICAL = {"webdriver", "user_agent", "ua_brands", "ua_platform", "ua_full_versions", "platform", "plugins", "mime_types",
+            "chrome_keys", "outer_size", "screen", "languages", "notification_consistent",
+            "header_user-agent", "header_sec-ch-ua", "header_sec-ch-ua-platform", "header_sec-ch-ua-mobile", "header_accept-language"}
+HEADERS = ["user-agent", "sec-ch-ua", "sec-ch-ua-platform", "sec-ch-ua-mobile", "accept-language", "accept"]
+
+PAGE = b"<!DOCTYPE html><html><head><title>fingerprint</title></head><body><h1>fingerprint check</h1></body></html>"
+
+COLLECT_JS = """
+async () => {
+    const n = navigator, out = {};
+    out.webdriver = String(n.webdriver);
+    out.user_agent = n.userAgent;
+    out.ua_brands = n.userAgentData ? n.userAgentData.brands.map(b => `${b.brand}/${b.version}`).join(', ') : 'none';
+    out.ua_platform = n.userAgentData ? n.userAgentData.platform : 'none';
+    try {
+        const h = await n.userAgentData.getHighEntropyValues(['fullVersionList', 'platformVersion']);
+        out.ua_full_versions = (h.fullVersionList || []).map(b => `${b.brand}/${b.version}`).join(', ');
+    } catch (e) { out.ua_full_versions = 'error'; }
+    out.platform = n.platform;
+    out.languages = (n.languages || []).join(',');
+    out.plugins = n.plugins.length;
+    out.mime_types = n.mimeTypes.length;
+    out.pdf_viewer = String(n.pdfViewerEnabled);
+    out.chrome_keys = window.chrome ? Object.keys(window.chrome).sort().join(',') : 'none';
+    out.outer_size = `${window.outerWidth}x${window.outerHeight}`;
+    out.inner_size = `${window.innerWidth}x${window.innerHeight}`;
+    out.screen = `${screen.width}x${screen.height}`;
+    out.screen_avail = `${screen.availWidth}x${screen.availHeight}`;
+    out.color_depth = screen.colorDepth;
+    out.device_pixel_ratio = window.devicePixelRatio;
+    out.hardware_concurrency = n.hardwareConcurrency;
+    out.device_memory = String(n.deviceMemory);
+    out.timezone = Intl.DateTimeFormat().resolvedOptions().timeZone;
+    try {
+        const perm = await n.permissions.query({name: 'notifications'});
+        // 헤드리스 특유의 불일치: Notification.permission 'denied' + permissions 'prompt'
+        out.notification_consistent = String(!(Notification.permission === 'denied' && perm.state === 'prompt'));
+    } catch (e) { out.notification_consistent = 'error'; }
+    try {
+        const gl = document.createElement('canvas').getContext('webgl');
+        const ext = gl.getExtension('WEBGL_debug_renderer_info');
+        out.webgl_vendor = gl.getParameter(ext.UNMASKED_VENDOR_WEBGL);
+        out.webgl_renderer = gl.getParameter(ext.UNMASKED_RENDERER_WEBGL);
+    } catch (e) { out.webgl_vendor = out.webgl_renderer = 'none'; }
+    const v = document.createElement('video');
+    out.codec_h264 = v.canPlayType('video/mp4; codecs="avc1.42E01E"') || 'no';
+    return out;
+}
+"""
+
+
+def start_server() -> ThreadingHTTPServer:
+    seen: Dict[str, Dict[str, str]] = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *a): pass
+
+        def do_GET(self):
+            # /check/<mode> 문서 요청의 헤더를 기록
+            if self.path.startswith("/check/"):
+                seen[self.path.rsplit("/", 1)[-1]] = {h: self.headers.get(h, "") for h in HEADERS}
+            self.send_response(200 if self.path.startswith("/check/") else 404)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    srv.seen = seen
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+async def collect(p, mode: str, profile: Dict, base_url: str, srv) -> Dict:
+    browser = await p.chromium.launch(**rm.launch_options(mode))
+    try:
+        context = await browser.new_context(**rm.context_options(profile))
+        await rm.prepare_context(context, profile)
+        page = await context.new_page()
+        await rm.Stealth().apply_stealth_async(page)
+        await page.goto(f"{base_url}/check/{mode}", wait_until="load")
+        signals = await page.evaluate(COLLECT_JS)
+        signals.update({f"header_{h}": v for h, v in srv.seen.get(mode, {}).items()})
+        signals["browser_version"] = browser.version
+        await context.close()
+        return signals
+    finally:
+        await browser.close()
+
+
+def compare(reference: Dict, other: Dict) -> List[Dict]:
+    keys = [k for k in reference if k != "browser_version"]
+    return [{"signal": k, "headed": reference.get(k), "value": other.get(k), "critical": k in CRITICAL}
+            for k in keys if reference.get(k) != other.get(k)]
+
+
+async def run_check(modes: List[str], profile: Dict, baseline: Optional[Path], save_baseline: Optional[Path]) -> Dict:
+    srv = start_server()
+    base_url = f"http://127.0.0.1:{srv.server_address[1]}"
+    results: Dict[str, Dict] = {}
+    async with async_playwright() as p:
+        for mode in modes:
+            try:
+                results[mode] = await collect(p, mode, profile, base_url, srv)
+            except Exception as e:
+                # 헤드 모드는 디스플레이가 없으면 실패 -> 저장된 기준값으로 비교
+                print(f"[CHECK] {mode}: 실행 실패 ({str(e).splitlines()[0]})")
+    srv.shutdown()
+
+    reference = results.get("off")
+    if reference is not None and save_baseline:
+        save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        save_baseline.write_text(json.dumps(reference, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"- Baseline saved: {save_baseline}")
+    if reference is None and baseline and baseline.exists():
+        reference = json.loads(baseline.read_text(encoding="utf-8"))
+        print(f"[CHECK] 헤드 모드 기준값: {baseline}")
+    report = {"created": datetime.now().isoformat(timespec="seconds"), "profile": profile["ua"], "signals": results, "diffs": {}}
+    if reference is None:
+        print("[CHECK] 헤드 모드 기준값이 없어 비교하지 않습니다 (디스플레이가 있는 환경에서 --save_baseline 실행)")
+        return report
+    for mode, signals in results.items():
+        if mode == "off": continue
+        report["diffs"][mode] = compare(reference, signals)
+    return report
+
+
+def main():
+    ap = argparse.ArgumentParser(description="헤드리스 모드 지문 점검 (헤드 모드와 비교)")
+    ap.add_argument("--modes", default="off,new", help=f"비교할 모드 (',' 구분, {'/'.join(rm.HEADLESS_MODES)})")
+    ap.add_argument("--profile", type=int, default=0, help="BROWSER_PROFILES 인덱스")
+    ap.add_argument("--baseline", default=str(BASELINE_FILE), help="헤드 모드를 띄울 수 없을 때 쓸 기준값 JSON")
+    ap.add_argument("--save_baseline", action="store_true", help="이번 헤드 모드 결과를 --baseline 경로에 저장")
+    ap.add_argument("--out", default="", help="전체 결과 JSON 경로")
+    args = ap.parse_args()
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip() in rm.HEADLESS_MODES]
+    baseline = Path(args.baseline) if Path(args.baseline).is_absolute() else HERE / args.baseline
+    report = asyncio.run(run_check(modes, rm.BROWSER_PROFILES[args.profile], baseline, baseline if args.save_baseline else None))
+    failed = False
+    for mode, diffs in report["diffs"].items():
+        crit = [d for d in diffs if d["critical"]]
+        failed = failed or bool(crit)
+        print(f"== {mode}: {'FAIL' if crit else 'OK'} ({len(crit)} critical, {len(diffs) - len(crit)} other differences vs headed)")
+        for d in diffs:
+            print(f"  {'!!' if d['critical'] else '  '} {d['signal']:<26} headed={d['headed']!r}  {mode}={d['value']!r}")
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"- Report: {args.out}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+import hashlib
+import heapq
+import itertools
+import json
+import queue
+import statistics
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import events
+import metrics
+
+# worker.py 공유 작업 큐: 여러 Streamlit 세션이 보낸 감사 job 을 우선순위 순으로 최대 max_running 개만 동시에 실행
+# 같은 감사(같은 URL/리전/옵션)가 이미 대기/실행 중이면 새로 띄우지 않고 구독자로 합류 (지금까지의 로그/이벤트를 재생한 뒤 이어서 받음)
+# 대기 중인 구독자에게는 [QUEUE] {"position", "eta_sec"} 줄로 순번/예상 대기 시간을 알림
+# 대기열이 max_queued 를 넘으면 QueueFull (worker 는 HTTP 429)
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+# job 결과에 영향이 없는 인자 (구독자마다 다름) + build_jobs 로 정규화되는 인자
+IGNORED_ARGS = {"events_addr", "no_open", "blob", "url", "product_id", "regions", "param", "batch"}
+DEFAULT_SEC_PER_REGION = 20.0
+EWMA_ALPHA = 0.3
+# 늦게 합류한 구독자에게 재생할 기록 상한 (긴 배치에서도 메모리 고정). phase_* 이벤트는 재생하지 않음
+REPLAY_LINES = 300
+REPLAY_EVENTS = 2000
+PINNED_EVENTS = ("run_start", "artifact", "run_end")
+# 재생 기록이 잘렸으면 먼저 보내는 이벤트: 구독자(app.py)는 실행이 끝난 뒤 results.db 에서 전체 결과를 다시 읽음
+TRUNCATED_EVENT = "replay_truncated"
+
+
+class QueueFull(Exception):
+    pass
+
+
+def _event_type(text: str) -> str:
+    # events.emit_event 출력은 항상 {"type": ... 로 시작 (전체 JSON 파싱 생략)
+    return text[10:text.find('"', 10)] if text.startswith('{"type": "') else ""
+
+
+def job_key(args, jobs: List[Dict]) -> str:
+    """같은 결과를 내는 감사면 같은 키 (리전 순서, 구독자별 인자는 무시)"""
+    norm = [dict(j, regions=",".join(sorted(r.strip() for r in (j.get("regions") or "").split(",") if r.strip()))) for j in jobs]
+    opts = {k: v for k, v in vars(args).items() if k not in IGNORED_ARGS}
+    return hashlib.sha1(json.dumps({"jobs": norm, "opts": opts}, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def seed_sec_per_region(outs_dir: Path) -> float:
+    # 최근 실행들의 리전당 소요 시간 중앙값 (없으면 기본값)
+    rates = [r["duration_ms"] / 1000 / len(r["regions"]) for r in metrics.load_recent(outs_dir, limit=20) if r.get("duration_ms") and r.get("regions")]
+    return statistics.median(rates) if rates else DEFAULT_SEC_PER_REGION
+
+
+class Subscriber:
+    def __init__(self, events_addr: str = "", priority: int = PRIORITIES["normal"]):
+        self.id = uuid.uuid4().hex[:8]
+        self.priority = priority
+        self.lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self.events = events.SocketSink(events_addr) if events_addr else None
+
+    def close(self):
+        self.lines.put(None)
+        if self.events: self.events.close()
+
+
+class QueuedJob:
+    def __init__(self, key: str, argv: List[str], regions: int, priority: int, seq: int):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.argv = argv
+        self.regions = regions
+        self.priority = priority
+        self.seq = seq
+        self.state = "queued"
+        self.submitted_at = time.time()
+        self.started_at = 0.0
+        self.returncode: Optional[int] = None
+        self.future = None
+        self.subscribers: Dict[str, Subscriber] = {}
+        # 늦게 합류한 구독자에게 재생: 최근 로그 줄 / 최근 이벤트 + 실행 상태 이벤트(run_start 등)는 항상 유지
+        self.replay_lines: "deque[str]" = deque(maxlen=REPLAY_LINES)
+        self.replay_events: "deque[str]" = deque(maxlen=REPLAY_EVENTS)
+        self.pinned_events: List[str] = []
+        self.dropped_events = 0
+        self.lock = threading.Lock()
+
+    def sort_key(self) -> Tuple[int, int]:
+        return (self.priority, self.seq)
+
+    def __lt__(self, other: "QueuedJob") -> bool:
+        return self.sort_key() < other.sort_key()
+
+    def add(self, sub: Subscriber):
+        with self.lock:
+            for text in self.replay_lines: sub.lines.put(text)
+            if sub.events:
+                if self.dropped_events: sub.events(json.dumps({"type": TRUNCATED_EVENT, "ts": round(time.time(), 3), "dropped": self.dropped_events}))
+                for text in self.pinned_events + list(self.replay_events): sub.events(text)
+            self.subscribers[sub.id] = sub
+
+    def remove(self, sub_id: str) -> int:
+        with self.lock:
+            sub = self.subscribers.pop(sub_id, None)
+            if sub: sub.close()
+            return len(self.subscribers)
+
+    def line(self, text: str):
+        # region_mismatch emit() 출력 (rm._output_sink)
+        with self.lock:
+            self.replay_lines.append(text)
+            for sub in self.subscribers.values(): sub.lines.put(text)
+
+    def event(self, text: str):
+        # 구조화 이벤트 (events.use_sink)
+        with self.lock:
+            kind = _event_type(text)
+            if kind in PINNED_EVENTS: self.pinned_events.append(text)
+            elif not kind.startswith("phase_"):
+                if len(self.replay_events) == REPLAY_EVENTS: self.dropped_events += 1
+                self.replay_events.append(text)
+            for sub in self.subscribers.values():
+                if sub.events: sub.events(text)
+
+    def notify(self, text: str):
+        # 대기열 상태처럼 재생할 필요 없는 줄
+        with self.lock:
+            for sub in self.subscribers.values(): sub.lines.put(text)
+
+    def finish(self, returncode: int):
+        self.returncode, self.state = returncode, "done"
+        with self.lock:
+            for sub in self.subscribers.values():
+                sub.lines.put(f"[JOB_END] {json.dumps({'id': self.id, 'returncode': returncode})}")
+                sub.close()
+            self.subscribers.clear()
+            self.replay_lines.clear()
+            self.replay_events.clear()
+            self.pinned_events.clear()
+
+
+class JobQueue:
+    def __init__(self, max_running: int, max_queued: int, start: Callable[[QueuedJob], None], cancel: Callable[[QueuedJob], None],
+                 sec_per_region: float = DEFAULT_SEC_PER_REGION):
+        self.max_running = max(1, max_running)
+        self.max_queued = max_queued
+        self.start = start
+        self.cancel_running = cancel
+        self.sec_per_region = sec_per_region
+        self.pending: List[QueuedJob] = []
+        self.running: Dict[str, QueuedJob] = {}
+        self.by_key: Dict[str, QueuedJob] = {}
+        self.by_id: Dict[str, QueuedJob] = {}
+        self.seq = itertools.count()
+        self.lock = threading.RLock()
+
+    def submit(self, key: str, argv: List[str], regions: int, sub: Subscriber) -> Tuple[QueuedJob, bool]:
+        """반환: (job, coalesced). 대기열이 가득 차면 QueueFull"""
+        with self.lock:
+            job = self.by_key.get(key)
+            # 취소 중인 job 에는 합류하지 않음 (같은 감사를 다시 제출하면 새 job)
+            coalesced = job is not None and job.state in ("queued", "running")
+            if coalesced:
+                job.add(sub)
+                if sub.priority < job.priority and job.state == "queued":
+                    # 더 급한 구독자가 합류하면 job 우선순위도 올림
+                    job.priority = sub.priority
+                    heapq.heapify(self.pending)
+            else:
+                if len(self.pending) >= self.max_queued:
+                    raise QueueFull(f"{len(self.pending)} jobs queued (max {self.max_queued})")
+                job = QueuedJob(key, argv, regions, sub.priority, next(self.seq))
+                job.add(sub)
+                heapq.heappush(self.pending, job)
+                self.by_key[key], self.by_id[job.id] = job, job
+            self._dispatch()
+            self.announce()
+            return job, coalesced
+
+    def _dispatch(self):
+        while self.pending and len(self.running) < self.max_running:
+            job = heapq.heappop(self.pending)
+            job.state, job.started_at = "running", time.time()
+            self.running[job.id] = job
+            job.notify(f"[QUEUE] {json.dumps({'id': job.id, 'state': 'running', 'position': 0, 'eta_sec': 0})}")
+            self.start(job)
+
+    def finished(self, job: QueuedJob, returncode: int):
+        with self.lock:
+            self.running.pop(job.id, None)
+            self.by_id.pop(job.id, None)
+            if self.by_key.get(job.key) is job: self.by_key.pop(job.key)
+            if returncode == 0 and job.regions and job.started_at:
+                rate = (time.time() - job.started_at) / job.regions
+                self.sec_per_region = (1 - EWMA_ALPHA) * self.sec_per_region + EWMA_ALPHA * rate
+            job.finish(returncode)
+            self._dispatch()
+            self.announce()
+
+    def leave(self, job_id: str, sub_id: Optional[str] = None) -> bool:
+        """구독자 하나가 나감 (sub_id 없으면 job 전체 취소). 남은 구독자가 없으면 job 취소"""
+        with self.lock:
+            job = self.by_id.get(job_id)
+            if job is None: return False
+            if sub_id and job.remove(sub_id) > 0: return True
+            if job.state == "queued":
+                self.pending = [j for j in self.pending if j is not job]
+                heapq.heapify(self.pending)
+                self.by_id.pop(job.id, None)
+                if self.by_key.get(job.key) is job: self.by_key.pop(job.key)
+                job.finish(-15)
+                self.announce()
+            elif job.state == "running":
+                job.state = "cancelling"
+                self.cancel_running(job)
+            return True
+
+    def estimate(self, job: QueuedJob) -> float:
+        return max(1, job.regions) * self.sec_per_region
+
+    def positions(self) -> List[Tuple[QueuedJob, int, float]]:
+        """대기 job 마다 (job, 순번, 예상 대기 초): 실행 중 job 의 남은 시간 + 앞선 job 들을 빈 슬롯에 차례로 배치"""
+        with self.lock:
+            now = time.time()
+            slots = sorted(max(0.0, self.estimate(j) - (now - j.started_at)) for j in self.running.values())
+            slots += [0.0] * (self.max_running - len(slots))
+            heapq.heapify(slots)
+            out = []
+            for pos, job in enumerate(sorted(self.pending, key=QueuedJob.sort_key), 1):
+                wait = heapq.heappop(slots)
+                out.append((job, pos, round(wait)))
+                heapq.heappush(slots, wait + self.estimate(job))
+            return out
+
+    def announce(self):
+        for job, pos, wait in self.positions():
+            job.notify(f"[QUEUE] {json.dumps({'id': job.id, 'state': 'queued', 'position': pos, 'eta_sec': wait, 'running': len(self.running)})}")
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            now = time.time()
+            running = [{"id": j.id, "priority": j.priority, "regions": j.regions, "subscribers": len(j.subscribers),
+                        "elapsed_sec": round(now - j.started_at)} for j in self.running.values()]
+        queued = [{"id": j.id, "priority": j.priority, "regions": j.regions, "subscribers": len(j.subscribers),
+                   "position": pos, "eta_sec": wait} for j, pos, wait in self.positions()]
+        return {"max_running": self.max_running, "max_queued": self.max_queued, "sec_per_region": round(self.sec_per_region, 1),
+                "running": running, "queued": queued}
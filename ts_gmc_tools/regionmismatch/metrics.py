@@ -0,0 +1,121 @@
+import json
+import statistics
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import psutil  # 선택 사항: 브라우저 프로세스 트리 RSS
+except ImportError:
+    psutil = None
+
+import events
+
+# 실행(run) 단위 계측: 리전별 단계 시간 / 재시도 / 응답 코드 / 다운로드 바이트 / 메모리 -> out_<ts>/metrics.json
+# 단계 시간은 events.phase() 가 events.collect() 로 지정된 리전 dict 에 누적
+METRICS_FILE = "metrics.json"
+
+
+def percentile(values: List[float], p: float) -> float:
+    s = sorted(values)
+    return s[min(len(s) - 1, int(round(p / 100 * (len(s) - 1))))]
+
+
+def summarize_phases(regions: List[Dict]) -> Dict[str, Dict]:
+    by_phase: Dict[str, List[float]] = {}
+    for r in regions:
+        for name, ms in r.get("phases", {}).items(): by_phase.setdefault(name, []).append(ms)
+    return {name: {"count": len(v), "mean_ms": round(statistics.mean(v), 1), "p50_ms": round(percentile(v, 50), 1),
+                   "p95_ms": round(percentile(v, 95), 1), "max_ms": round(max(v), 1), "total_ms": round(sum(v), 1)}
+            for name, v in by_phase.items()}
+
+
+async def browser_rss_mb(browser) -> Optional[float]:
+    # CDP 로 브라우저/렌더러 pid 목록을 얻어 RSS 합산 (psutil 없으면 None)
+    if psutil is None or not browser: return None
+    try:
+        cdp = await browser.new_browser_cdp_session()
+        info = await cdp.send("SystemInfo.getProcessInfo")
+        await cdp.detach()
+        total = 0
+        for proc in info.get("processInfo", []):
+            try: total += psutil.Process(proc["id"]).memory_info().rss
+            except Exception: continue
+        return round(total / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+
+async def page_js_heap_mb(page) -> Optional[float]:
+    try:
+        used = await page.evaluate("() => performance.memory ? performance.memory.usedJSHeapSize : null")
+        return round(used / (1024 * 1024), 1) if used else None
+    except Exception:
+        return None
+
+
+class RunMetrics:
+    def __init__(self, run_ts: str, product_id: str, market: str, url: str, concurrency: int):
+        self.data = {"run_ts": run_ts, "product_id": product_id, "market": market, "url": url, "concurrency": concurrency,
+                     "started_at": time.time()}
+        self.regions: Dict[str, Dict] = {}
+
+    def region(self, rid: str, source: str) -> Dict:
+        # 캐시 -> HTTP -> 브라우저 로 넘어가는 리전은 같은 dict 에 단계 시간/총 시간을 이어서 누적
+        m = self.regions.setdefault(rid or "default", {"region": rid or "default", "phases": {}, "attempts": 0, "http_status": None,
+                                                        "bytes_downloaded": 0, "requests": 0, "total_ms": 0.0})
+        m["source"], m["t0"] = source, time.perf_counter()
+        return m
+
+    @contextmanager
+    def track(self, rid: str, source: str):
+        m = self.region(rid, source)
+        events.collect(m)
+        try: yield m
+        finally: self.done(m)
+
+    @staticmethod
+    def done(m: Dict, **fields):
+        m.update(fields)
+        m["total_ms"] = round(m["total_ms"] + (time.perf_counter() - m.pop("t0", time.perf_counter())) * 1000, 1)
+        m["retries"] = max(0, m["attempts"] - 1)
+
+    def write(self, out_dir: Path, duration_ms: float, name: str = METRICS_FILE) -> Path:
+        regions = list(self.regions.values())
+        for m in regions: m.pop("t0", None)
+        rss = [m["browser_rss_mb"] for m in regions if m.get("browser_rss_mb")]
+        payload = dict(self.data, regions=regions, duration_ms=duration_ms, finished_at=time.time(),
+                       browser_rss_mb_peak=max(rss) if rss else None,
+                       bytes_downloaded=sum(m.get("bytes_downloaded", 0) for m in regions),
+                       retries=sum(m.get("retries", 0) for m in regions),
+                       phases=summarize_phases(regions))
+        path = out_dir / name
+        path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+        return path
+
+
+def merge(parts: List[Dict], duration_ms: float) -> Dict:
+    """샤드별 metrics 를 하나로 (같은 리전이 재배정된 경우 나중 기록 사용)"""
+    regions: Dict[str, Dict] = {}
+    for part in sorted(parts, key=lambda p: p.get("finished_at", 0)):
+        for r in part.get("regions", []): regions[r["region"]] = dict(r, shard=part.get("shard", ""))
+    merged = dict(parts[0]) if parts else {}
+    rss = [p["browser_rss_mb_peak"] for p in parts if p.get("browser_rss_mb_peak")]
+    merged.update(regions=list(regions.values()), duration_ms=duration_ms, finished_at=time.time(),
+                  started_at=min((p.get("started_at", 0) for p in parts), default=time.time()),
+                  browser_rss_mb_peak=max(rss) if rss else None, shards=len(parts),
+                  bytes_downloaded=sum(r.get("bytes_downloaded", 0) for r in regions.values()),
+                  retries=sum(r.get("retries", 0) for r in regions.values()),
+                  phases=summarize_phases(list(regions.values())))
+    return merged
+
+
+def load_recent(outs_dir: Path, limit: int = 50) -> List[Dict]:
+    """최근 실행들의 metrics.json (시장별 비교용)"""
+    files = sorted(outs_dir.glob(f"out_*/{METRICS_FILE}"), key=lambda p: p.stat().st_mtime, reverse=True)[:limit]
+    out = []
+    for f in files:
+        try: out.append(json.loads(f.read_text(encoding="utf-8")))
+        except (OSError, ValueError): continue
+    return out
@@ -0,0 +1,234 @@
+import argparse
+import contextlib
+import contextvars
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 프록시 풀: 리전(context)마다 프록시 하나를 빌려 씀 (browser.new_context(proxy=...))
+# 프록시별 성공률 / Access Denied 비율 / 내비게이션 지연 중앙값으로 점수를 매겨 건강하고 빠른 프록시를 우선 선택
+# 연속 실패 시 격리(cooldown, 반복되면 2배씩), 통계는 cache/proxy_stats.json 에 저장해 다음 실행에서 이어서 사용
+# 설정: proxy_pool.example.json 을 proxy_pool.json 으로 복사해 실제 프록시로 채움 (git 제외). 로컬 확인용은 bench/proxy_pool.json
+# 실행 예: python region_mismatch.py --url <PDP> --proxy_pool proxy_pool.json / 통계 확인: python proxy_pool.py
+CONFIG_FILE = "proxy_pool.json"
+STATS_FILE = Path("cache") / "proxy_stats.json"
+LATENCY_WINDOW = 50
+COUNTERS = ("ok", "denied", "errors")
+LOCK_STALE_SEC = 30  # 비정상 종료로 남은 잠금 파일은 이 시간 뒤 무시
+
+DEFAULTS = {
+    "quarantine_after": 3,       # 연속 실패(차단/타임아웃) 횟수
+    "cooldown_sec": 300,         # 첫 격리 시간, 다시 격리될 때마다 2배 (최대 8배)
+    "latency_ref_ms": 3000,      # 이 지연이면 속도 점수 0.5
+    "explore": 0.1,              # 표본이 적은 프록시를 일부러 시도하는 비율
+    "denied_weight": 2.0,        # Access Denied 는 일반 실패보다 크게 감점
+}
+
+# 현재 task(리전)가 쓰고 있는 프록시 (navigate_with_retry 가 시도 결과를 기록)
+_current = contextvars.ContextVar("proxy_lease", default=None)
+
+
+def key_of(entry: Dict) -> str:
+    return f"{entry.get('user', '')}@{entry['server']}" if entry.get("user") else entry["server"]
+
+
+class Proxy:
+    def __init__(self, entry: Dict, saved: Optional[Dict] = None):
+        saved = saved or {}
+        self.server = entry["server"]
+        self.user = entry.get("user", "")
+        self.password = entry.get("pass", "")
+        self.label = entry.get("label") or self.server
+        self.key = key_of(entry)
+        self.ok = int(saved.get("ok", 0))
+        self.denied = int(saved.get("denied", 0))
+        self.errors = int(saved.get("errors", 0))
+        self.latencies = deque(saved.get("latencies_ms", []), maxlen=LATENCY_WINDOW)
+        self.consecutive_failures = int(saved.get("consecutive_failures", 0))
+        self.strikes = int(saved.get("strikes", 0))
+        self.quarantined_until = float(saved.get("quarantined_until", 0))
+        self.in_flight = 0
+        # 저장 시 다른 프로세스 기록과 합치기 위한 마지막 동기화 시점의 카운터 / 그 뒤 새 지연 값
+        self.synced = {c: getattr(self, c) for c in COUNTERS}
+        self.new_latencies: List[float] = []
+
+    @property
+    def samples(self) -> int:
+        return self.ok + self.denied + self.errors
+
+    @property
+    def median_ms(self) -> Optional[float]:
+        return round(statistics.median(self.latencies), 1) if self.latencies else None
+
+    def score(self, settings: Dict) -> float:
+        # 라플라스 보정 성공률 x 속도 점수 (표본이 없으면 0.5 x 0.5)
+        health = (self.ok + 1) / (self.ok + self.denied * settings["denied_weight"] + self.errors + 2)
+        ref = settings["latency_ref_ms"]
+        speed = ref / (ref + (self.median_ms if self.median_ms is not None else ref))
+        return health * speed
+
+    def playwright(self) -> Dict:
+        proxy = {"server": self.server}
+        if self.user: proxy.update(username=self.user, password=self.password)
+        return proxy
+
+    def state(self, settings: Dict) -> Dict:
+        n = self.samples
+        return {"label": self.label, "server": self.server, "samples": n,
+                "success_rate": round(self.ok / n, 3) if n else None, "denied_rate": round(self.denied / n, 3) if n else None,
+                "median_ms": self.median_ms, "score": round(self.score(settings), 3),
+                "quarantined_sec": max(0, round(self.quarantined_until - time.time())), "in_flight": self.in_flight}
+
+    def to_json(self) -> Dict:
+        return {"ok": self.ok, "denied": self.denied, "errors": self.errors, "latencies_ms": list(self.latencies),
+                "consecutive_failures": self.consecutive_failures, "strikes": self.strikes,
+                "quarantined_until": self.quarantined_until, "updated_at": time.time()}
+
+
+class ProxyPool:
+    def __init__(self, entries: List[Dict], settings: Optional[Dict] = None, stats_path: Optional[Path] = None):
+        self.settings = dict(DEFAULTS, **(settings or {}))
+        self.stats_path = stats_path
+        saved = {}
+        if stats_path and stats_path.exists():
+            try: saved = json.loads(stats_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError): saved = {}
+        self.proxies = [Proxy(e, saved.get(key_of(e))) for e in entries]
+        self.lock = threading.Lock()
+
+    def acquire(self, log=None) -> Proxy:
+        with self.lock:
+            now = time.time()
+            live = [p for p in self.proxies if p.quarantined_until <= now]
+            if not live:
+                # 전부 격리 중이면 가장 먼저 풀리는 프록시를 조기 투입 (실행을 멈추지는 않음)
+                p = min(self.proxies, key=lambda x: x.quarantined_until)
+                if log: log(f"[PROGRESS] ⚠️ All proxies quarantined, using {p.label} early")
+                p.quarantined_until = 0
+                live = [p]
+            fresh = [p for p in live if p.samples < 5]
+            if fresh and random.random() < self.settings["explore"]:
+                p = random.choice(fresh)
+            else:
+                # 점수^2 가중 랜덤 + 사용 중인 context 수로 나눠 한 프록시에 몰리지 않게
+                weights = [(p.score(self.settings) ** 2) / (1 + p.in_flight) for p in live]
+                p = random.choices(live, weights=weights)[0]
+            p.in_flight += 1
+            return p
+
+    def release(self, proxy: Proxy):
+        with self.lock: proxy.in_flight = max(0, proxy.in_flight - 1)
+
+    def record(self, proxy: Proxy, kind: str, latency_ms: Optional[float] = None, log=None):
+        # kind: ok | denied | error
+        with self.lock:
+            if kind == "ok":
+                proxy.ok += 1
+                proxy.consecutive_failures = 0
+                proxy.strikes = 0
+                if latency_ms is not None:
+                    proxy.latencies.append(round(latency_ms, 1))
+                    proxy.new_latencies.append(round(latency_ms, 1))
+                return
+            if kind == "denied": proxy.denied += 1
+            else: proxy.errors += 1
+            proxy.consecutive_failures += 1
+            if proxy.consecutive_failures >= self.settings["quarantine_after"]:
+                cooldown = self.settings["cooldown_sec"] * min(8, 2 ** proxy.strikes)
+                proxy.quarantined_until = time.time() + cooldown
+                proxy.strikes += 1
+                # half-open: 격리 해제 후 첫 시도가 다시 실패하면 바로 재격리
+                proxy.consecutive_failures = self.settings["quarantine_after"] - 1
+                if log: log(f"[PROGRESS] ⛔ Proxy {proxy.label} quarantined {cooldown:.0f}s after repeated {kind}")
+
+    def save(self):
+        if not self.stats_path: return
+        # CLI / worker 실행이 동시에 끝나도 서로의 통계를 잃지 않게: 파일 잠금 아래에서 다시 읽고
+        # 카운터는 이번 실행에서 늘어난 만큼만 더함 (다른 프로세스가 같은 프록시를 썼어도 합산), 상태(격리 등)는 이 실행 값
+        self.stats_path.parent.mkdir(parents=True, exist_ok=True)
+        with _file_lock(self.stats_path.with_suffix(".lock")), self.lock:
+            data = {}
+            if self.stats_path.exists():
+                try: data = json.loads(self.stats_path.read_text(encoding="utf-8"))
+                except (OSError, ValueError): data = {}
+            for p in self.proxies:
+                disk = data.get(p.key, {})
+                for c in COUNTERS:
+                    setattr(p, c, int(disk.get(c, p.synced[c])) + getattr(p, c) - p.synced[c])
+                if disk: p.latencies = deque(list(disk.get("latencies_ms", [])) + p.new_latencies, maxlen=LATENCY_WINDOW)
+                p.synced, p.new_latencies = {c: getattr(p, c) for c in COUNTERS}, []
+                data[p.key] = p.to_json()
+            tmp = self.stats_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+            os.replace(tmp, self.stats_path)
+
+    def summary(self) -> List[Dict]:
+        with self.lock: return sorted((p.state(self.settings) for p in self.proxies), key=lambda s: -s["score"])
+
+
+@contextlib.contextmanager
+def _file_lock(path: Path, timeout: float = 10):
+    # 프로세스 간 잠금 (O_EXCL 로 잠금 파일 생성). 시간 안에 못 얻으면 잠금 없이 진행 (통계 저장이 실행을 막지 않게)
+    deadline = time.monotonic() + timeout
+    fd = None
+    while fd is None:
+        try: fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - path.stat().st_mtime > LOCK_STALE_SEC: path.unlink()
+            except OSError: pass
+            if time.monotonic() > deadline: break
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        if fd is not None:
+            os.close(fd)
+            try: path.unlink()
+            except OSError: pass
+
+
+def load(path: Path, script_dir: Path) -> Optional[ProxyPool]:
+    # proxy_pool.json: {"proxies": [{"server", "user", "pass", "label"}], "settings": {...}}
+    if not path.is_absolute(): path = script_dir / path
+    cfg = json.loads(path.read_text(encoding="utf-8"))
+    entries = [e for e in cfg.get("proxies", []) if e.get("server")]
+    if not entries: return None
+    return ProxyPool(entries, cfg.get("settings"), script_dir / STATS_FILE)
+
+
+def use(proxy: Optional[Proxy], pool: Optional[ProxyPool]):
+    _current.set((proxy, pool) if proxy else None)
+
+
+def record(kind: str, latency_ms: Optional[float] = None, log=None):
+    lease = _current.get()
+    if lease: lease[1].record(lease[0], kind, latency_ms, log)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="프록시 풀 상태 (cache/proxy_stats.json)")
+    ap.add_argument("--config", default=CONFIG_FILE)
+    args = ap.parse_args()
+    script_dir = Path(__file__).resolve().parent
+    path = Path(args.config) if Path(args.config).is_absolute() else script_dir / args.config
+    if not path.exists():
+        print(f"{path.name} 이 없습니다 (proxy_pool.example.json 을 복사해 작성)")
+        return
+    pool = load(path, script_dir)
+    if pool is None:
+        print("프록시가 설정되어 있지 않습니다")
+        return
+    for s in pool.summary():
+        q = f"  quarantined {s['quarantined_sec']}s" if s["quarantined_sec"] else ""
+        print(f"{s['label']:<32} score {s['score']:.3f}  n={s['samples']:<5} ok={s['success_rate']}  denied={s['denied_rate']}  p50={s['median_ms']}ms{q}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import json
+import time
+from pathlib import Path
+from typing import Dict
+
+# PDP 준비 상태 판단: 고정 sleep 대신 신호(JSON-LD, 가격/CTA 노출, DOM 변화 멈춤)로 판단
+# 마켓별 프로필은 readiness_config.json 의 "markets" 가 "default" 를 덮어씀
+CONFIG_FILE = "readiness_config.json"
+
+READY_JS = """
+(opts) => new Promise((resolve) => {
+    const start = performance.now();
+    let lastMutation = start;
+    const observer = new MutationObserver(() => { lastMutation = performance.now(); });
+    // 속성 변화(캐러셀/lazy 이미지/애니메이션)는 제외: 노드 추가/텍스트 변경만 DOM 변화로 봄
+    observer.observe(document.documentElement, { childList: true, subtree: true, characterData: true });
+
+    const visible = (sel) => Array.from(document.querySelectorAll(sel)).some((el) => {
+        const r = el.getBoundingClientRect();
+        const cs = getComputedStyle(el);
+        return r.width > 0 && r.height > 0 && cs.visibility !== 'hidden' && cs.display !== 'none';
+    });
+    const signals = () => {
+        const now = performance.now();
+        const s = {
+            jsonld: document.querySelector('script[type="application/ld+json"]') !== null,
+            price: opts.priceSelectors.some(visible),
+            cta: opts.ctaSelectors.some(visible),
+            quiet: now - lastMutation >= opts.quietMs,
+        };
+        s.ready = (!opts.requireJsonld || s.jsonld) && (!opts.requirePriceOrCta || s.price || s.cta) && s.quiet;
+        return s;
+    };
+    const finish = (capped) => {
+        clearInterval(timer);
+        observer.disconnect();
+        const s = signals();
+        resolve({ ...s, capped, elapsed_ms: Math.round(performance.now() - start) });
+    };
+    const timer = setInterval(() => {
+        if (signals().ready) finish(false);
+        else if (performance.now() - start >= opts.maxWaitMs) finish(true);
+    }, opts.pollMs);
+})
+"""
+
+
+def load_profile(market: str, script_dir: Path) -> Dict:
+    cfg = json.loads((script_dir / CONFIG_FILE).read_text(encoding="utf-8"))
+    profile = dict(cfg.get("default", {}))
+    profile.update(cfg.get("markets", {}).get(market, {}))
+    profile["price_selectors"] = cfg.get("price_selectors", [])
+    profile["cta_selectors"] = cfg.get("cta_selectors", [])
+    profile["market"] = market
+    return profile
+
+
+async def wait_until_ready(page, profile: Dict) -> Dict:
+    """신호가 모두 충족되거나 max_wait_ms 에 도달할 때까지 대기. 실제 대기 시간과 신호 상태를 반환"""
+    t0 = time.perf_counter()
+    opts = {
+        "quietMs": profile.get("quiet_ms", 500),
+        "maxWaitMs": profile.get("max_wait_ms", 8000),
+        "pollMs": profile.get("poll_ms", 100),
+        "requireJsonld": profile.get("require_jsonld", True),
+        "requirePriceOrCta": profile.get("require_price_or_cta", True),
+        "priceSelectors": profile.get("price_selectors", []),
+        "ctaSelectors": profile.get("cta_selectors", []),
+    }
+    try:
+        result = await page.evaluate(READY_JS, opts)
+    except Exception as e:
+        # 리다이렉트 등으로 실행 컨텍스트가 사라진 경우: 남은 시간만큼 load 이벤트를 기다리고 종료
+        remaining = max(0, opts["maxWaitMs"] - int((time.perf_counter() - t0) * 1000))
+        try: await page.wait_for_load_state("load", timeout=remaining)
+        except Exception: pass
+        result = {"ready": False, "capped": True, "error": str(e)}
+    result["wall_ms"] = int((time.perf_counter() - t0) * 1000)
+    return result
+
+
+def describe(result: Dict) -> str:
+    mark = lambda k: "✓" if result.get(k) else "✗"
+    head = "Ready" if result.get("ready") else "Not ready (cap)"
+    return f"{head} in {result.get('wall_ms', 0)}ms (jsonld={mark('jsonld')} price={mark('price')} cta={mark('cta')} quiet={mark('quiet')})"
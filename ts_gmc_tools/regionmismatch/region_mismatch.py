@@ -1,5 +1,7 @@
 import argparse
+import csv
 import json
+import shutil
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Dict, Tuple, List
@@ -8,13 +10,37 @@ import re
 import sys
 import time
 import random
+import asyncio
+import contextvars
 
-from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
 from playwright_stealth import Stealth
 
+import asset_cache
+import config_cache
+import context_templates
+import events
+import metrics
+import proxy_pool
+import readiness
+import resource_policy
+import result_cache
+import results_store
+import schema_fetch
+import screenshots
+import throttle
+
 # 윈도우/리눅스 출력 인코딩 강제 설정
 sys.stdout.reconfigure(encoding='utf-8', line_buffering=True)
 
+# 진행 로그 출력 대상 (기본: stdout). worker.py 에서는 job 별 스트림으로 교체됨
+_output_sink = contextvars.ContextVar("output_sink", default=None)
+
+def emit(line: str) -> None:
+    sink = _output_sink.get()
+    if sink is not None: sink(line)
+    else: print(line, flush=True)
+
 def set_query_param(url: str, key: str, value: str) -> str:
     if value is None or str(value).strip() == "": return url
     u = urlparse(url)
@@ -42,317 +68,802 @@ def parse_product_blob(blob: str) -> Tuple[Optional[str], Optional[str]]:
                 break
     return product_id, url
 
+def market_from_url(url: str) -> str:
+    # feed_ingest 등 브라우저 없이 쓰는 모듈과 같은 규칙 (config_cache)
+    return config_cache.market_from_url(url)
+
 def resolve_regions_param(url: str, script_dir: Path) -> Tuple[List[str], str]:
-    cfg_path = script_dir / "regions_config.json"
-    if not cfg_path.exists(): return [], "region_id"
-    try:
-        cfg = json.loads(cfg_path.read_text(encoding="utf-8"))
-    except: return [], "region_id"
-    u = urlparse(url)
-    seg = [s for s in u.path.split("/") if s]
-    market = seg[0].lower() if seg else ""
-    if market == "ca" and len(seg) >= 2: market = f"ca_{seg[1].lower()}"
-    entry = cfg.get(market) or {}
+    # [수정] mtime 이 바뀔 때만 다시 읽음. 형식 오류는 ConfigError 로 보고 (파일 없음 = 기본값)
+    entry = config_cache.regions(script_dir / "regions_config.json").get(market_from_url(url)) or {}
     return entry.get("regions", []), entry.get("param", "region_id")
 
-def force_remove_overlays(page) -> None:
+# [Task 5] 일관성 있는 랜덤 프로필 리스트 (UA + Client Hints 매칭)
+BROWSER_PROFILES = [
+    {
+        "ua": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
+        "sec_ch_ua": '"Chromium";v="124", "Google Chrome";v="124", "Not-A.Brand";v="99"'
+    },
+    {
+        "ua": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
+        "sec_ch_ua": '"Chromium";v="123", "Google Chrome";v="123", "Not-A.Brand";v="99"'
+    },
+    {
+        "ua": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+        "sec_ch_ua": '"Chromium";v="122", "Google Chrome";v="122", "Not-A.Brand";v="99"'
+    },
+    {
+        "ua": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+        "sec_ch_ua": '"Chromium";v="121", "Google Chrome";v="121", "Not-A.Brand";v="99"'
+    }
+]
+
+OVERLAY_SELECTORS = [
+    '#onetrust-banner-sdk', '.c-pop-msg__dimmed', '.c-pop-msg',
+    '#popEhfPopup', '#popNotifyMeSuccess', '#popStockAlert',
+    '.cookie-banner', '.bv_mbox', 'div[class*="dimmed"]', 'div[class*="backdrop"]',
+    '.osano-cm-window', '#credential_picker_container', 'iframe[title*="recaptcha"]'
+]
+
+async def force_remove_overlays(page) -> None:
     try:
-        page.evaluate("""
-        () => {
-            const selectors = [
-                '#onetrust-banner-sdk', '.c-pop-msg__dimmed', '.c-pop-msg',
-                '#popEhfPopup', '#popNotifyMeSuccess', '#popStockAlert',
-                '.cookie-banner', '.bv_mbox', 'div[class*="dimmed"]', 'div[class*="backdrop"]',
-                '.osano-cm-window', '#credential_picker_container', 'iframe[title*="recaptcha"]'
-            ];
+        await page.evaluate("""
+        (selectors) => {
             selectors.forEach(sel => {
                 document.querySelectorAll(sel).forEach(el => el.remove());
             });
             document.documentElement.style.overflow = 'auto';
             document.body.style.overflow = 'auto';
         }
-        """)
+        """, OVERLAY_SELECTORS)
     except: pass
 
-def simulate_user_interaction(page, log_prefix):
-    print(f"[PROGRESS] {log_prefix} Triggering lazy load...", flush=True)
+async def simulate_user_interaction(page, log_prefix, humanlike: bool = False):
+    emit(f"[PROGRESS] {log_prefix} Triggering lazy load...")
     try:
-        page.mouse.wheel(0, 500)
-        time.sleep(0.5)
-        page.mouse.wheel(0, -500)
-        time.sleep(0.5)
-        try:
-            page.wait_for_load_state("networkidle", timeout=3000)
-        except: pass
+        # [수정] 고정 대기(0.5s x2, networkidle 3s) 제거 - 로딩 완료는 readiness 에서 판단
+        await page.mouse.wheel(0, 500)
+        if humanlike: await asyncio.sleep(0.5)
+        await page.mouse.wheel(0, -500)
+        if humanlike: await asyncio.sleep(0.5)
     except: pass
 
-def screenshot_first_view(page, url: str, out_path: Path, log_prefix: str) -> Tuple[bool, str]:
-    # [수정] 최대 3번 재시도 (Retry) 로직 추가
-    max_retries = 3
-    success = False
-    
+async def navigate_with_retry(page, url: str, log_prefix: str, host_throttle) -> str:
+    """ok | failed | blocked | circuit_open. 재시도/대기/타임아웃은 호스트별 throttle 설정을 따름"""
+    max_retries = host_throttle.max_retries
     for attempt in range(1, max_retries + 1):
         try:
-            print(f"[PROGRESS] {log_prefix} Navigating (Attempt {attempt}/{max_retries})...", flush=True)
-            
-            # [수정] 타임아웃 90초로 증가 (네트워크 느림 대비)
-            page.goto(url, wait_until="domcontentloaded", timeout=90000)
-            
-            # 페이지가 떴으면 성공으로 간주하고 루프 탈출
-            success = True
-            break 
-        except Exception as e:
-            print(f"[PROGRESS] {log_prefix} ⚠️ Timeout/Error on attempt {attempt}: {e}", flush=True)
-            if attempt < max_retries:
-                print(f"[PROGRESS] {log_prefix} 🔄 Retrying in 5 seconds...", flush=True)
-                time.sleep(5)
+            await host_throttle.acquire(emit, log_prefix)
+        except throttle.CircuitOpenError as e:
+            emit(f"[PROGRESS] {log_prefix} ⛔ Skipped: {e}")
+            return "circuit_open"
+        try:
+            emit(f"[PROGRESS] {log_prefix} Navigating (Attempt {attempt}/{max_retries})...")
+            t_nav = time.perf_counter()
+            resp = await page.goto(url, wait_until="domcontentloaded", timeout=host_throttle.goto_timeout_ms)
+            nav_ms = (time.perf_counter() - t_nav) * 1000
+            status = resp.status if resp else 0
+            events.note(attempts=attempt, http_status=status)
+            # [수정] Access Denied 는 로그만 남기지 않고 실패로 집계 (서킷 브레이커 / 결과에 blocked 표시)
+            if schema_fetch.is_blocked(status, await page.content()):
+                host_throttle.record_failure("denied", emit)
+                proxy_pool.record("denied", log=emit)
+                emit(f"[PROGRESS] {log_prefix} ⚠️ Access Denied (HTTP {status}) on attempt {attempt}")
+                if attempt == max_retries: return "blocked"
             else:
-                print(f"[PROGRESS] {log_prefix} ❌ Failed after {max_retries} attempts.", flush=True)
-
-    # 실패했더라도 스크린샷은 시도해봄 (에러 화면이라도 찍히게)
-    
-    time.sleep(random.uniform(2.0, 4.0)) # 봇 회피 대기
+                host_throttle.record_success()
+                proxy_pool.record("ok", nav_ms)
+                return "ok"
+        except Exception as e:
+            events.note(attempts=attempt)
+            host_throttle.record_failure("timeout", emit)
+            proxy_pool.record("error", log=emit)
+            emit(f"[PROGRESS] {log_prefix} ⚠️ Timeout/Error on attempt {attempt}: {e}")
+            if attempt == max_retries:
+                emit(f"[PROGRESS] {log_prefix} ❌ Failed after {max_retries} attempts.")
+                return "failed"
+        delay = host_throttle.backoff(attempt)
+        emit(f"[PROGRESS] {log_prefix} 🔄 Retrying in {delay:.1f} seconds...")
+        await asyncio.sleep(delay)
+    return "failed"
+
+async def screenshot_first_view(page, url: str, out_path: Path, log_prefix: str, ready_profile: Dict, host_throttle, shots, humanlike: bool = False, prewarmed: bool = False) -> Tuple[bool, str, Optional[asyncio.Future]]:
+    # 세 번째 값: 스크린샷 저장 작업 (스레드 풀에서 인코딩/쓰기 중, 호출 측에서 추출 후 await)
+    # prewarmed: 컨텍스트 템플릿 사용 (동의 완료 + 오버레이 숨김 init script) -> 오버레이 제거 단계 생략
+    with events.phase("navigate"):
+        nav = await navigate_with_retry(page, url, log_prefix, host_throttle)
+    if nav != "ok": events.emit_event("error", kind=nav, url=url)
+    # [수정] 타임아웃/서킷 열림은 페이지가 없으므로 대기/추출 없이 호출 측에서 에러로 기록
+    if nav in ("failed", "circuit_open"): return False, nav, None
+    if nav == "blocked":
+        # 차단 화면은 증거용으로만 캡처하고 추출/대기는 건너뜀
+        try: return False, "blocked", asyncio.ensure_future(shots.save(await page.screenshot(full_page=False), out_path))
+        except Exception: return False, "blocked", None
+
+    if humanlike: await asyncio.sleep(random.uniform(2.0, 4.0)) # 봇 회피 대기 (--humanlike 일 때만)
     
-    # Access Denied 체크 (로그만)
-    try:
-        content = page.content()
-        if "Access Denied" in content:
-             print(f"[PROGRESS] {log_prefix} ⚠️ Warning: Access Denied Page Detected!", flush=True)
-    except: pass
-
-    force_remove_overlays(page)
-    simulate_user_interaction(page, log_prefix)
-
-    print(f"[PROGRESS] {log_prefix} Waiting for content...", flush=True)
-    try:
-        page.wait_for_selector(".price-top, .price-box--price, .cell-price, .amount, .c-price__purchase", state="visible", timeout=5000)
-    except: pass 
-
-    page.wait_for_timeout(1000)
-    force_remove_overlays(page)
-
-    print(f"[PROGRESS] {log_prefix} Taking screenshot...", flush=True)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
+    if not prewarmed:
+        with events.phase("overlay_removal"):
+            await force_remove_overlays(page)
+    with events.phase("lazy_load"):
+        await simulate_user_interaction(page, log_prefix, humanlike)
+
+    # [수정] 고정 대기 대신 신호 기반 준비 판단 (JSON-LD / 가격·CTA 노출 / DOM 변화 멈춤, 상한 있음)
+    emit(f"[PROGRESS] {log_prefix} Waiting for content...")
+    with events.phase("ready"):
+        ready = await readiness.wait_until_ready(page, ready_profile)
+    emit(f"[PROGRESS] {log_prefix} {readiness.describe(ready)}")
+    if not prewarmed: await force_remove_overlays(page)
+
+    emit(f"[PROGRESS] {log_prefix} Taking screenshot...")
     try:
-        page.screenshot(path=str(out_path), full_page=False)
+        with events.phase("screenshot"):
+            data = await page.screenshot(full_page=False)
     except Exception as e:
-        return False, f"Screenshot failed: {e}"
+        events.emit_event("error", kind="screenshot", message=str(e))
+        return False, f"Screenshot failed: {e}", None
 
-    if not out_path.exists() or out_path.stat().st_size < 1000:
-        return False, "Screenshot empty"
+    # [수정] 파일 쓰기 대신 바이트로 받아 크기 확인 (<1000 bytes = 빈 화면), 인코딩/저장은 백그라운드
+    if len(data) < screenshots.MIN_BYTES:
+        return False, "Screenshot empty", None
     
-    return True, "ok"
+    return True, "ok", asyncio.ensure_future(shots.save(data, out_path))
+
+PRICE_SELECTORS = [
+    ".info-sticky .price-top span", ".price-top span", ".price-box--price .cell-price",
+    ".cell-price.cheaperMA", ".PD0033 .cell-price.cheaperMA", ".price-area .c-price__purchase",
+    ".amount", ".cell-price"
+]
+STICKY_CTA_SELECTOR = ".info-sticky .info-sticky--btn a, .info-sticky .info-sticky--btn button"
+PDP_CTA_SELECTOR = 'a.btn-pdp:not(.hidden) span.button-text, button.btn-pdp:not(.hidden) span.button-text'
+HIGHLIGHT_CTA_SELECTOR = ".cta-wrap .highlight"
+FALLBACK_CTA_KEYWORDS = ["out of stock", "sold out", "esgotado", "unavailable", "stock alert", "where to buy", "comprar", "buy now", "add to cart", "in stock", "pre-order", "reserve now", "vorbestellung", "beli sekarang"]
+
+# [수정] 가격/CTA/JSON-LD 를 한 번의 page.evaluate 로 수집 (기존: 요소마다 is_visible/inner_text 왕복)
+# 우선순위 규칙은 기존 locator 순서와 동일: 가격 selector 순서 -> sticky 버튼 -> PDP 버튼 -> highlight -> 키워드
+EXTRACT_JS = """
+(opts) => {
+    opts.overlays.forEach(sel => document.querySelectorAll(sel).forEach(el => el.remove()));
+    document.documentElement.style.overflow = 'auto';
+    document.body.style.overflow = 'auto';
+
+    const isVisible = (el) => {
+        const r = el.getBoundingClientRect();
+        return r.width > 0 && r.height > 0 && getComputedStyle(el).visibility !== 'hidden';
+    };
+    const text = (el) => (el.innerText || '').trim();
+
+    let priceText = '';
+    for (const sel of opts.priceSelectors) {
+        for (const el of document.querySelectorAll(sel)) {
+            if (!isVisible(el)) continue;
+            const t = text(el);
+            if (t.includes('%') || !/\\d/.test(t)) continue;
+            priceText = t;
+            break;
+        }
+        if (priceText) break;
+    }
+
+    let cta = '', ctaSource = '';
+    const sticky = document.querySelector(opts.stickySelector);
+    if (sticky && isVisible(sticky)) { cta = text(sticky); ctaSource = 'sticky'; }
+    if (!cta) {
+        for (const el of document.querySelectorAll(opts.pdpSelector)) {
+            if (!isVisible(el)) continue;
+            cta = text(el);
+            if (cta) { ctaSource = 'pdp'; break; }
+        }
+    }
+    if (!cta) {
+        const hl = Array.from(document.querySelectorAll(opts.highlightSelector)).find(isVisible);
+        if (hl) { cta = text(hl); ctaSource = 'highlight'; }
+    }
+    if (!cta) {
+        // get_by_text(kw).first 와 같은 의미: 키워드를 포함하는 가장 안쪽 요소 중 문서 순서상 첫 번째
+        const skip = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE', 'HEAD']);
+        const all = Array.from(document.body.querySelectorAll('*')).filter(el => !skip.has(el.tagName));
+        const cache = new Map();
+        const norm = (el) => {
+            if (!cache.has(el)) cache.set(el, (el.textContent || '').replace(/\\s+/g, ' ').toLowerCase());
+            return cache.get(el);
+        };
+        for (const kw of opts.keywords) {
+            const first = all.find(el => norm(el).includes(kw) && !Array.from(el.children).some(c => !skip.has(c.tagName) && norm(c).includes(kw)));
+            if (first && isVisible(first)) { cta = kw; ctaSource = 'keyword'; break; }
+        }
+    }
 
-def extract_jsonld_product_offer(page, log_prefix: str) -> Optional[Dict]:
-    print(f"[PROGRESS] {log_prefix} Extracting JSON-LD...", flush=True)
-    try:
-        scripts = page.locator('script[type="application/ld+json"]').all_inner_texts()
-        for raw in scripts:
-            try:
-                data = json.loads(raw)
-                schema_type = data.get("@type")
-                is_product = False
-                if isinstance(schema_type, str) and schema_type.lower() == "product":
-                    is_product = True
-                elif isinstance(schema_type, list) and any(t.lower() == "product" for t in schema_type if isinstance(t, str)):
-                    is_product = True
-                
-                if is_product and "offers" in data:
-                    return data
-            except: continue
-    except: pass
-    return None
+    const jsonld = Array.from(document.querySelectorAll('script[type="application/ld+json"]')).map(s => s.textContent || '');
+    return { priceText, cta, ctaSource, jsonld };
+}
+"""
 
-def extract_visual_elements(page, log_prefix: str, current_url: str) -> Dict[str, str]:
-    print(f"[PROGRESS] {log_prefix} Analyzing UI...", flush=True)
+async def extract_page_data(page, log_prefix: str, current_url: str) -> Tuple[Optional[Dict], Dict[str, str]]:
+    emit(f"[PROGRESS] {log_prefix} Extracting JSON-LD / Analyzing UI...")
     result = {"visual_price": "", "buy_button_text": "", "meta_url": current_url}
-    force_remove_overlays(page)
-
-    try:
-        price_selectors = [
-            ".info-sticky .price-top span", ".price-top span", ".price-box--price .cell-price",
-            ".cell-price.cheaperMA", ".PD0033 .cell-price.cheaperMA", ".price-area .c-price__purchase",
-            ".amount", ".cell-price"
-        ]
-        found_price_text = ""
-        for selector in price_selectors:
-            elements = page.locator(selector).all()
-            for el in elements:
-                if not el.is_visible(): continue
-                raw_text = el.inner_text().strip()
-                if "%" in raw_text: continue
-                if not any(char.isdigit() for char in raw_text): continue
-                found_price_text = raw_text
-                break
-            if found_price_text: break
-        if found_price_text:
-            result["visual_price"] = re.sub(r'[^\d.,]', '', found_price_text)
-    except Exception: pass
-
     try:
-        found_text = ""
-        sticky_btn = page.locator(".info-sticky .info-sticky--btn a, .info-sticky .info-sticky--btn button").first
-        if sticky_btn.is_visible(): found_text = sticky_btn.inner_text().strip()
-        
-        if not found_text:
-            btn_candidates = page.locator('a.btn-pdp:not(.hidden) span.button-text, button.btn-pdp:not(.hidden) span.button-text').all()
-            for btn in btn_candidates:
-                if btn.is_visible():
-                    found_text = btn.inner_text().strip()
-                    if found_text: break
-        if not found_text:
-            hl_btn = page.locator('.cta-wrap .highlight:visible').first
-            if hl_btn.count() > 0: found_text = hl_btn.inner_text().strip()
-        if not found_text:
-            fallback_kws = ["out of stock", "sold out", "esgotado", "unavailable", "stock alert", "where to buy", "comprar", "buy now", "add to cart", "in stock", "pre-order", "reserve now", "vorbestellung", "beli sekarang"]
-            for kw in fallback_kws:
-                if page.get_by_text(kw, exact=False).first.is_visible():
-                    found_text = kw.title()
-                    break
-        result["buy_button_text"] = found_text
-    except Exception: pass
-    return result
+        data = await page.evaluate(EXTRACT_JS, {
+            "overlays": OVERLAY_SELECTORS,
+            "priceSelectors": PRICE_SELECTORS,
+            "stickySelector": STICKY_CTA_SELECTOR,
+            "pdpSelector": PDP_CTA_SELECTOR,
+            "highlightSelector": HIGHLIGHT_CTA_SELECTOR,
+            "keywords": FALLBACK_CTA_KEYWORDS,
+        })
+    except Exception:
+        return None, result
+    if data.get("priceText"):
+        result["visual_price"] = re.sub(r'[^\d.,]', '', data["priceText"])
+    cta = data.get("cta", "")
+    result["buy_button_text"] = cta.title() if data.get("ctaSource") == "keyword" else cta
+    return schema_fetch.pick_product_offer(data.get("jsonld", [])), result
 
 def generate_html_report(out_path: Path, product_id: str, base_url: str, blocks: List[Dict]):
-    print(f"[PROGRESS] Generating HTML Report...", flush=True)
+    emit(f"[PROGRESS] Generating HTML Report...")
     html = [f"<html><body><h1>Audit Report: {product_id}</h1></body></html>"]
     with open(out_path, "w", encoding='utf-8') as f:
         f.write("\n".join(html))
 
-def main():
+def profile_headers(profile: Dict) -> Dict[str, str]:
+    return {
+        "sec-ch-ua": profile["sec_ch_ua"],
+        "sec-ch-ua-mobile": "?0",
+        "sec-ch-ua-platform": '"Windows"',
+        "Upgrade-Insecure-Requests": "1",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+        "Sec-Fetch-Site": "none",
+        "Sec-Fetch-Mode": "navigate",
+        "Sec-Fetch-User": "?1",
+        "Sec-Fetch-Dest": "document",
+    }
+
+# [수정] JS 에서 보이는 Client Hints / 플랫폼을 프로필(헤더)과 맞춤 (헤드리스에서는 HeadlessChrome 브랜드, Linux 플랫폼이 드러남)
+# 헤드리스는 창 테두리가 없어 outer == inner 이므로 일반 창 크기로 보정
+PROFILE_INIT_JS = """
+(p) => {
+    const data = {brands: p.brands, mobile: false, platform: 'Windows'};
+    const high = Object.assign({}, data, {architecture: 'x86', bitness: '64', model: '', platformVersion: '10.0.0',
+        uaFullVersion: p.full_version, fullVersionList: p.full_brands, wow64: false});
+    const uaData = {
+        get brands() { return p.brands; }, get mobile() { return false; }, get platform() { return 'Windows'; },
+        getHighEntropyValues: async (hints) => Object.assign({}, data, Object.fromEntries((hints || []).filter(h => h in high).map(h => [h, high[h]]))),
+        toJSON: () => data,
+    };
+    const define = (obj, name, get) => { try { Object.defineProperty(obj, name, {get, configurable: true}); } catch (e) {} };
+    define(Navigator.prototype, 'userAgentData', () => uaData);
+    define(Navigator.prototype, 'platform', () => 'Win32');
+    if (window.outerWidth === 0 || window.outerHeight === window.innerHeight) {
+        define(window, 'outerWidth', () => window.innerWidth);
+        define(window, 'outerHeight', () => window.innerHeight + 85);
+    }
+}
+"""
+
+def profile_init_script(profile: Dict) -> str:
+    brands = [{"brand": b, "version": v} for b, v in re.findall(r'"([^"]+)";v="(\d+)"', profile["sec_ch_ua"])]
+    major = next((b["version"] for b in brands if b["brand"] == "Google Chrome"), brands[0]["version"] if brands else "")
+    full = {"brands": brands, "full_version": f"{major}.0.0.0", "full_brands": [dict(b, version=f"{b['version']}.0.0.0") for b in brands]}
+    return f"({PROFILE_INIT_JS})({json.dumps(full)})"
+
+def context_options(profile: Dict, proxy=None) -> Dict:
+    return {
+        "viewport": {"width": 1920, "height": 1080},
+        "user_agent": profile["ua"],
+        "locale": 'en-US',
+        "extra_http_headers": profile_headers(profile),
+        **({"proxy": proxy.playwright()} if proxy else {}),
+    }
+
+async def prepare_context(context, profile: Dict):
+    await context.add_init_script(script=profile_init_script(profile))
+
+def region_file_names(run: Dict, rid: str) -> Tuple[str, str, str]:
+    region_tag = rid if rid else "default"
+    run_ts = run["run_ts"]
+    return (f"region_{region_tag}__website_{run_ts}.png",
+            f"region_{region_tag}__schema_{run_ts}.json",
+            f"region_{region_tag}__scrape_{run_ts}.json")
+
+def image_fields(shot: Optional[Dict]) -> Dict:
+    # 실제 저장된 파일 (포맷 확장자 / 중복 제거 시 먼저 저장된 리전의 파일)
+    if not shot or not shot.get("path"): return {}
+    fields = {"website_png_rel": f"images/{Path(shot['path']).name}", "image_path_abs": shot["path"], "thumb_path_abs": shot.get("thumb", "")}
+    if shot.get("dedup_of"): fields["image_dedup_of"] = shot["dedup_of"]
+    return fields
+
+def save_region_result(run: Dict, rid: str, target_url: str, p_schema: Optional[Dict], v_data: Dict, extra: Optional[Dict] = None) -> Dict:
+    img_name, schema_name, scrape_name = region_file_names(run, rid)
+    block_data = {
+        "region_id": rid,
+        "final_url": target_url,
+        "website_png_rel": f"images/{img_name}",
+        "image_path_abs": str(run["img_dir"] / img_name),
+    }
+    if run["json_export"]:
+        # [수정] 리전별 JSON 파일은 --json_export 일 때만 기록 (기본은 results.db)
+        schema_dir = run["schema_dir"]
+        with open(schema_dir / schema_name, "w", encoding="utf-8") as f:
+            json.dump(p_schema if p_schema else {}, f, indent=2)
+        with open(schema_dir / scrape_name, "w", encoding="utf-8") as f:
+            json.dump(v_data, f, indent=2)
+        block_data["schema_path_abs"] = str(schema_dir / schema_name)
+        block_data["schema_json_rel"] = f"schema/{schema_name}"
+    block_data.update(extra or {})
+    run["rows"].append(results_store.make_row(run, rid, target_url, p_schema, v_data, block_data))
+    cache = run.get("cache")
+    if cache is not None and p_schema and block_data.get("source") != "cache":
+        img_path = Path(block_data["image_path_abs"])
+        cache.put(run["main_url"], run["param_key"], rid, p_schema, v_data, img_path if img_path.exists() else None)
+    # 완료되는 순서대로 출력 (동시 실행 시 순서 보장 안 됨)
+    emit(f"[RESULT_JSON] {json.dumps(block_data)}")
+    # scrape/market: app 의 비교표가 리전 도착 시마다 바로 갱신되도록 함께 보냄
+    events.emit_event("region_result", block=block_data, schema=p_schema or {}, scrape=v_data, market=run["market"])
+    return block_data
+
+async def cached_region(client, sem: asyncio.Semaphore, run: Dict, rid: str, i: int, need_image: bool) -> Optional[Dict]:
+    # [수정] 결과 캐시 확인: on = TTL 내면 재사용, revalidate = HTTP 로 offer 해시를 비교해 같을 때만 재사용
+    async with sem:
+        events.bind(region=rid or "default")
+        with run["metrics"].track(rid, "cache"):
+            cache = run["cache"]
+            target_url = set_query_param(run["main_url"], run["param_key"], rid)
+            log_prefix = f"<{i}/{run['total']}> [{rid if rid else 'default'}]"
+            revalidate = run["cache_mode"] == "revalidate"
+            entry = cache.get(run["main_url"], run["param_key"], rid, need_image=need_image, allow_stale=revalidate)
+            if entry is None:
+                emit(f"[PROGRESS] {log_prefix} 💾 Cache miss")
+                return None
+            status = "hit"
+            if revalidate:
+                # [수정] 재검증 요청도 호스트 throttle / 서킷 브레이커를 거침 (서킷이 열려 있으면 재검증 생략 -> 브라우저 경로에서 처리)
+                res = await throttled_fetch(client, run, target_url, log_prefix, "revalidate")
+                if res is None or res["fallback"] or result_cache.offer_hash(res["schema"]) != entry["offer_hash"]:
+                    emit(f"[PROGRESS] {log_prefix} 💾 Cache stale (offer changed or fetch failed), re-rendering")
+                    return None
+                cache.refresh(entry["key"])
+                status = "revalidated"
+            emit(f"[PROGRESS] {log_prefix} 💾 Cache {status} (age {time.time() - entry['created']:.0f}s)")
+            d = Path(entry["dir"])
+            img_name, cached_img = region_file_names(run, rid)[0], result_cache.image_file(d)
+            img_extra = {}
+            if cached_img is not None:
+                img_path = (run["img_dir"] / img_name).with_suffix(cached_img.suffix)
+                shutil.copyfile(cached_img, img_path)
+                img_extra = {"website_png_rel": f"images/{img_path.name}", "image_path_abs": str(img_path)}
+            p_schema = json.loads((d / "schema.json").read_text(encoding="utf-8"))
+            v_data = json.loads((d / "scrape.json").read_text(encoding="utf-8"))
+            return save_region_result(run, rid, target_url, p_schema, v_data, {"source": "cache", "cache": status, **img_extra})
+
+async def throttled_fetch(client, run: Dict, target_url: str, log_prefix: str, phase: str) -> Optional[Dict]:
+    """호스트 throttle 을 거친 fetch_schema. 서킷이 열려 있으면 None. 차단/연결 실패/성공을 서킷 브레이커와 프록시 풀 점수에 기록"""
+    host_throttle = throttle.for_url(target_url, run["throttle_cfg"])
+    try:
+        await host_throttle.acquire(emit, log_prefix)
+    except throttle.CircuitOpenError:
+        return None
+    # [수정] 프록시 풀이면 요청마다 프록시를 빌려 씀 (호스트 IP 로 직접 나가지 않음)
+    proxy = run["proxies"].acquire(emit) if isinstance(client, schema_fetch.ProxyClients) else None
+    proxy_pool.use(proxy, run["proxies"])
+    try:
+        with events.phase(phase):
+            t_fetch = time.perf_counter()
+            res = await asyncio.to_thread(schema_fetch.fetch_schema, client.for_proxy(proxy) if proxy else client, target_url)
+            fetch_ms = (time.perf_counter() - t_fetch) * 1000
+        if res["blocked"]:
+            host_throttle.record_failure("denied", emit)
+            proxy_pool.record("denied", log=emit)
+        elif not res["status"]:
+            host_throttle.record_failure("error", emit)
+            proxy_pool.record("error", log=emit)
+        else:
+            host_throttle.record_success()
+            proxy_pool.record("ok", fetch_ms)
+    finally:
+        if proxy: run["proxies"].release(proxy)
+        proxy_pool.use(None, None)
+    return res
+
+async def fetch_region_schema(client, sem: asyncio.Semaphore, run: Dict, rid: str, i: int) -> Optional[Dict]:
+    # [수정] schema-only: 렌더링 없이 HTML 의 JSON-LD 만 사용. 차단/JSON-LD 없음이면 None -> 브라우저로 재처리
+    async with sem:
+        events.bind(region=rid or "default")
+        with run["metrics"].track(rid, "http"):
+            target_url = set_query_param(run["main_url"], run["param_key"], rid)
+            log_prefix = f"<{i}/{run['total']}> [{rid if rid else 'default'}]"
+            emit(f"[PROGRESS] {log_prefix} Fetching HTML (schema-only)...")
+            res = await throttled_fetch(client, run, target_url, log_prefix, "http_fetch")
+            if res is None: return None
+            events.note(attempts=1, http_status=res["status"], bytes_downloaded=res.get("bytes", 0), requests=1)
+            if res["fallback"]:
+                reason = "blocked" if res["blocked"] else res.get("error") or "no JSON-LD"
+                emit(f"[PROGRESS] {log_prefix} ↪ Falling back to browser ({reason})")
+                return None
+            v_data = {"visual_price": "", "buy_button_text": "", "meta_url": target_url, "source": "http"}
+            return save_region_result(run, rid, target_url, res["schema"], v_data, {"source": "http", "http_status": res["status"]})
+
+async def audit_region(browser, sem: asyncio.Semaphore, run: Dict, rid: str, i: int) -> Dict:
+    # [수정] 동시 실행 수 제한 (--concurrency), 리전마다 독립된 context 유지
+    async with sem:
+        events.bind(region=rid or "default")
+        # [수정] 리전별 계측 (단계 시간/재시도/응답 코드/바이트/메모리) -> metrics.json
+        m = run["metrics"].region(rid, "browser")
+        events.collect(m)
+        # [Task 5] 매 세션마다 프로필 랜덤 선택 (일관성 유지)
+        profile = random.choice(BROWSER_PROFILES)
+        # [수정] 프록시 풀: 리전(context)마다 점수가 좋은 프록시를 빌려 씀 (시도 결과는 navigate_with_retry 에서 기록)
+        proxy = run["proxies"].acquire(emit) if run["proxies"] else None
+        proxy_pool.use(proxy, run["proxies"])
+        if proxy: m["proxy"] = proxy.label
+
+        context = None
+        # [수정] context 생성(잘못된 프록시 등) 실패도 finally 에서 프록시 반납 / 계측 종료
+        try:
+            context_kwargs = context_options(profile, proxy)
+            # [수정] 컨텍스트 템플릿: 시장 x 프로필별로 준비된 storage_state (동의 쿠키) 로 시작 (준비 실패 시 빈 context)
+            storage_state = None
+            if run["templates"]:
+                storage_state = await context_templates.snapshot(browser, run["templates"], run["market"], BROWSER_PROFILES.index(profile), run["main_url"],
+                                                                 context_kwargs, OVERLAY_SELECTORS, throttle.for_url(run["main_url"], run["throttle_cfg"]),
+                                                                 run["templates_refreshed"], emit)
+
+            # Create fresh context for each region to avoid session tracking
+            context = await browser.new_context(
+                **context_kwargs,
+                **({"storage_state": storage_state} if storage_state else {}),
+                **({"record_har_path": str(run["out_dir"] / "har" / f"region_{rid or 'default'}.har"), "record_har_content": "omit"} if run["har"] else {})
+            )
+            if run["trace"]: await context.tracing.start(screenshots=True, snapshots=True)
+            # [수정] 헤드리스/헤드 모드 모두 JS 의 Client Hints 를 프로필 헤더와 일치시킴
+            await prepare_context(context, profile)
+            # [수정] 정적 에셋 캐시 route 를 먼저 걸어야 차단 정책이 먼저 판단하고 통과한 요청만 캐시로 넘어옴
+            asset_stats = await asset_cache.install(context, run["assets"]) if run["assets"] else None
+            # [수정] 리소스 차단 정책 (이미지/폰트/분석 스크립트 등) + 요청/바이트 통계
+            res_stats = await resource_policy.install(context, run["policy"])
+            if asset_stats is not None: res_stats["assets"] = asset_stats
+            if storage_state:
+                # stealth + 오버레이 숨김은 context 단위로 한 번 (공유 Stealth 객체)
+                await context_templates.install(context, OVERLAY_SELECTORS)
+                page = await context.new_page()
+            else:
+                page = await context.new_page()
+                # [Task 1] Stealth 적용 (v2.0.3 API 대응)
+                stealth_obj = Stealth()
+                await stealth_obj.apply_stealth_async(page)
+
+            target_url = set_query_param(run["main_url"], run["param_key"], rid)
+            log_prefix = f"<{i}/{run['total']}> [{rid if rid else 'default'}]"
+            img_name = region_file_names(run, rid)[0]
+
+            # 스크린샷 함수 내에서 재시도 로직 수행
+            host_throttle = throttle.for_url(target_url, run["throttle_cfg"])
+            _, shot_msg, shot_task = await screenshot_first_view(page, target_url, run["img_dir"] / img_name, log_prefix, run["ready_profile"], host_throttle, run["shots"], run["humanlike"], bool(storage_state))
+
+            emit(f"[PROGRESS] {log_prefix} {resource_policy.summary(res_stats)}")
+            if asset_stats is not None: emit(f"[PROGRESS] {log_prefix} {asset_cache.summary(asset_stats)}")
+            if shot_msg in ("failed", "circuit_open"):
+                # [수정] 에러/빈 페이지를 결과로 저장하지 않음 (results.db / 캐시 / region_result 없음)
+                # [RESULT_JSON] 은 보냄: coordinator 가 이 리전을 미완료로 보고 무한 재배정하지 않도록 (status=error 로 종료 표시)
+                emit(f"[PROGRESS] {log_prefix} ❌ Region marked as ERROR ({shot_msg})")
+                block_data = {"region_id": rid, "final_url": target_url, "status": "error", "error": shot_msg}
+                emit(f"[RESULT_JSON] {json.dumps(block_data)}")
+                events.emit_event("region_error", block=block_data)
+                m["error"] = shot_msg
+            elif shot_msg == "blocked":
+                # 차단된 리전은 유효한 데이터로 저장하지 않고 명시적으로 표시
+                emit(f"[PROGRESS] {log_prefix} ⛔ Region marked as BLOCKED")
+                v_data = {"visual_price": "", "buy_button_text": "", "meta_url": target_url, "status": "blocked"}
+                shot = await shot_task if shot_task else None
+                block_data = save_region_result(run, rid, target_url, None, v_data, {"resources": res_stats, "status": "blocked", **image_fields(shot)})
+            else:
+                # 스크린샷 인코딩/저장과 추출을 동시에 진행
+                with events.phase("extract"):
+                    p_schema, v_data = await extract_page_data(page, log_prefix, target_url)
+                shot = await shot_task if shot_task else None
+                block_data = save_region_result(run, rid, target_url, p_schema, v_data, {"resources": res_stats, **image_fields(shot)})
+            m.update(bytes_downloaded=res_stats["bytes_downloaded"], requests=res_stats["requests"], blocked_requests=res_stats["blocked"],
+                     js_heap_mb=await metrics.page_js_heap_mb(page), browser_rss_mb=await metrics.browser_rss_mb(browser))
+            if asset_stats is not None: m.update(asset_hits=asset_stats["hits"], asset_misses=asset_stats["misses"], asset_bytes_from_cache=asset_stats["bytes_from_cache"])
+            await page.close()
+        finally:
+            if context is not None:
+                if run["trace"]:
+                    try: await context.tracing.stop(path=str(run["out_dir"] / "traces" / f"region_{rid or 'default'}.zip"))
+                    except Exception: pass
+                await context.close()
+            if proxy: run["proxies"].release(proxy)
+            metrics.RunMetrics.done(m)
+        return block_data
+
+HEADLESS_MODES = ["off", "new", "shell"]
+
+def headless_mode(args) -> str:
+    # --headed 는 항상 헤드 모드 (worker 처럼 일부 인자만 있는 args 도 허용)
+    return "off" if getattr(args, "headed", False) else getattr(args, "headless", "off")
+
+def launch_options(mode: str) -> Dict:
+    # off: 헤드 Chromium (디스플레이 필요) / new: 전체 Chromium 의 새 헤드리스 / shell: chromium-headless-shell (가장 가볍지만 지문 차이가 큼)
+    opts = {"headless": mode != "off", "args": ["--disable-blink-features=AutomationControlled"]}
+    if mode != "off": opts["args"].append("--window-size=1920,1080")
+    if mode == "new": opts["channel"] = "chromium"
+    return opts
+
+async def launch_browser(p, args):
+    # [봇 차단 해결 정공법 적용]
+    # [수정] --headless 로 디스플레이 없는 실행 지원 (fingerprint_check.py 로 헤드 모드와 지문 비교)
+    launch_kwargs = launch_options(headless_mode(args))
+    if args.proxy_server:
+        launch_kwargs["proxy"] = {"server": args.proxy_server}
+        if args.proxy_user:
+            launch_kwargs["proxy"]["username"] = args.proxy_user
+            launch_kwargs["proxy"]["password"] = args.proxy_pass
+    elif getattr(args, "proxy_pool", ""):
+        # context 별 프록시를 쓰려면 구버전 Chromium(Windows)은 전역 프록시 지정이 필요 (실제로는 사용되지 않음, 인증 정보 없음)
+        launch_kwargs["proxy"] = {"server": "http://per-context"}
+    return await p.chromium.launch(**launch_kwargs)
+
+def load_batch_jobs(path: Path) -> List[Dict]:
+    # CSV(헤더 필수) 또는 JSONL: product_id, url, regions(선택, ',' 또는 ';' 구분), param(선택)
+    rows = []
+    if path.suffix.lower() == ".jsonl":
+        for line in path.read_text(encoding="utf-8-sig").splitlines():
+            if line.strip(): rows.append(json.loads(line))
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            rows = list(csv.DictReader(f))
+    jobs = []
+    for row in rows:
+        url = str(row.get("url") or "").strip()
+        if not url.startswith("http"): continue
+        regions = row.get("regions") or ""
+        if isinstance(regions, list): regions = ",".join(str(r) for r in regions)
+        jobs.append({
+            "product_id": str(row.get("product_id") or "").strip(),
+            "url": url,
+            "regions": str(regions).replace(";", ","),
+            "param": str(row.get("param") or "").strip(),
+        })
+    return jobs
+
+def target_regions_for(job: Dict, script_dir: Path, exact: bool = False) -> Tuple[List[str], str]:
+    # exact: 주어진 리전만 그대로 처리 (coordinator 샤드용, "default" = 기본 리전 "")
+    auto_regions, auto_param = resolve_regions_param(job["url"], script_dir)
+    target_regions = [r.strip() for r in job.get("regions", "").split(",") if r.strip()]
+    if exact: return ["" if r == "default" else r for r in target_regions], job.get("param") or auto_param
+    if not target_regions: target_regions = auto_regions
+    if "" not in target_regions: target_regions.insert(0, "") 
+    return target_regions, job.get("param") or auto_param
+
+async def run_product(get_browser, args, job: Dict, script_dir: Path, http_client=None, cache=None, store=None, shots=None, proxies=None, assets=None,
+                      templates_refreshed: Optional[set] = None) -> Dict:
+    main_url = job["url"]
+    target_regions, param_key = target_regions_for(job, script_dir, args.exact_regions)
+
+    # [수정] 밀리초까지 포함하여 폴더 이름 충돌 방지 (coordinator 샤드는 같은 run_ts/out_dir 를 공유)
+    run_ts = args.run_ts or datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    out_dir = Path(args.out_dir) if args.out_dir else script_dir / "outs" / f"out_{run_ts}"
+    img_dir = out_dir / "images"
+    schema_dir = out_dir / "schema"
+    img_dir.mkdir(parents=True, exist_ok=True)
+    if args.trace: (out_dir / "traces").mkdir(exist_ok=True)
+    if args.har: (out_dir / "har").mkdir(exist_ok=True)
+    if args.json_export: schema_dir.mkdir(parents=True, exist_ok=True)
+
+    run = {
+        "product_id": job.get("product_id", ""),
+        "market": market_from_url(main_url),
+        "main_url": main_url,
+        "param_key": param_key,
+        "run_ts": run_ts,
+        "img_dir": img_dir,
+        "schema_dir": schema_dir,
+        "total": len(target_regions),
+        "policy": resource_policy.load_policy(args.resource_policy, script_dir),
+        "ready_profile": readiness.load_profile(market_from_url(main_url), script_dir),
+        "humanlike": args.humanlike,
+        "cache": cache,
+        "cache_mode": args.cache,
+        "throttle_cfg": throttle.load_config(script_dir, args.throttle_share, args.throttle_config),
+        "json_export": args.json_export,
+        "out_dir": out_dir,
+        "trace": args.trace,
+        "har": args.har,
+        "metrics": metrics.RunMetrics(run_ts, job.get("product_id", ""), market_from_url(main_url), main_url, args.concurrency),
+        "shots": shots or screenshots.ScreenshotWriter(args.image_format, args.image_quality, args.thumb_width, args.dedup),
+        "proxies": proxies,
+        "assets": assets,
+        "templates": context_templates.load_config(script_dir) if args.context_templates != "off" else None,
+        # refresh 는 이번 실행(배치 전체) 안에서 시장/프로필 key 마다 한 번만 -> run_jobs 가 만든 집합을 제품 간 공유
+        "templates_refreshed": templates_refreshed,
+        "rows": [],
+    }
+    # 샤드 태그도 붙여 coordinator 가 재배정 전/후 샤드의 region_result 를 구분
+    events.bind(run_ts=run_ts, product_id=job.get("product_id", ""), **({"shard": args.shard} if args.shard else {}))
+    events.emit_event("run_start", url=main_url, regions=len(target_regions), out_dir=str(out_dir))
+    t_run, started_at = time.perf_counter(), time.time()
+    indexed = list(enumerate(target_regions, 1))
+    blocks_by_idx: Dict[int, Dict] = {}
+    if cache is not None:
+        cache_sem = asyncio.Semaphore(max(1, args.http_concurrency))
+        hits = await asyncio.gather(*[cached_region(http_client, cache_sem, run, rid, i, not args.schema_only) for i, rid in indexed])
+        blocks_by_idx = {i: b for (i, _), b in zip(indexed, hits) if b is not None}
+        indexed = [(i, rid) for i, rid in indexed if i not in blocks_by_idx]
+
+    if args.schema_only and indexed:
+        http_sem = asyncio.Semaphore(max(1, args.http_concurrency))
+        fetched = await asyncio.gather(*[fetch_region_schema(http_client, http_sem, run, rid, i) for i, rid in indexed])
+        blocks_by_idx.update({i: b for (i, _), b in zip(indexed, fetched) if b is not None})
+        indexed = [(i, rid) for i, rid in indexed if i not in blocks_by_idx]
+
+    if indexed:
+        # 브라우저는 실제로 필요할 때만 띄움 (schema-only 에서 전부 HTTP 로 끝나면 Chromium 실행 안 함)
+        browser = await get_browser()
+        sem = asyncio.Semaphore(max(1, args.concurrency))
+        rendered = await asyncio.gather(*[audit_region(browser, sem, run, rid, i) for i, rid in indexed])
+        blocks_by_idx.update({i: b for (i, _), b in zip(indexed, rendered)})
+    # 리포트 순서는 기존과 동일 (리전 입력 순서)
+    region_blocks = [blocks_by_idx[i] for i in sorted(blocks_by_idx)]
+    run["shots"].forget(img_dir)
+
+    report_path = out_dir / f"report_{run_ts}.html"
+    # 샤드는 리전 결과만 기록 (리포트/metrics 병합은 coordinator 가 담당)
+    if not args.shard: generate_html_report(report_path, job.get("product_id", ""), main_url, region_blocks)
+
+    if store is not None:
+        # 리전 결과를 한 번에 기록 (리전마다 파일을 쓰고 다시 glob 하던 방식 대체)
+        run_meta = {"run_ts": run_ts, "product_id": run["product_id"], "url": main_url, "market": run["market"], "param": param_key,
+                    "out_dir": str(out_dir), "report_path": str(report_path), "started_at": started_at, "finished_at": time.time()}
+        await asyncio.to_thread(store.record_run, run_meta, run["rows"])
+
+    run_ms = round((time.perf_counter() - t_run) * 1000, 1)
+    metrics_path = run["metrics"].write(out_dir, run_ms, f"metrics_{args.shard}.json" if args.shard else metrics.METRICS_FILE)
+
+    emit(f"- Report: {report_path}")
+    emit(f"- Images: {img_dir}")
+    if args.json_export: emit(f"- Schema: {schema_dir}")
+    events.emit_event("artifact", report=str(report_path), images_dir=str(img_dir), schema_dir=str(schema_dir) if args.json_export else "",
+                      db=str(store.path) if store is not None else "", metrics=str(metrics_path))
+    events.emit_event("run_end", duration_ms=run_ms, regions=len(region_blocks))
+    return {
+        "product_id": job.get("product_id", ""),
+        "url": main_url,
+        "param": param_key,
+        "run_ts": run_ts,
+        "out_dir": str(out_dir),
+        "report": str(report_path),
+        "metrics": str(metrics_path),
+        "schema_dir": str(schema_dir) if args.json_export else "",
+        "regions": region_blocks,
+    }
+
+async def run_jobs(get_browser, args, jobs: List[Dict], script_dir: Path) -> List[Dict]:
+    # [수정] 여러 제품을 하나의 브라우저로 처리 (배치 모드에서 cold start 1회)
+    proxies = proxy_pool.load(Path(args.proxy_pool), script_dir) if args.proxy_pool else None
+    http_client = None
+    if args.schema_only or args.cache == "revalidate":
+        http_headers = {"User-Agent": BROWSER_PROFILES[0]["ua"], **profile_headers(BROWSER_PROFILES[0])}
+        # 프록시 풀이 있으면 브라우저 context 처럼 fetch 마다 풀의 프록시 사용 (결과도 같은 점수에 반영)
+        if proxies is not None: http_client = schema_fetch.ProxyClients(http_headers)
+        else: http_client = schema_fetch.HttpClient(http_headers, proxy_server=args.proxy_server, proxy_user=args.proxy_user, proxy_pass=args.proxy_pass)
+    cache = None
+    if args.cache != "off":
+        cache = result_cache.ResultCache(script_dir / "cache" / "results", ttl_sec=args.cache_ttl, max_mb=args.cache_max_mb)
+    shots = screenshots.ScreenshotWriter(args.image_format, args.image_quality, args.thumb_width, args.dedup)
+    store = results_store.ResultsStore(Path(args.db) if args.db else script_dir / "outs" / results_store.DB_NAME)
+    assets = asset_cache.open_cache(script_dir, args.asset_cache_mb) if args.asset_cache == "on" else None
+    # 이미 다시 준비한 템플릿 key (worker 는 job 마다 run_jobs 를 부르므로 다음 job 은 다시 refresh)
+    templates_refreshed = set() if args.context_templates == "refresh" else None
+    entries = []
+    try:
+        for n, job in enumerate(jobs, 1):
+            if args.batch:
+                emit(f"[PROGRESS] Product {n}/{len(jobs)}: {job['product_id'] or job['url']}")
+                try:
+                    entries.append(await run_product(get_browser, args, job, script_dir, http_client, cache, store, shots, proxies, assets, templates_refreshed))
+                except Exception as e:
+                    # 한 제품이 실패해도 나머지 배치는 계속 진행
+                    emit(f"[PROGRESS] Product {n}/{len(jobs)} ❌ Failed: {e}")
+                    events.emit_event("error", kind="product", product_id=job["product_id"], message=str(e))
+                    entries.append({"product_id": job["product_id"], "url": job["url"], "error": str(e), "regions": []})
+            else:
+                entries.append(await run_product(get_browser, args, job, script_dir, http_client, cache, store, shots, proxies, assets, templates_refreshed))
+    finally:
+        if http_client is not None: http_client.close()
+        # 캐시 사용 시각/TTL 연장은 실행 끝에 한 번 기록 (다른 프로세스 항목과 병합)
+        if cache is not None: cache.flush()
+        shots.close()
+        # 프록시 통계는 다음 실행에서도 이어서 사용
+        if proxies is not None: proxies.save()
+        # 에셋 캐시 인덱스 저장 (용량 초과분은 LRU 삭제)
+        if assets is not None:
+            assets.save()
+            st = assets.state()
+            emit(f"[PROGRESS] Asset cache: {st['hits']} hits / {st['misses']} misses, {st['bytes_served'] / 1024 / 1024:.1f} MB served locally, {st['entries']} entries ({st['disk_mb']} MB)")
+    return entries
+
+async def run_audit(args, jobs: List[Dict], script_dir: Path) -> List[Dict]:
+    async with async_playwright() as p:
+        browser = None
+        lock = asyncio.Lock()
+
+        async def get_browser():
+            nonlocal browser
+            async with lock:
+                if browser is None: browser = await launch_browser(p, args)
+            return browser
+
+        entries = await run_jobs(get_browser, args, jobs, script_dir)
+        if browser is not None: await browser.close()
+    return entries
+
+def build_arg_parser() -> argparse.ArgumentParser:
     ap = argparse.ArgumentParser()
     ap.add_argument("--product_id", default="")
-    ap.add_argument("--url", required=True)
+    ap.add_argument("--url", default="")
     ap.add_argument("--blob", default="")
     ap.add_argument("--regions", default="")
     ap.add_argument("--param", default="")
-    ap.add_argument("--headed", action="store_true")
+    ap.add_argument("--headed", action="store_true", help="항상 헤드 모드로 실행 (--headless 무시)")
+    ap.add_argument("--headless", default="off", choices=HEADLESS_MODES, help="new: 새 헤드리스 Chromium (권장), shell: headless shell. 실행 전 fingerprint_check.py 로 확인")
     ap.add_argument("--no_open", action="store_true")
     ap.add_argument("--proxy_server", default="")
     ap.add_argument("--proxy_user", default="")
     ap.add_argument("--proxy_pass", default="")
-    args = ap.parse_args()
-
+    ap.add_argument("--proxy_pool", default="", help="프록시 풀 설정 JSON (proxy_pool.example.json 을 복사한 proxy_pool.json). 리전마다 건강/속도 점수가 좋은 프록시 사용")
+    ap.add_argument("--concurrency", type=int, default=1, help="동시에 처리할 리전(context) 수")
+    ap.add_argument("--batch", default="", help="CSV/JSONL 파일 (product_id, url, regions, param)")
+    ap.add_argument("--humanlike", action="store_true", help="봇 회피용 랜덤 대기/스크롤 지연 사용 (기본: 사용 안 함)")
+    ap.add_argument("--schema_only", action="store_true", help="HTML 의 JSON-LD 만 HTTP 로 수집 (차단/JSON-LD 없음이면 브라우저로 재처리)")
+    ap.add_argument("--http_concurrency", type=int, default=8, help="--schema_only HTTP 동시 요청 수")
+    ap.add_argument("--cache", default="off", choices=["off", "on", "revalidate"], help="리전 결과 캐시 (revalidate: offer 해시가 바뀐 리전만 다시 렌더링)")
+    ap.add_argument("--cache_ttl", type=float, default=1800, help="캐시 유효 시간(초)")
+    ap.add_argument("--asset_cache", default="off", choices=["off", "on"], help="해시된 JS/CSS/폰트를 cache/assets 에서 응답 (HTML/가격·재고 API 는 항상 실제 요청, asset_cache.json)")
+    ap.add_argument("--asset_cache_mb", type=float, default=0, help="에셋 캐시 최대 용량(MB), 0 이면 asset_cache.json 값")
+    ap.add_argument("--cache_max_mb", type=float, default=500, help="캐시 최대 용량(MB), 초과 시 LRU 삭제")
+    ap.add_argument("--events_addr", default="", help="구조화 이벤트(JSON lines)를 보낼 로컬 소켓 host:port")
+    ap.add_argument("--db", default="", help="결과 저장소 SQLite 경로 (기본: outs/results.db)")
+    ap.add_argument("--json_export", action="store_true", help="리전별 schema/scrape JSON 파일도 함께 기록 (이전 방식)")
+    ap.add_argument("--image_format", default="png", choices=screenshots.FORMATS, help="스크린샷 저장 포맷 (webp/jpeg 는 Pillow 필요)")
+    ap.add_argument("--image_quality", type=int, default=80, help="webp/jpeg 품질")
+    ap.add_argument("--thumb_width", type=int, default=480, help="결과 화면용 썸네일 폭 (0: 생성 안 함)")
+    ap.add_argument("--dedup", default="exact", choices=screenshots.DEDUP_MODES, help="같은 실행 안에서 동일 스크린샷 중복 저장 방지 (perceptual: 유사 이미지도 하나로)")
+    ap.add_argument("--trace", action="store_true", help="리전별 Playwright trace 저장 (out_<ts>/traces, 용량 큼)")
+    ap.add_argument("--har", action="store_true", help="리전별 HAR 저장 (out_<ts>/har, 응답 본문 제외)")
+    ap.add_argument("--out_dir", default="", help="결과 폴더 지정 (coordinator 샤드가 같은 폴더에 기록)")
+    ap.add_argument("--run_ts", default="", help="실행 타임스탬프 지정 (파일명/results.db 키)")
+    ap.add_argument("--exact_regions", action="store_true", help="--regions 만 그대로 처리 (기본 리전 자동 추가 안 함, default = 기본 리전)")
+    ap.add_argument("--shard", default="", help="coordinator 샤드 태그 (리포트 생략, metrics_<shard>.json 기록)")
+    ap.add_argument("--throttle_config", default=throttle.CONFIG_FILE, help="호스트별 요청 조절 설정 JSON (상대 경로는 스크립트 폴더 기준)")
+    ap.add_argument("--throttle_share", type=int, default=1, help="호스트 요청 예산을 나눠 쓸 프로세스 수 (coordinator 가 샤드 수로 지정)")
+    ap.add_argument("--context_templates", default="off", choices=["off", "on", "refresh"], help="시장/프로필별 동의 완료 세션 스냅샷으로 context 생성 (refresh: 이번 실행에서 스냅샷 다시 준비)")
+    ap.add_argument("--resource_policy", default="off", choices=resource_policy.LEVELS, help="불필요한 리소스 차단 수준 (resource_policy.json)")
+    return ap
+
+def build_jobs(args) -> List[Dict]:
+    if args.batch: return load_batch_jobs(Path(args.batch))
     blob_pid, blob_url = parse_product_blob(args.blob)
     final_main_url = args.url if args.url else blob_url
-    script_dir = Path(__file__).resolve().parent
-    auto_regions, auto_param = resolve_regions_param(final_main_url, script_dir)
-    target_regions = [r.strip() for r in args.regions.split(",") if r.strip()]
-    if not target_regions: target_regions = auto_regions
-    if "" not in target_regions: target_regions.insert(0, "") 
-    param_key = args.param if args.param else auto_param
+    return [{"product_id": args.product_id or blob_pid or "", "url": final_main_url, "regions": args.regions, "param": args.param}]
+
+def write_manifest(args, entries: List[Dict], script_dir: Path) -> Path:
+    batch_ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    manifest_dir = script_dir / "outs" / f"out_{batch_ts}_batch"
+    manifest_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = manifest_dir / "manifest.json"
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"batch_ts": batch_ts, "source": str(Path(args.batch).resolve()), "products": entries}, f, indent=2, ensure_ascii=False)
+    emit(f"- Manifest: {manifest_path}")
+    events.emit_event("artifact", manifest=str(manifest_path))
+    return manifest_path
 
-    # [수정] 밀리초까지 포함하여 폴더 이름 충돌 방지
-    run_ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    out_dir = script_dir / "outs" / f"out_{run_ts}"
-    img_dir = out_dir / "images"
-    schema_dir = out_dir / "schema"
-    img_dir.mkdir(parents=True, exist_ok=True)
-    schema_dir.mkdir(parents=True, exist_ok=True)
-
-    region_blocks = []
-
-    # [Task 5] 일관성 있는 랜덤 프로필 리스트 (UA + Client Hints 매칭)
-    BROWSER_PROFILES = [
-        {
-            "ua": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
-            "sec_ch_ua": '"Chromium";v="124", "Google Chrome";v="124", "Not-A.Brand";v="99"'
-        },
-        {
-            "ua": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
-            "sec_ch_ua": '"Chromium";v="123", "Google Chrome";v="123", "Not-A.Brand";v="99"'
-        },
-        {
-            "ua": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
-            "sec_ch_ua": '"Chromium";v="122", "Google Chrome";v="122", "Not-A.Brand";v="99"'
-        },
-        {
-            "ua": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-            "sec_ch_ua": '"Chromium";v="121", "Google Chrome";v="121", "Not-A.Brand";v="99"'
-        }
-    ]
-
-    with sync_playwright() as p:
-        # [봇 차단 해결 정공법 적용]
-        launch_kwargs = {
-            "headless": False,
-            "args": ["--disable-blink-features=AutomationControlled"]
-        }
-        if args.proxy_server:
-            launch_kwargs["proxy"] = {"server": args.proxy_server}
-            if args.proxy_user:
-                launch_kwargs["proxy"]["username"] = args.proxy_user
-                launch_kwargs["proxy"]["password"] = args.proxy_pass
-        
-        browser = p.chromium.launch(**launch_kwargs)
-        
-        total = len(target_regions)
-        for i, rid in enumerate(target_regions, 1):
-            # [Task 5] 매 세션마다 프로필 랜덤 선택 (일관성 유지)
-            profile = random.choice(BROWSER_PROFILES)
-            
-            # Create fresh context for each region to avoid session tracking
-            context = browser.new_context(
-                viewport={"width": 1920, "height": 1080},
-                user_agent=profile["ua"],
-                locale='en-US',
-                extra_http_headers={
-                    "sec-ch-ua": profile["sec_ch_ua"],
-                    "sec-ch-ua-mobile": "?0",
-                    "sec-ch-ua-platform": '"Windows"',
-                    "Upgrade-Insecure-Requests": "1",
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-                    "Sec-Fetch-Site": "none",
-                    "Sec-Fetch-Mode": "navigate",
-                    "Sec-Fetch-User": "?1",
-                    "Sec-Fetch-Dest": "document",
-                }
-            )
-            page = context.new_page()
-            # [Task 1] Stealth 적용 (v2.0.3 API 대응)
-            stealth_obj = Stealth()
-            stealth_obj.apply_stealth_sync(page)
-
-            target_url = set_query_param(final_main_url, param_key, rid)
-            region_tag = rid if rid else "default"
-            log_prefix = f"<{i}/{total}> [{region_tag}]"
-
-            img_name = f"region_{region_tag}__website_{run_ts}.png"
-            schema_name = f"region_{region_tag}__schema_{run_ts}.json"
-            scrape_name = f"region_{region_tag}__scrape_{run_ts}.json"
-            
-            # 스크린샷 함수 내에서 재시도 로직 수행
-            screenshot_first_view(page, target_url, img_dir / img_name, log_prefix)
-
-            p_schema = extract_jsonld_product_offer(page, log_prefix)
-            v_data = extract_visual_elements(page, log_prefix, target_url)
-
-            with open(schema_dir / schema_name, "w", encoding="utf-8") as f:
-                json.dump(p_schema if p_schema else {}, f, indent=2)
-            with open(schema_dir / scrape_name, "w", encoding="utf-8") as f:
-                json.dump(v_data, f, indent=2)
-
-            block_data = {
-                "region_id": rid,
-                "final_url": target_url,
-                "website_png_rel": f"images/{img_name}",
-                "schema_path_abs": str(schema_dir / schema_name),
-                "schema_json_rel": f"schema/{schema_name}"
-            }
-            region_blocks.append(block_data)
-            print(f"[RESULT_JSON] {json.dumps(block_data)}", flush=True)
-            
-            page.close()
-            context.close()
-
-        browser.close()
+def main():
+    ap = build_arg_parser()
+    args = ap.parse_args()
+    if not args.url and not args.batch: ap.error("--url 또는 --batch 중 하나는 필요합니다")
 
-    report_path = out_dir / f"report_{run_ts}.html"
-    generate_html_report(report_path, blob_pid, final_main_url, region_blocks)
-    
-    print(f"- Report: {report_path}", flush=True)
-    print(f"- Images: {img_dir}", flush=True)
-    print(f"- Schema: {schema_dir}", flush=True)
+    script_dir = Path(__file__).resolve().parent
+    if args.events_addr: events.connect(args.events_addr)
+    entries = asyncio.run(run_audit(args, build_jobs(args), script_dir))
+    if args.batch: write_manifest(args, entries, script_dir)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,92 @@
+import json
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+# 리소스 차단 정책: 첫 화면 스크린샷 / JSON-LD / 가격·CTA 에 필요 없는 요청을 route 단계에서 막음
+# 레벨은 resource_policy.json 의 "levels" 에 정의 ("off" 는 차단 없음)
+POLICY_FILE = "resource_policy.json"
+LEVELS = ["off", "screenshot-fidelity", "schema-only"]
+
+
+def host_matches(host: str, domains) -> bool:
+    host = (host or "").lower()
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+def load_policy(level: str, script_dir: Path) -> Optional[Dict]:
+    if not level or level == "off": return None
+    cfg = json.loads((script_dir / POLICY_FILE).read_text(encoding="utf-8"))
+    lv = cfg.get("levels", {}).get(level)
+    if lv is None: raise ValueError(f"Unknown resource policy level: {level}")
+    return {
+        "level": level,
+        "block_types": set(lv.get("block_types", [])),
+        "block_third_party": bool(lv.get("block_third_party", False)),
+        "allow_domains": [d.lower() for d in cfg.get("allow_domains", [])],
+        "deny_domains": [d.lower() for d in cfg.get("deny_domains", [])],
+        "est_bytes": cfg.get("est_bytes", {}),
+    }
+
+
+def should_block(policy: Dict, url: str, resource_type: str) -> bool:
+    # 메인 문서는 절대 차단하지 않음
+    if resource_type == "document": return False
+    host = urlparse(url).hostname or ""
+    if not host: return False
+    if host_matches(host, policy["deny_domains"]): return True
+    if resource_type in policy["block_types"]: return True
+    if policy["block_third_party"] and not host_matches(host, policy["allow_domains"]): return True
+    return False
+
+
+def new_stats(policy: Optional[Dict]) -> Dict:
+    return {
+        "level": policy["level"] if policy else "off",
+        "requests": 0,
+        "blocked": 0,
+        "blocked_by_type": {},
+        "bytes_downloaded": 0,
+        "bytes_saved_est": 0,
+    }
+
+
+async def install(context, policy: Optional[Dict]) -> Dict:
+    """context 에 route 핸들러를 걸고, 페이지가 닫힐 때까지 누적되는 통계 dict 를 반환"""
+    stats = new_stats(policy)
+
+    async def on_finished(request):
+        try:
+            sizes = await request.sizes()
+            stats["bytes_downloaded"] += sizes.get("responseBodySize", 0) + sizes.get("responseHeadersSize", 0)
+        except Exception: pass
+
+    def on_request(request):
+        stats["requests"] += 1
+
+    context.on("request", on_request)
+    context.on("requestfinished", on_finished)
+    if policy is None: return stats
+
+    async def handle(route):
+        req = route.request
+        rtype = req.resource_type
+        if should_block(policy, req.url, rtype):
+            stats["blocked"] += 1
+            stats["blocked_by_type"][rtype] = stats["blocked_by_type"].get(rtype, 0) + 1
+            # 차단된 요청은 크기를 알 수 없으므로 타입별 평균치로 추정
+            est = policy["est_bytes"]
+            stats["bytes_saved_est"] += int(est.get(rtype, est.get("other", 0)))
+            await route.abort("blockedbyclient")
+        else:
+            # 다음 route 핸들러(asset_cache)로 넘김, 없으면 그대로 네트워크 요청
+            await route.fallback()
+
+    await context.route("**/*", handle)
+    return stats
+
+
+def summary(stats: Dict) -> str:
+    return (f"Resources[{stats['level']}]: {stats['blocked']} blocked "
+            f"(~{stats['bytes_saved_est'] / 1024:.0f} KB saved), "
+            f"{stats['requests'] - stats['blocked']} requests / {stats['bytes_downloaded'] / 1024:.0f} KB downloaded")
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
+
+# (정규화된 URL, region param, region) 단위 결과 캐시
+# cache/results/<key>/ 에 schema.json, scrape.json, website.(png|webp|jpg) 를 두고 index.json 으로 TTL/LRU 관리
+TRACKING_PARAMS = ("utm_", "gclid", "fbclid", "srsltid", "_gl")
+
+
+def normalize_url(url: str) -> str:
+    u = urlparse(url.strip())
+    query = sorted((k, v) for k, v in parse_qsl(u.query, keep_blank_values=True) if not k.lower().startswith(TRACKING_PARAMS))
+    path = u.path.rstrip("/") or "/"
+    return urlunparse((u.scheme.lower(), u.netloc.lower(), path, "", urlencode(query), ""))
+
+
+def cache_key(url: str, param: str, region: str) -> str:
+    return hashlib.sha1(f"{normalize_url(url)}|{param}|{region}".encode("utf-8")).hexdigest()
+
+
+def offer_hash(schema: Optional[Dict]) -> str:
+    offers = (schema or {}).get("offers", {})
+    return hashlib.sha1(json.dumps(offers, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def image_file(d: Path) -> Optional[Path]:
+    return next((p for p in d.glob("website.*") if p.is_file()), None)
+
+
+class ResultCache:
+    def __init__(self, root: Path, ttl_sec: float = 1800, max_mb: float = 500, max_entries: int = 5000):
+        self.root = root
+        self.ttl_sec = ttl_sec
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_entries = max_entries
+        self.index_path = root / "index.json"
+        self.lock = threading.Lock()
+        root.mkdir(parents=True, exist_ok=True)
+        self.index: Dict[str, Dict] = self._read_index()
+        # 이 프로세스가 지운 key -> 삭제 시각 (병합할 때 다른 프로세스의 오래된 항목으로 되살리지 않음)
+        self.removed: Dict[str, float] = {}
+        # 이 프로세스가 put 한 key (디스크 인덱스에 아직 없어도 유지)
+        self.written = set()
+        self.dirty = False
+
+    def _read_index(self) -> Dict[str, Dict]:
+        try: return json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError): return {}
+
+    def _merge_disk(self):
+        # coordinator 샤드 / worker / CLI 가 같은 cache/results 를 쓰므로 기록 전에 디스크 인덱스와 병합
+        # 같은 key 는 더 최근에 만든 항목(폴더 내용과 일치)을 쓰고 마지막 사용 시각은 둘 중 늦은 값
+        disk = self._read_index()
+        # 읽어 온 뒤 다른 프로세스가 지운 항목은 메모리에서도 제거
+        for k in [k for k in self.index if k not in disk and k not in self.written]: self.index.pop(k)
+        for k, e in disk.items():
+            if k in self.removed and e["created"] <= self.removed[k]: continue
+            mine = self.index.get(k)
+            if mine is None or e["created"] > mine["created"]:
+                self.index[k] = dict(e, last_access=max(e["last_access"], mine["last_access"] if mine else 0))
+            else:
+                mine["last_access"] = max(mine["last_access"], e["last_access"])
+
+    def _save_index(self):
+        self._merge_disk()
+        self._evict()
+        tmp = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self.index), encoding="utf-8")
+        os.replace(tmp, self.index_path)
+        self.dirty = False
+
+    def _remove(self, key: str):
+        self.index.pop(key, None)
+        self.written.discard(key)
+        self.removed[key] = time.time()
+        shutil.rmtree(self.root / key, ignore_errors=True)
+
+    def get(self, url: str, param: str, region: str, need_image: bool = True, allow_stale: bool = False) -> Optional[Dict]:
+        """유효한 항목이면 파일 경로가 채워진 entry 반환. allow_stale=True 면 TTL 지난 항목도 반환 (revalidate 용)"""
+        key = cache_key(url, param, region)
+        with self.lock:
+            entry = self.index.get(key)
+            if not entry: return None
+            d = self.root / key
+            if not (d / "schema.json").exists() or (need_image and image_file(d) is None):
+                self._remove(key)
+                self.dirty = True
+                return None
+            stale = time.time() - entry["created"] > self.ttl_sec
+            if stale and not allow_stale: return None
+            # 사용 시각은 메모리에만 갱신 (put / flush 때 인덱스에 기록)
+            entry["last_access"] = time.time()
+            self.dirty = True
+            return dict(entry, key=key, dir=str(d), stale=stale)
+
+    def refresh(self, key: str):
+        # revalidate 결과 변경 없음 -> TTL 연장
+        with self.lock:
+            if key in self.index:
+                self.index[key]["created"] = time.time()
+                self.dirty = True
+
+    def flush(self):
+        # 실행 끝: get/refresh 로 바뀐 사용 시각과 TTL 을 인덱스에 기록
+        with self.lock:
+            if self.dirty: self._save_index()
+
+    def put(self, url: str, param: str, region: str, schema: Dict, scrape: Dict, image_path: Optional[Path] = None):
+        key = cache_key(url, param, region)
+        d = self.root / key
+        with self.lock:
+            d.mkdir(parents=True, exist_ok=True)
+            (d / "schema.json").write_text(json.dumps(schema, indent=2), encoding="utf-8")
+            (d / "scrape.json").write_text(json.dumps(scrape, indent=2), encoding="utf-8")
+            if image_path and image_path.is_file():
+                for old in d.glob("website.*"): old.unlink()
+                shutil.copyfile(image_path, d / ("website" + image_path.suffix))
+            size = sum(f.stat().st_size for f in d.iterdir() if f.is_file())
+            now = time.time()
+            self.index[key] = {"url": normalize_url(url), "region": region, "created": now, "last_access": now,
+                               "size": size, "offer_hash": offer_hash(schema)}
+            self.removed.pop(key, None)
+            self.written.add(key)
+            self._save_index()
+
+    def _evict(self):
+        now = time.time()
+        for key in [k for k, e in self.index.items() if now - e["created"] > self.ttl_sec * 4]:
+            self._remove(key)
+        total = sum(e.get("size", 0) for e in self.index.values())
+        for key in sorted(self.index, key=lambda k: self.index[k]["last_access"]):
+            if total <= self.max_bytes and len(self.index) <= self.max_entries: break
+            total -= self.index[key].get("size", 0)
+            self._remove(key)
@@ -0,0 +1,204 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 감사 결과 저장소 (SQLite, WAL). 리전마다 JSON 두 개를 쓰고 glob 으로 다시 읽던 방식을 대체
+# runs: 제품 1회 실행 단위 / results: 리전 결과 1행 (offer, 화면 가격, CTA, 산출물 경로, 원본 JSON)
+# expected: GMC 피드의 기대값 (제품 x 리전, region_id '' = 피드 기본값). feed_ingest.py 가 기록
+DB_NAME = "results.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_ts TEXT PRIMARY KEY,
+    product_id TEXT,
+    url TEXT,
+    market TEXT,
+    param TEXT,
+    out_dir TEXT,
+    report_path TEXT,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_ts TEXT NOT NULL,
+    product_id TEXT,
+    market TEXT,
+    region_id TEXT,
+    url TEXT,
+    source TEXT,
+    status TEXT,
+    schema_price TEXT,
+    schema_currency TEXT,
+    schema_availability TEXT,
+    visual_price TEXT,
+    cta_text TEXT,
+    mismatch INTEGER,
+    image_path TEXT,
+    schema_json TEXT,
+    scrape_json TEXT,
+    created_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_results_product_region ON results (product_id, region_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_results_market ON results (market, created_at);
+CREATE INDEX IF NOT EXISTS ix_results_run ON results (run_ts);
+CREATE TABLE IF NOT EXISTS expected (
+    product_id TEXT NOT NULL,
+    region_id TEXT NOT NULL DEFAULT '',
+    market TEXT,
+    link TEXT,
+    price TEXT,
+    sale_price TEXT,
+    availability TEXT,
+    feed TEXT,
+    updated_at REAL,
+    PRIMARY KEY (product_id, region_id)
+);
+"""
+
+RESULT_COLUMNS = ("run_ts", "product_id", "market", "region_id", "url", "source", "status", "schema_price", "schema_currency",
+                  "schema_availability", "visual_price", "cta_text", "mismatch", "image_path", "schema_json", "scrape_json", "created_at")
+EXPECTED_COLUMNS = ("product_id", "region_id", "market", "link", "price", "sale_price", "availability", "feed", "updated_at")
+THREE_DECIMAL_MARKETS = {"kw", "bh", "om", "jo"}  # 마지막 구분자 뒤 3자리가 소수인 통화 (KWD/BHD/OMR/JOD)
+
+
+def price_value(text, market: str = "") -> Optional[float]:
+    """"1.299,00" / "1,299.00" / "£1,299" -> 1299.0. comparison.parse_prices 도 이 함수를 사용 (저장값과 비교표가 같은 규칙)"""
+    s = re.sub(r"[^\d.,]", "", str(text if text is not None else "")).rstrip(".,")
+    if not s: return None
+    whole, frac = re.fullmatch(r"([\d.,]*?)(?:[.,](\d+))?", s).groups()
+    # 마지막 구분자 뒤가 1~2자리면 소수점, 3자리 이상이면 천 단위 구분자 (3자리 소수 통화 시장 제외)
+    if frac and len(frac) >= 3 and (market or "").lower() not in THREE_DECIMAL_MARKETS: whole, frac = whole + frac, None
+    digits = re.sub(r"\D", "", whole) or "0"
+    return float(f"{digits}.{frac or '0'}")
+
+
+def make_row(run: Dict, rid: str, url: str, schema: Optional[Dict], scrape: Dict, block: Dict) -> Dict:
+    """save_region_result 에서 호출. results 테이블 1행"""
+    off = (schema or {}).get("offers", {})
+    if isinstance(off, list): off = off[0] if off else {}
+    market = run.get("market", "")
+    s_p, v_p = price_value(off.get("price"), market), price_value(scrape.get("visual_price"), market)
+    return {
+        "run_ts": run["run_ts"],
+        "product_id": run.get("product_id", ""),
+        "market": market,
+        "region_id": rid or "",
+        "url": url,
+        "source": block.get("source", "browser"),
+        "status": block.get("status") or scrape.get("status") or "ok",
+        "schema_price": str(off.get("price", "")),
+        "schema_currency": str(off.get("priceCurrency", "")),
+        "schema_availability": str(off.get("availability", "")).replace("https://schema.org/", "").replace("http://schema.org/", ""),
+        "visual_price": scrape.get("visual_price", ""),
+        "cta_text": scrape.get("buy_button_text", ""),
+        # 가격이 양쪽 다 있을 때만 비교 (availability 는 GMC 값이 필요하므로 app 에서 비교)
+        "mismatch": int(s_p is not None and v_p is not None and abs(s_p - v_p) > 0.005),
+        "image_path": block.get("image_path_abs", ""),
+        "schema_json": json.dumps(schema or {}, ensure_ascii=False),
+        "scrape_json": json.dumps(scrape, ensure_ascii=False),
+        "created_at": time.time(),
+    }
+
+
+def _decode(row: sqlite3.Row) -> Dict:
+    d = dict(row)
+    for k in ("schema_json", "scrape_json"):
+        if k in d:
+            try: d[k[:-5]] = json.loads(d.pop(k) or "{}")
+            except ValueError: d[k[:-5]] = {}
+    return d
+
+
+class ResultsStore:
+    def __init__(self, path: Path):
+        self.path = path
+        self.local = threading.local()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # 스레드마다 연결 하나 (WAL 이라 app 의 조회와 크롤러의 기록이 서로 막지 않음)
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def record_run(self, run_meta: Dict, rows: List[Dict]):
+        """제품 1회 실행과 리전 결과를 한 트랜잭션으로 일괄 저장"""
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO runs (run_ts, product_id, url, market, param, out_dir, report_path, started_at, finished_at) "
+                         "VALUES (:run_ts, :product_id, :url, :market, :param, :out_dir, :report_path, :started_at, :finished_at)", run_meta)
+            # 같은 run_ts 를 여러 샤드가 나눠 기록하므로 이번에 기록하는 리전만 교체
+            conn.executemany("DELETE FROM results WHERE run_ts = ? AND region_id = ?", [(r["run_ts"], r["region_id"]) for r in rows])
+            conn.executemany(f"INSERT INTO results ({', '.join(RESULT_COLUMNS)}) VALUES ({', '.join(':' + c for c in RESULT_COLUMNS)})", rows)
+
+    def run_results(self, run_ts: str) -> List[Dict]:
+        cur = self._conn().execute("SELECT * FROM results WHERE run_ts = ? ORDER BY id", (run_ts,))
+        return [_decode(r) for r in cur]
+
+    def region_schemas(self, run_ts: str, region_ids: List[str]) -> Dict[str, Dict]:
+        """실행의 일부 리전만 schema 조회 (app 의 결과 페이지용, 전체 run_results 를 메모리에 올리지 않음)"""
+        if not region_ids: return {}
+        cur = self._conn().execute(f"SELECT region_id, schema_json FROM results WHERE run_ts = ? AND region_id IN ({', '.join('?' * len(region_ids))})",
+                                   [run_ts, *region_ids])
+        return {r["region_id"]: _decode(r)["schema"] for r in cur}
+
+    def latest_per_region(self, product_id: str) -> List[Dict]:
+        """SKU 별 리전마다 가장 최근 결과"""
+        cur = self._conn().execute(
+            "SELECT * FROM (SELECT *, ROW_NUMBER() OVER (PARTITION BY region_id ORDER BY created_at DESC) AS rn "
+            "FROM results WHERE product_id = ?) WHERE rn = 1 ORDER BY region_id", (product_id,))
+        return [_decode(r) for r in cur]
+
+    def mismatches(self, market: str, since: Optional[float] = None) -> List[Dict]:
+        """시장별 가격 불일치 (since 미지정 시 오늘 0시 이후)"""
+        if since is None:
+            t = time.localtime()
+            since = time.mktime((t.tm_year, t.tm_mon, t.tm_mday, 0, 0, 0, 0, 0, -1))
+        cur = self._conn().execute("SELECT * FROM results WHERE market = ? AND created_at >= ? AND mismatch = 1 ORDER BY created_at DESC",
+                                   (market, since))
+        return [_decode(r) for r in cur]
+
+    def record_expected(self, rows: List[Dict]):
+        """피드 기대값 일괄 저장 (같은 제품/리전은 최신 피드 값으로 교체)
+        market/link 가 빈 행(지역 재고 전용 피드)은 이미 저장된 market/link 를 유지"""
+        conn = self._conn()
+        with conn:
+            conn.executemany(f"INSERT INTO expected ({', '.join(EXPECTED_COLUMNS)}) VALUES ({', '.join(':' + c for c in EXPECTED_COLUMNS)}) "
+                             "ON CONFLICT (product_id, region_id) DO UPDATE SET "
+                             "market = COALESCE(NULLIF(excluded.market, ''), expected.market), link = COALESCE(NULLIF(excluded.link, ''), expected.link), "
+                             "price = excluded.price, sale_price = excluded.sale_price, availability = excluded.availability, "
+                             "feed = excluded.feed, updated_at = excluded.updated_at",
+                             [{c: r.get(c, "") for c in EXPECTED_COLUMNS} for r in rows])
+
+    def expected_market(self, product_id: str) -> Optional[str]:
+        """상품 피드에서 저장된 제품의 시장 (없으면 None). 지역 재고 전용 행의 --markets 필터용"""
+        row = self._conn().execute("SELECT market FROM expected WHERE product_id = ? AND market != '' ORDER BY region_id LIMIT 1",
+                                   (product_id,)).fetchone()
+        return row[0] if row else None
+
+    def expected_for(self, product_ids: List[str]) -> List[Dict]:
+        out = []
+        ids = sorted(set(product_ids))
+        for k in range(0, len(ids), 500):  # SQLite 변수 개수 제한
+            chunk = ids[k:k + 500]
+            cur = self._conn().execute(f"SELECT * FROM expected WHERE product_id IN ({', '.join('?' * len(chunk))})", chunk)
+            out.extend(dict(r) for r in cur)
+        return out
+
+    def export_json(self, run_ts: str, out_path: Path) -> Path:
+        run = self._conn().execute("SELECT * FROM runs WHERE run_ts = ?", (run_ts,)).fetchone()
+        payload = {"run": dict(run) if run else {"run_ts": run_ts}, "results": self.run_results(run_ts)}
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+        return out_path
@@ -1,49 +1,194 @@
+import json
 import os
 import shutil
+import threading
 import time
+import zipfile
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime
+from typing import Dict, Optional
 
 # 결과 폴더들이 저장되는 상위 폴더 경로
 HERE = Path(__file__).resolve().parent
 OUTS_DIR = HERE / "outs"
+CONFIG_FILE = HERE / "retention_config.json"
+INDEX_FILE = OUTS_DIR / ".retention_index.json"
+ARCHIVE_DIR = OUTS_DIR / "archive"
 
-# 기준 시간 설정 (3일)
+# 기준 시간 설정 (3일). retention_config.json 이 없을 때의 기본값
 DAYS_TO_KEEP = 3
+DEFAULTS = {
+    "max_age_days": DAYS_TO_KEEP,
+    "max_total_mb": 5000,       # outs/ 실행 폴더 전체 용량 상한 (초과 시 LRU 삭제)
+    "keep_latest": 5,           # 용량 초과여도 가장 최근 실행 N개는 유지
+    "settle_sec": 600,          # 이보다 최근에 만들어진 폴더는 실행 중일 수 있으므로 건드리지 않음
+    "archive": False,           # 삭제 전에 archive/outs_<yyyymm>.zip 으로 압축 보관
+    "archive_max_mb": 2000,
+    "interval_sec": 3600,
+}
+TOUCH_SAVE_SEC = 60  # 같은 폴더의 last_access 갱신/저장 최소 간격
+
+
+def load_config() -> Dict:
+    cfg = dict(DEFAULTS)
+    if CONFIG_FILE.exists():
+        try: cfg.update(json.loads(CONFIG_FILE.read_text(encoding="utf-8")))
+        except ValueError as e: print(f"retention_config.json 읽기 실패, 기본값 사용: {e}")
+    return cfg
+
+
+def folder_created(folder: Path) -> float:
+    # 폴더명 예시: out_20260209_181319_123456 / out_20260209_181319_123456_batch
+    try: return datetime.strptime("_".join(folder.name.split("_")[1:3]), "%Y%m%d_%H%M%S").timestamp()
+    except (IndexError, ValueError): return folder.stat().st_mtime
+
+
+def folder_size(folder: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            try: total += os.path.getsize(os.path.join(root, name))
+            except OSError: pass
+    return total
+
+
+class RetentionService:
+    """outs/ 정리: 나이 제한 + 용량 상한(LRU) + 선택적 압축 보관. 폴더 크기는 인덱스에 저장해 새 폴더만 다시 계산"""
+
+    def __init__(self, outs_dir: Path = OUTS_DIR, config: Optional[Dict] = None):
+        self.outs_dir = outs_dir
+        self.index_path = outs_dir / INDEX_FILE.name
+        self.archive_dir = outs_dir / ARCHIVE_DIR.name
+        self.cfg = config or load_config()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.last_report: Dict = {}
+        try: self.index: Dict[str, Dict] = json.loads(self.index_path.read_text(encoding="utf-8")).get("folders", {})
+        except (OSError, ValueError): self.index = {}
+
+    def _save_index(self):
+        tmp = self.index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"folders": self.index, "last_report": self.last_report}), encoding="utf-8")
+        os.replace(tmp, self.index_path)
+
+    def touch(self, folder) -> None:
+        """결과를 화면에 띄우는 등 실행 폴더를 사용했을 때 호출 (LRU 기준). rerun 마다 불려도 TOUCH_SAVE_SEC 에 한 번만 기록"""
+        folder = Path(folder)
+        now = time.time()
+        with self.lock:
+            entry = self.index.get(folder.name)
+            if entry is None:
+                # 아직 정리 주기에 한 번도 안 잡힌 폴더 (방금 끝난 실행): 크기는 다음 run_once 에서 계산
+                if not folder.is_dir(): return
+                entry = self.index[folder.name] = {"created": folder_created(folder), "last_access": now, "size": 0, "final": False}
+            elif now - entry["last_access"] < TOUCH_SAVE_SEC: return
+            entry["last_access"] = now
+            self._save_index()
+
+    def _refresh_index(self, now: float) -> int:
+        # 상위 폴더 목록만 훑고, 새로 생겼거나 아직 안정화되지 않은 폴더만 크기 재계산
+        rescanned = 0
+        present = set()
+        for folder in self.outs_dir.iterdir():
+            if not (folder.is_dir() and folder.name.startswith("out_")): continue
+            present.add(folder.name)
+            entry = self.index.get(folder.name)
+            if entry is not None and entry.get("final"): continue
+            created = entry["created"] if entry else folder_created(folder)
+            self.index[folder.name] = {
+                "created": created,
+                "last_access": entry["last_access"] if entry else created,
+                "size": folder_size(folder),
+                "final": now - created > self.cfg["settle_sec"],
+            }
+            rescanned += 1
+        for name in set(self.index) - present: del self.index[name]
+        return rescanned
+
+    def _archive(self, folder: Path):
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        zip_path = self.archive_dir / f"outs_{datetime.fromtimestamp(self.index[folder.name]['created']):%Y%m}.zip"
+        with zipfile.ZipFile(zip_path, "a", compression=zipfile.ZIP_DEFLATED) as zf:
+            for f in folder.rglob("*"):
+                if f.is_file(): zf.write(f, f"{folder.name}/{f.relative_to(folder).as_posix()}")
+        # 압축 보관본도 상한을 넘으면 오래된 달부터 삭제
+        archives = sorted(self.archive_dir.glob("outs_*.zip"))
+        total = sum(a.stat().st_size for a in archives)
+        for a in archives[:-1]:
+            if total <= self.cfg["archive_max_mb"] * 1024 * 1024: break
+            total -= a.stat().st_size
+            a.unlink()
+
+    def _evict(self, name: str, reason: str, report: Dict):
+        folder = self.outs_dir / name
+        try:
+            if self.cfg["archive"]:
+                self._archive(folder)
+                report["archived"] += 1
+            shutil.rmtree(folder)
+            report["reclaimed_bytes"] += self.index[name]["size"]
+            report["deleted"] += 1
+            print(f"삭제됨: {name} ({reason})")
+            del self.index[name]
+        except Exception as e:
+            print(f"삭제 실패 ({name}): {e}")
+
+    def run_once(self) -> Dict:
+        t0 = time.perf_counter()
+        now = time.time()
+        report = {"deleted": 0, "archived": 0, "reclaimed_bytes": 0}
+        if not self.outs_dir.exists():
+            return report
+        with self.lock:
+            report["rescanned"] = self._refresh_index(now)
+            # 1) 나이 제한
+            max_age = self.cfg["max_age_days"] * 86400
+            for name in [n for n, e in self.index.items() if now - e["created"] > max_age]:
+                self._evict(name, f"{self.cfg['max_age_days']}일 경과", report)
+            # 2) 용량 상한: 최근 실행 keep_latest 개와 실행 중일 수 있는 폴더는 제외하고 마지막 사용 순으로 삭제
+            total = sum(e["size"] for e in self.index.values())
+            newest = set(sorted(self.index, key=lambda n: self.index[n]["created"])[-self.cfg["keep_latest"]:]) if self.cfg["keep_latest"] else set()
+            candidates = [n for n in self.index if n not in newest and self.index[n]["final"]]
+            for name in sorted(candidates, key=lambda n: self.index[n]["last_access"]):
+                if total <= self.cfg["max_total_mb"] * 1024 * 1024: break
+                size = self.index[name]["size"]
+                self._evict(name, "용량 초과", report)
+                if name not in self.index: total -= size
+            report.update(folders=len(self.index), total_bytes=sum(e["size"] for e in self.index.values()),
+                          duration_ms=round((time.perf_counter() - t0) * 1000, 1), finished_at=now)
+            self.last_report = report
+            self._save_index()
+        print(f"정리 완료. {report['deleted']}개 삭제 ({report['archived']}개 보관), {report['reclaimed_bytes'] / 1024 / 1024:.1f}MB 확보, "
+              f"{report['rescanned']}개 폴더 재계산, {report['duration_ms']:.0f}ms")
+        return report
+
+    def _loop(self):
+        while not self.stop_event.is_set():
+            try: self.run_once()
+            except Exception as e: print(f"정리 실패: {e}")
+            self.stop_event.wait(self.cfg["interval_sec"])
+
+    def start(self) -> "RetentionService":
+        threading.Thread(target=self._loop, name="retention", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
 
 def cleanup_old_folders():
     print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] 오래된 결과 폴더 정리 시작...")
-    
     if not OUTS_DIR.exists():
         print("outs 폴더가 존재하지 않습니다.")
-        return
-
-    deleted_count = 0
-    now = datetime.now()
-    threshold_date = now - timedelta(days=DAYS_TO_KEEP)
-
-    # outs 폴더 안의 모든 항목 조사
-    for folder in OUTS_DIR.iterdir():
-        # 폴더이면서 이름이 'out_'으로 시작하는 경우만 대상
-        if folder.is_dir() and folder.name.startswith("out_"):
-            try:
-                # 폴더명 예시: out_20260209_181319
-                # 'out_' 뒤의 날짜 부분(8자리)만 추출
-                date_str = folder.name.split('_')[1]
-                folder_date = datetime.strptime(date_str, "%Y%m%d")
-
-                # 폴더 날짜가 7일보다 이전이면 삭제
-                if folder_date < threshold_date:
-                    shutil.rmtree(folder)
-                    print(f"삭제됨: {folder.name} (생성일: {date_str})")
-                    deleted_count += 1
-            except (IndexError, ValueError):
-                # 폴더명 형식이 맞지 않는 경우 무시
-                continue
-            except Exception as e:
-                print(f"삭제 실패 ({folder.name}): {e}")
-
-    print(f"정리 완료. 총 {deleted_count}개의 폴더가 삭제되었습니다.")
+        return {}
+    return RetentionService().run_once()
+
 
 if __name__ == "__main__":
-    cleanup_old_folders()
\ No newline at end of file
+    import sys
+    # --loop: 백그라운드 서비스처럼 interval_sec 마다 반복
+    if "--loop" in sys.argv:
+        svc = RetentionService()
+        svc._loop()
+    else:
+        cleanup_old_folders()
@@ -0,0 +1,181 @@
+import base64
+import gzip
+import http.client
+import json
+import re
+import threading
+import zlib
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+# 렌더링 없이 HTML 만 받아서 JSON-LD(offers) 를 파싱하는 빠른 경로 (Price 모드 전용)
+# 차단되었거나 JSON-LD 가 없으면 호출 측에서 브라우저로 다시 처리함
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+BLOCK_CODES = (401, 403, 429)
+
+
+def pick_product_offer(raw_blocks: List[str]) -> Optional[Dict]:
+    for raw in raw_blocks:
+        try:
+            data = json.loads(raw)
+            schema_type = data.get("@type")
+            is_product = False
+            if isinstance(schema_type, str) and schema_type.lower() == "product":
+                is_product = True
+            elif isinstance(schema_type, list) and any(t.lower() == "product" for t in schema_type if isinstance(t, str)):
+                is_product = True
+
+            if is_product and "offers" in data:
+                return data
+        except: continue
+    return None
+
+
+class _JsonLdParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks: List[str] = []
+        self._buf: Optional[List[str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "script" and (dict(attrs).get("type") or "").strip().lower() == "application/ld+json":
+            self._buf = []
+
+    def handle_data(self, data):
+        if self._buf is not None: self._buf.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "script" and self._buf is not None:
+            self.blocks.append("".join(self._buf))
+            self._buf = None
+
+
+def extract_jsonld_blocks(html: str) -> List[str]:
+    parser = _JsonLdParser()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception: pass
+    return parser.blocks
+
+
+def is_blocked(status: int, html: str) -> bool:
+    return status in BLOCK_CODES or "Access Denied" in html
+
+
+class HttpClient:
+    """스레드마다 host 별 keep-alive 연결을 재사용하는 최소 HTTP 클라이언트 (프록시 CONNECT 지원)"""
+
+    def __init__(self, headers: Dict[str, str], timeout: float = 30, proxy_server: str = "", proxy_user: str = "", proxy_pass: str = ""):
+        self.headers = dict(headers)
+        self.headers.setdefault("Accept-Encoding", "gzip, deflate")
+        self.headers.setdefault("Connection", "keep-alive")
+        self.timeout = timeout
+        self.proxy = urlsplit(proxy_server if "://" in proxy_server else f"http://{proxy_server}") if proxy_server else None
+        self.proxy_headers = {}
+        if proxy_user:
+            token = base64.b64encode(f"{proxy_user}:{proxy_pass}".encode("utf-8")).decode("ascii")
+            self.proxy_headers["Proxy-Authorization"] = f"Basic {token}"
+        self._local = threading.local()
+        self._all = []
+        self._lock = threading.Lock()
+
+    def _conn(self, scheme: str, netloc: str):
+        conns = getattr(self._local, "conns", None)
+        if conns is None: conns = self._local.conns = {}
+        key = (scheme, netloc)
+        if key not in conns:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            if self.proxy:
+                conn = cls(self.proxy.hostname, self.proxy.port or 8080, timeout=self.timeout)
+                if scheme == "https": conn.set_tunnel(netloc, headers=self.proxy_headers)
+            else:
+                conn = cls(netloc, timeout=self.timeout)
+            conns[key] = conn
+            with self._lock: self._all.append(conn)
+        return conns[key]
+
+    def _drop(self, scheme: str, netloc: str):
+        conn = self._local.conns.pop((scheme, netloc), None)
+        if conn: conn.close()
+
+    def get(self, url: str, max_redirects: int = 5) -> Tuple[int, str, str, int]:
+        """(status, 디코딩된 본문, 최종 URL, 압축 해제 전 수신 바이트 수 - 리다이렉트 응답 포함)"""
+        raw_bytes = 0
+        for _ in range(max_redirects + 1):
+            u = urlsplit(url)
+            target = (u.path or "/") + (f"?{u.query}" if u.query else "")
+            headers = dict(self.headers)
+            if self.proxy and u.scheme == "http":
+                # 평문 HTTP 는 프록시에 절대 URL 로 요청
+                target = url
+                headers.update(self.proxy_headers)
+            for attempt in (1, 2):
+                conn = self._conn(u.scheme, u.netloc)
+                try:
+                    conn.request("GET", target, headers=headers)
+                    resp = conn.getresponse()
+                    body = resp.read()
+                    raw_bytes += len(body)
+                    break
+                except (http.client.HTTPException, OSError):
+                    # 서버가 keep-alive 연결을 끊은 경우 한 번만 재연결
+                    self._drop(u.scheme, u.netloc)
+                    if attempt == 2: raise
+            if resp.status in REDIRECT_CODES and resp.getheader("Location"):
+                url = urljoin(url, resp.getheader("Location"))
+                continue
+            enc = (resp.getheader("Content-Encoding") or "").lower()
+            if enc == "gzip": body = gzip.decompress(body)
+            elif enc == "deflate": body = zlib.decompress(body)
+            m = re.search(r"charset=([\w-]+)", resp.getheader("Content-Type") or "")
+            return resp.status, body.decode(m.group(1) if m else "utf-8", errors="replace"), url, raw_bytes
+        raise http.client.HTTPException(f"Too many redirects: {url}")
+
+    def close(self):
+        with self._lock:
+            for conn in self._all:
+                try: conn.close()
+                except Exception: pass
+            self._all.clear()
+
+
+class ProxyClients:
+    """--proxy_pool 용: 풀에서 빌린 프록시마다 keep-alive HttpClient 하나씩 (schema-only / revalidate 도 브라우저와 같은 경로)"""
+
+    def __init__(self, headers: Dict[str, str], timeout: float = 30):
+        self.headers = headers
+        self.timeout = timeout
+        self._clients: Dict[str, HttpClient] = {}
+        self._lock = threading.Lock()
+
+    def for_proxy(self, proxy) -> HttpClient:
+        with self._lock:
+            if proxy.key not in self._clients:
+                self._clients[proxy.key] = HttpClient(self.headers, self.timeout, proxy.server, proxy.user, proxy.password)
+            return self._clients[proxy.key]
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values(): client.close()
+            self._clients.clear()
+
+
+def fetch_schema(client: HttpClient, url: str) -> Dict:
+    """HTML 을 받아 Product JSON-LD 를 찾음. fallback=True 이면 브라우저로 다시 처리해야 함"""
+    try:
+        status, html, final_url, raw_bytes = client.get(url)
+    except Exception as e:
+        return {"status": 0, "blocked": False, "schema": None, "fallback": True, "error": str(e)}
+    blocked = is_blocked(status, html)
+    schema = None if blocked else pick_product_offer(extract_jsonld_blocks(html))
+    return {
+        "status": status,
+        "final_url": final_url,
+        "blocked": blocked,
+        "schema": schema,
+        "fallback": blocked or schema is None,
+        # [수정] 디코딩된 글자 수가 아니라 실제로 받은(gzip 상태) 바이트 수
+        "bytes": raw_bytes,
+    }
@@ -0,0 +1,94 @@
+import asyncio
+import hashlib
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow 가 없으면 PNG 원본 저장 + 바이트 해시 중복 제거만 사용
+    Image = None
+
+# 스크린샷 저장 파이프라인: 인코딩/쓰기는 스레드 풀에서 수행 (크롤링 이벤트 루프를 막지 않음)
+# 포맷 변환(WebP/JPEG), 결과 컬럼용 썸네일, 실행 폴더 단위 중복 제거
+FORMATS = ("png", "webp", "jpeg")
+DEDUP_MODES = ("off", "exact", "perceptual")
+EXT = {"png": ".png", "webp": ".webp", "jpeg": ".jpg"}
+MIN_BYTES = 1000  # 이보다 작으면 빈 화면으로 간주 (기존 기준 유지)
+
+
+def dhash(img, size: int = 16) -> str:
+    # 가로 인접 픽셀 밝기 차이 기반 해시. 가격 몇 글자 차이는 같게 나올 수 있으므로 perceptual 은 선택 사항
+    g = img.convert("L").resize((size + 1, size))
+    px = list(g.getdata())
+    bits = "".join("1" if px[r * (size + 1) + c] > px[r * (size + 1) + c + 1] else "0" for r in range(size) for c in range(size))
+    return f"{int(bits, 2):0{size * size // 4}x}"
+
+
+class ScreenshotWriter:
+    def __init__(self, fmt: str = "png", quality: int = 80, thumb_width: int = 480, dedup: str = "exact", workers: int = 2):
+        if Image is None and fmt != "png": fmt = "png"
+        self.fmt = fmt
+        self.quality = quality
+        self.thumb_width = thumb_width if Image is not None else 0
+        self.dedup = "exact" if dedup == "perceptual" and Image is None else dedup
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="shot")
+        self.lock = threading.Lock()
+        self.seen: Dict[Tuple[str, str], Dict] = {}  # (이미지 폴더, 해시) -> 먼저 저장된 결과
+
+    async def save(self, data: bytes, out_path: Path) -> Dict:
+        """page.screenshot() 바이트를 저장. out_path 의 확장자는 포맷에 맞게 바뀜"""
+        if not data or len(data) < MIN_BYTES:
+            return {"ok": False, "msg": "Screenshot empty", "bytes": len(data or b"")}
+        try: return await asyncio.get_running_loop().run_in_executor(self.pool, self._write, data, out_path)
+        except Exception as e: return {"ok": False, "msg": f"Screenshot save failed: {e}", "bytes": len(data)}
+
+    def _write(self, data: bytes, out_path: Path) -> Dict:
+        img = Image.open(io.BytesIO(data)) if Image is not None else None
+        if self.dedup == "perceptual": key = "p:" + dhash(img)
+        elif self.dedup == "exact": key = "b:" + hashlib.sha1(data).hexdigest()
+        else: key = ""
+        folder = str(out_path.parent)
+        if key:
+            with self.lock:
+                first = self.seen.get((folder, key))
+            if first is not None:
+                return dict(first, dedup_of=first["path"])
+
+        path = out_path.with_suffix(EXT[self.fmt])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if self.fmt == "png" or img is None:
+            path.write_bytes(data)
+        else:
+            if self.fmt == "webp": img.save(path, "WEBP", quality=self.quality, method=4)
+            else: img.convert("RGB").save(path, "JPEG", quality=self.quality, optimize=True)
+        thumb = self._thumbnail(img, path) if img is not None and self.thumb_width else None
+        result = {"ok": True, "msg": "ok", "path": str(path), "thumb": str(thumb) if thumb else "", "bytes": path.stat().st_size, "raw_bytes": len(data)}
+        if key:
+            with self.lock:
+                first = self.seen.setdefault((folder, key), result)
+            if first is not result:
+                # 같은 화면이 동시에 두 번 저장된 경우 나중 것은 지우고 먼저 것을 가리킴
+                for p in (path, thumb):
+                    if p and p != Path(first["path"]): p.unlink(missing_ok=True)
+                return dict(first, dedup_of=first["path"])
+        return result
+
+    def _thumbnail(self, img, path: Path) -> Optional[Path]:
+        if img.width <= self.thumb_width: return None
+        thumb_path = path.parent / "thumbs" / (path.stem + (".webp" if self.fmt == "webp" else ".jpg"))
+        thumb_path.parent.mkdir(parents=True, exist_ok=True)
+        t = img.convert("RGB")
+        t.thumbnail((self.thumb_width, self.thumb_width * img.height // img.width))
+        t.save(thumb_path, "WEBP" if self.fmt == "webp" else "JPEG", quality=70)
+        return thumb_path
+
+    def forget(self, folder: Path):
+        # 실행(run) 이 끝나면 해당 폴더의 중복 제거 기록 정리
+        with self.lock:
+            for k in [k for k in self.seen if k[0] == str(folder)]: del self.seen[k]
+
+    def close(self):
+        self.pool.shutdown(wait=True)
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# 모듈이 패키지가 아닌 평면 구조라 테스트에서 regionmismatch/ 와 bench/ 를 import 경로에 추가
+HERE = Path(__file__).resolve().parent.parent
+for p in (HERE, HERE / "bench"):
+    if str(p) not in sys.path: sys.path.insert(0, str(p))
@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+import asset_cache
+from asset_cache import MB, AssetCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AssetCache(tmp_path / "assets", dict(asset_cache.DEFAULTS))
+
+
+@pytest.mark.parametrize("url, rtype", [
+    ("https://www.lg.com/uk/api/price/MD07.js", "script"),
+    ("https://www.lg.com/lg5-common/js/price-a1b2c3d4e5.js", "script"),
+    ("https://www.lg.com/lg5-common/js/stock-a1b2c3d4e5.js", "script"),
+    ("https://www.lg.com/uk/inventory/font.woff2", "font"),
+    ("https://www.lg.com/uk/oled-tvs/OLED65C4/", "document"),
+    ("https://www.lg.com/lg5-common/js/app.a1b2c3d4e5.js", "xhr"),
+    ("https://www.lg.com/lg5-common/js/app.js", "script"),
+])
+def test_live_and_unversioned_urls_are_not_cacheable(cache, url, rtype):
+    assert not cache.cacheable(url, rtype)
+
+
+@pytest.mark.parametrize("url, rtype", [
+    ("https://www.lg.com/lg5-common/js/app.a1b2c3d4e5.js", "script"),
+    ("https://www.lg.com/lg5-common/css/main-0123abcd4567.css?x=1", "stylesheet"),
+    ("https://www.lg.com/lg5-common/js/vendor.js?v=20240501", "script"),
+    ("https://www.lg.com/lg5-common/fonts/LGEI.woff2", "font"),
+])
+def test_immutable_assets_and_fonts_are_cacheable(cache, url, rtype):
+    assert cache.cacheable(url, rtype)
+
+
+def test_storable_rejects_errors_and_no_store():
+    assert AssetCache.storable(200, {"cache-control": "public, max-age=31536000, immutable"})
+    assert not AssetCache.storable(304, {})
+    assert not AssetCache.storable(200, {"cache-control": "no-store"})
+    assert not AssetCache.storable(200, {"cache-control": "Private, max-age=60"})
+
+
+def test_put_then_get_is_a_hit(cache):
+    url = "https://www.lg.com/js/app.a1b2c3d4e5.js"
+    assert cache.get(url) is None
+    cache.put(url, b"console.log(1)", {"content-type": "application/javascript", "content-encoding": "gzip"})
+    entry, body = cache.get(url)
+    assert body == b"console.log(1)"
+    assert entry["headers"] == {"content-type": "application/javascript"}
+    assert cache.state()["hits"] == 1 and cache.state()["stored"] == 1
+
+
+def test_same_body_is_stored_once(cache):
+    cache.put("https://a/x.a1b2c3d4e5.js", b"same", {})
+    cache.put("https://b/x.a1b2c3d4e5.js", b"same", {})
+    assert len([p for p in cache.blobs.rglob("*") if p.is_file()]) == 1
+    assert cache.state()["entries"] == 2
+
+
+def test_blob_is_read_from_disk_by_a_new_instance(cache, tmp_path):
+    cache.put("https://a/x.a1b2c3d4e5.js", b"body", {})
+    cache.save()
+    other = AssetCache(tmp_path / "assets", dict(asset_cache.DEFAULTS))
+    assert other.get("https://a/x.a1b2c3d4e5.js")[1] == b"body"
+
+
+def test_evict_drops_least_recently_used_first(tmp_path):
+    cache = AssetCache(tmp_path / "assets", dict(asset_cache.DEFAULTS, max_mb=3 / MB * 1024, mem_mb=0))
+    for i, name in enumerate("abcd"):
+        cache.put(f"https://x/{name}.a1b2c3d4e5.js", name.encode() * 1024, {})
+        cache.index[cache.url_key(f"https://x/{name}.a1b2c3d4e5.js")]["last_access"] = 100 + i
+    # a 를 가장 최근에 사용 -> b 가 가장 오래됨
+    cache.index[cache.url_key("https://x/a.a1b2c3d4e5.js")]["last_access"] = 200
+    cache.evict()
+    kept = {e["url"].rsplit("/", 1)[-1][0] for e in cache.index.values()}
+    assert kept == {"a", "d"}
+    assert cache.state()["evicted"] == 2
+    assert cache.get("https://x/b.a1b2c3d4e5.js") is None
+
+
+def test_evict_keeps_blob_shared_by_a_recent_url(tmp_path):
+    cache = AssetCache(tmp_path / "assets", dict(asset_cache.DEFAULTS, max_mb=2 / MB * 1024))
+    cache.put("https://old/x.a1b2c3d4e5.js", b"s" * 1024, {})
+    cache.put("https://new/x.a1b2c3d4e5.js", b"s" * 1024, {})
+    cache.put("https://y/big.a1b2c3d4e5.js", b"b" * 2048, {})
+    cache.index[cache.url_key("https://old/x.a1b2c3d4e5.js")]["last_access"] = 1
+    cache.index[cache.url_key("https://y/big.a1b2c3d4e5.js")]["last_access"] = 2
+    cache.evict()
+    # 공유 blob 은 new 가 최근에 사용했으므로 유지, big 만 삭제
+    assert cache.get("https://old/x.a1b2c3d4e5.js") and cache.get("https://new/x.a1b2c3d4e5.js")
+    assert cache.get("https://y/big.a1b2c3d4e5.js") is None
+
+
+def test_save_merges_entries_written_by_another_process(cache, tmp_path):
+    cache.put("https://a/x.a1b2c3d4e5.js", b"mine", {})
+    mine = cache.index[cache.url_key("https://a/x.a1b2c3d4e5.js")]
+    # 다른 샤드가 먼저 저장한 index: 새 URL 하나 + 같은 URL 의 더 최근 사용 기록
+    other = AssetCache(tmp_path / "assets", dict(asset_cache.DEFAULTS))
+    other.put("https://b/y.a1b2c3d4e5.js", b"theirs", {})
+    other.index[cache.url_key("https://a/x.a1b2c3d4e5.js")] = dict(mine, last_access=mine["last_access"] + 60, hits=7)
+    other.save()
+    cache.save()
+    saved = json.loads(cache.index_path.read_text(encoding="utf-8"))
+    assert {e["url"] for e in saved.values()} == {"https://a/x.a1b2c3d4e5.js", "https://b/y.a1b2c3d4e5.js"}
+    assert saved[cache.url_key("https://a/x.a1b2c3d4e5.js")]["hits"] == 7
+
+
+def test_load_config_overrides_defaults(tmp_path):
+    (tmp_path / asset_cache.CONFIG_FILE).write_text(json.dumps({"max_mb": 5}), encoding="utf-8")
+    cfg = asset_cache.load_config(tmp_path)
+    assert cfg["max_mb"] == 5 and cfg["live_patterns"] == asset_cache.DEFAULTS["live_patterns"]
@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+
+import comparison
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("https://schema.org/InStock", "InStock"),
+    ("http://schema.org/OutOfStock", "OutOfStock"),
+    ("PreOrder", "PreOrder"),
+    ("in_stock", "InStock"),
+    ("out of stock", "OutOfStock"),
+    ("pre-order", "PreOrder"),
+    ("backorder", "BackOrder"),
+    # 토큰이 아닌 문구 (현지화된 CTA 등) 는 부분 문자열이 있어도 그대로
+    ("Obtenir une alerte de stock", "Obtenir une alerte de stock"),
+    ("Jetzt kaufen - in stock soon", "Jetzt kaufen - in stock soon"),
+    ("Print out", "Print out"),
+    ("", ""),
+])
+def test_normalize_availability_maps_only_exact_tokens(value, expected):
+    assert comparison.normalize_availability(pd.Series([value])).iloc[0] == expected
+
+
+def test_untranslated_cta_is_not_guessed_from_substrings(tmp_path):
+    trans = tmp_path / "translations.json"
+    trans.write_text('{"market_map": {"fr": {"acheter maintenant": "InStock"}}}', encoding="utf-8")
+    table = comparison.ComparisonTable(trans)
+    base = {"product_id": "P1", "market": "fr", "status": "", "schema_price": "", "visual_price": "", "schema_availability": "https://schema.org/InStock"}
+    table.add_rows([dict(base, run_ts="t", region_id="r1", cta_text="Acheter maintenant"),
+                    dict(base, run_ts="t", region_id="r2", cta_text="Stock épuisé, prévenez-moi")])
+    df = table.frame("Availability", default_gmc="in stock").set_index("Region")
+    assert not df.loc["r1", "Mismatch"] and not df.loc["r1", "Schema_Mismatch"]
+    # 번역표에 없는 문구는 원문 그대로 비교 -> 불일치로 보임 (InStock/OutOfStock 으로 추측하지 않음)
+    assert df.loc["r2", "LG.com"] == "Stock épuisé, prévenez-moi" and df.loc["r2", "Mismatch"]
@@ -0,0 +1,33 @@
+import contextvars
+import json
+import queue
+
+import events
+
+
+def test_listen_receives_json_lines_and_skips_garbage():
+    got = queue.Queue()
+    srv = events.listen(got.put, backlog=4)
+    try:
+        sink = events.SocketSink(events.address(srv))
+        sink('{"type": "run_start", "regions": 2}')
+        sink("not json")
+        sink('{"type": "run_end"}')
+        sink.close()
+        assert got.get(timeout=2) == {"type": "run_start", "regions": 2}
+        assert got.get(timeout=2) == {"type": "run_end"}
+    finally:
+        srv.close()
+
+
+
+def test_emit_event_goes_to_task_sink_with_bound_fields():
+    lines = []
+    ctx = contextvars.copy_context()
+    def run():
+        events.use_sink(lines.append)
+        events.bind(region="r1")
+        events.emit_event("error", kind="failed")
+    ctx.run(run)
+    ev = json.loads(lines[0])
+    assert (ev["type"], ev["region"], ev["kind"]) == ("error", "r1", "failed")
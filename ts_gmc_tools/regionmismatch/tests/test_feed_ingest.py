@@ -0,0 +1,40 @@
+import feed_ingest
+import results_store
+
+
+def write_feeds(tmp_path):
+    (tmp_path / "regions_config.json").write_text("{}", encoding="utf-8")
+    (tmp_path / "products.tsv").write_text("id\tlink\tprice\n"
+                                           "p1\thttps://www.example.com/uk/p1\t10\n"
+                                           "p2\thttps://www.example.com/de/p2\t20\n"
+                                           "p4\thttps://www.example.com/uk/p4\t40\n", encoding="utf-8")
+    (tmp_path / "regional.tsv").write_text("id\tregion_id\tprice\n"
+                                           "p1\tr1\t11\n"
+                                           "p2\tr1\t21\n"
+                                           "p3\tr1\t31\n"
+                                           "p4\tr1\t41\n", encoding="utf-8")
+    return [tmp_path / "products.tsv", tmp_path / "regional.tsv"]
+
+
+def ingest(tmp_path, store, **kw):
+    return feed_ingest.ingest(write_feeds(tmp_path), store, tmp_path / "jobs.jsonl", script_dir=tmp_path, log=lambda *_: None, **kw)
+
+
+def test_regional_feed_keeps_product_market_and_link_and_applies_market_filter(tmp_path):
+    store = results_store.ResultsStore(tmp_path / "results.db")
+    store.record_expected([feed_ingest.expected_row("p1", "r1", "uk", "https://www.example.com/uk/p1", {"price": "9"}, "old.xml")])
+    stats = ingest(tmp_path, store, markets={"uk"})
+    rows = {(r["product_id"], r["region_id"]): r for r in store.expected_for(["p1", "p2", "p3", "p4"])}
+    assert sorted(rows) == [("p1", ""), ("p1", "r1"), ("p4", ""), ("p4", "r1")]
+    assert (rows["p1", "r1"]["market"], rows["p1", "r1"]["link"], rows["p1", "r1"]["price"]) == ("uk", "https://www.example.com/uk/p1", "11")
+    assert stats["filtered"] == 3
+
+
+def test_limit_caps_jobs_but_keeps_regional_rows_of_products_in_market(tmp_path):
+    store = results_store.ResultsStore(tmp_path / "results.db")
+    stats = ingest(tmp_path, store, markets={"uk"}, limit=1)
+    jobs = [line for line in (tmp_path / "jobs.jsonl").read_text(encoding="utf-8").splitlines() if line]
+    assert len(jobs) == stats["jobs"] == 1
+    rows = {(r["product_id"], r["region_id"]) for r in store.expected_for(["p1", "p2", "p3", "p4"])}
+    # p4 는 --limit 으로 작업에서 빠졌지만 uk 제품이므로 지역 기대값은 저장 (p2 는 de, p3 는 시장 모름)
+    assert rows == {("p1", ""), ("p1", "r1"), ("p4", "r1")}
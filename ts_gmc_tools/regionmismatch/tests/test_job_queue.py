@@ -0,0 +1,150 @@
+import json
+from argparse import Namespace
+
+import pytest
+
+import job_queue
+
+
+class ListSink:
+    def __init__(self): self.items = []
+    def __call__(self, text): self.items.append(text)
+    def close(self): pass
+
+
+def test_late_subscriber_replay_is_bounded():
+    job = job_queue.QueuedJob("k", [], 1, job_queue.PRIORITIES["normal"], 0)
+    for i in range(job_queue.REPLAY_LINES + 50): job.line(f"[PROGRESS] {i}")
+    job.event(json.dumps({"type": "run_start"}))
+    for i in range(job_queue.REPLAY_EVENTS + 50):
+        job.event(json.dumps({"type": "phase_end", "phase": "extract"}))
+        job.event(json.dumps({"type": "region_result", "i": i}))
+
+    sub = job_queue.Subscriber()
+    sub.events = sink = ListSink()
+    job.add(sub)
+    seen = sink.items
+    assert sub.lines.qsize() == job_queue.REPLAY_LINES
+    assert sub.lines.get_nowait() == "[PROGRESS] 50"
+    # 잘린 재생은 맨 앞에 replay_truncated 로 알림 (app 이 results.db 에서 다시 읽음)
+    first = json.loads(seen[0])
+    assert first["type"] == job_queue.TRUNCATED_EVENT and first["dropped"] == 50
+    # run_start 는 항상 재생, phase_* 는 재생하지 않음
+    assert json.loads(seen[1])["type"] == "run_start"
+    assert len(seen) == job_queue.REPLAY_EVENTS + 2
+    assert all(json.loads(e)["type"] != "phase_end" for e in seen)
+
+    job.finish(0)
+    assert not job.replay_lines and not job.replay_events and not job.pinned_events
+
+
+def test_full_replay_is_not_marked_truncated():
+    job = job_queue.QueuedJob("k", [], 1, job_queue.PRIORITIES["normal"], 0)
+    job.event(json.dumps({"type": "region_result"}))
+    sub = job_queue.Subscriber()
+    sub.events = sink = ListSink()
+    job.add(sub)
+    assert [json.loads(e)["type"] for e in sink.items] == ["region_result"]
+
+
+def args(**kw):
+    base = dict(url="https://www.lg.com/uk/p", regions="", events_addr="", no_open=False, schema_only=False, concurrency=1)
+    return Namespace(**dict(base, **kw))
+
+
+def test_job_key_ignores_region_order_and_per_subscriber_args():
+    jobs = [{"product_id": "P1", "url": "https://www.lg.com/uk/p", "regions": "r02,r01", "param": "region_id"}]
+    same = [dict(jobs[0], regions="r01, r02")]
+    key = job_queue.job_key(args(), jobs)
+    assert job_queue.job_key(args(events_addr="127.0.0.1:1", no_open=True, url="x"), same) == key
+    assert job_queue.job_key(args(schema_only=True), jobs) != key
+    assert job_queue.job_key(args(), [dict(jobs[0], regions="r01")]) != key
+
+
+class Recorder:
+    def __init__(self): self.started, self.cancelled = [], []
+    def start(self, job): self.started.append(job)
+    def cancel(self, job): self.cancelled.append(job)
+
+
+@pytest.fixture
+def rec():
+    return Recorder()
+
+
+def make_queue(rec, max_running=1, max_queued=10, sec_per_region=10.0):
+    return job_queue.JobQueue(max_running, max_queued, rec.start, rec.cancel, sec_per_region)
+
+
+def sub(priority="normal"):
+    return job_queue.Subscriber(priority=job_queue.PRIORITIES[priority])
+
+
+def drain(s):
+    out = []
+    while not s.lines.empty(): out.append(s.lines.get_nowait())
+    return out
+
+
+def test_identical_jobs_coalesce_into_one_run(rec):
+    q = make_queue(rec)
+    a, b = sub(), sub()
+    job, coalesced = q.submit("k", ["--url", "x"], 3, a)
+    job.line("[PROGRESS] started")
+    job2, coalesced2 = q.submit("k", ["--url", "x"], 3, b)
+    assert not coalesced and coalesced2 and job2 is job
+    assert rec.started == [job] and len(job.subscribers) == 2
+    # 합류한 구독자도 지금까지의 로그를 재생 받음
+    assert "[PROGRESS] started" in drain(b)
+    # 한 구독자가 나가도 job 은 계속, 마지막 구독자가 나가면 취소
+    assert q.leave(job.id, a.id) and not rec.cancelled
+    assert q.leave(job.id, b.id) and rec.cancelled == [job]
+
+
+def test_concurrency_limit_and_priority_order(rec):
+    q = make_queue(rec, max_running=2)
+    running = [q.submit(f"run{i}", [], 1, sub())[0] for i in range(2)]
+    low = q.submit("low", [], 1, sub("low"))[0]
+    normal = q.submit("normal", [], 1, sub())[0]
+    high = q.submit("high", [], 1, sub("high"))[0]
+    assert rec.started == running and len(q.running) == 2
+    q.finished(running[0], 0)
+    q.finished(running[1], 0)
+    assert rec.started[2:] == [high, normal]
+    q.finished(high, 0)
+    assert rec.started[-1] is low
+
+
+def test_higher_priority_subscriber_promotes_queued_job(rec):
+    q = make_queue(rec)
+    q.submit("busy", [], 1, sub())
+    first = q.submit("a", [], 1, sub())[0]
+    later = q.submit("b", [], 1, sub("low"))[0]
+    q.submit("b", [], 1, sub("high"))
+    assert later.priority == job_queue.PRIORITIES["high"]
+    assert [j for j, _, _ in q.positions()] == [later, first]
+
+
+def test_queue_full_raises(rec):
+    q = make_queue(rec, max_queued=1)
+    q.submit("run", [], 1, sub())
+    q.submit("wait", [], 1, sub())
+    with pytest.raises(job_queue.QueueFull):
+        q.submit("more", [], 1, sub())
+    # 같은 감사 합류는 대기열 한도와 무관
+    assert q.submit("wait", [], 1, sub())[1]
+
+
+def test_positions_and_eta_fill_free_slots_in_order(rec, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(job_queue.time, "time", lambda: now[0])
+    q = make_queue(rec, max_running=2, sec_per_region=10.0)
+    q.submit("r1", [], 3, sub())
+    q.submit("r2", [], 6, sub())
+    now[0] += 10
+    w1, w2, w3 = (q.submit(f"w{i}", [], 2, sub())[0] for i in range(3))
+    # 실행 중: 남은 20s / 50s -> w1 은 20s 후, w2 는 w1 이 끝나는 40s 후, w3 는 r2 가 끝나는 50s 후
+    assert [(j, pos, eta) for j, pos, eta in q.positions()] == [(w1, 1, 20), (w2, 2, 40), (w3, 3, 50)]
+    q.announce()
+    last = json.loads(drain(next(iter(w2.subscribers.values())))[-1][len("[QUEUE] "):])
+    assert last["position"] == 2 and last["eta_sec"] == 40 and last["running"] == 2
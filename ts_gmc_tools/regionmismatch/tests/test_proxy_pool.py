@@ -0,0 +1,136 @@
+import json
+
+import pytest
+
+import proxy_pool
+
+SETTINGS = {"quarantine_after": 2, "cooldown_sec": 100, "explore": 0}
+
+
+@pytest.fixture
+def now(monkeypatch):
+    t = [1000.0]
+    monkeypatch.setattr(proxy_pool.time, "time", lambda: t[0])
+    return t
+
+
+def make(n=2, stats_path=None, **settings):
+    entries = [{"server": f"http://10.0.0.{i}:8080", "label": f"p{i}"} for i in range(n)]
+    return proxy_pool.ProxyPool(entries, dict(SETTINGS, **settings), stats_path)
+
+
+def test_score_prefers_healthy_then_fast_proxies():
+    pool = make(3)
+    fast, slow, denied = pool.proxies
+    for _ in range(8):
+        pool.record(fast, "ok", 500)
+        pool.record(slow, "ok", 6000)
+    for _ in range(4): pool.record(denied, "ok", 500)
+    pool.record(denied, "denied")
+    assert [s["label"] for s in pool.summary()] == ["p0", "p2", "p1"]
+    # Access Denied 는 일반 오류보다 크게 감점
+    other = make(2)
+    err, den = other.proxies
+    other.record(err, "error")
+    other.record(den, "denied")
+    assert err.score(other.settings) > den.score(other.settings)
+
+
+def test_acquire_spreads_by_score_and_in_flight(monkeypatch):
+    pool = make(2)
+    good, bad = pool.proxies
+    for _ in range(5): pool.record(good, "ok", 100)
+    pool.record(bad, "error")
+    calls = []
+    monkeypatch.setattr(proxy_pool.random, "choices", lambda live, weights: calls.append(dict(zip(live, weights))) or [live[0]])
+    pool.acquire()
+    pool.acquire()
+    first, second = calls
+    assert first[good] > first[bad]
+    # 이미 빌려 간 프록시는 in_flight 만큼 가중치가 줄어듦
+    assert second[good] == pytest.approx(first[good] / 2)
+    pool.release(good); pool.release(good)
+    assert good.in_flight == 0
+
+
+def test_quarantine_after_consecutive_failures_with_doubling_cooldown(now):
+    pool = make(2)
+    p, other = pool.proxies
+    pool.record(p, "error")
+    assert p.quarantined_until == 0
+    pool.record(p, "denied")
+    assert p.quarantined_until == now[0] + 100
+    assert pool.acquire() is other
+    pool.release(other)
+
+    # cooldown 이후 half-open: 첫 실패 한 번으로 바로 재격리, 두 번째는 2배
+    now[0] += 100
+    pool.record(p, "error")
+    assert p.quarantined_until == now[0] + 200
+    # 성공하면 연속 실패/격리 횟수 초기화 -> 다시 quarantine_after 만큼 버티고 cooldown 도 처음 값
+    now[0] += 200
+    pool.record(p, "ok", 100)
+    pool.record(p, "error")
+    assert p.quarantined_until <= now[0]
+    pool.record(p, "error")
+    assert p.quarantined_until == now[0] + 100
+
+
+def test_all_quarantined_uses_the_one_released_soonest(now):
+    pool = make(2)
+    a, b = pool.proxies
+    for _ in range(2): pool.record(a, "error")
+    now[0] += 10
+    for _ in range(2): pool.record(b, "error")
+    logs = []
+    assert pool.acquire(logs.append) is a
+    assert a.quarantined_until == 0 and logs
+
+
+def test_save_merges_stats_written_by_another_process(tmp_path):
+    path = tmp_path / "proxy_stats.json"
+    mine = make(1, path)
+    # 다른 샤드는 다른 프록시를 쓰고 먼저 저장
+    other = proxy_pool.ProxyPool([{"server": "http://10.9.9.9:8080", "user": "u", "pass": "x"}], SETTINGS, path)
+    other.record(other.proxies[0], "ok", 100)
+    other.save()
+    mine.record(mine.proxies[0], "denied")
+    mine.save()
+    saved = json.loads(path.read_text(encoding="utf-8"))
+    assert set(saved) == {"http://10.0.0.0:8080", "u@http://10.9.9.9:8080"}
+    assert saved["u@http://10.9.9.9:8080"]["ok"] == 1 and saved["http://10.0.0.0:8080"]["denied"] == 1
+    # 다음 실행은 저장된 통계에서 이어서 시작
+    again = make(1, path)
+    assert again.proxies[0].denied == 1 and again.proxies[0].consecutive_failures == 1
+
+
+def test_record_uses_the_current_task_lease():
+    pool = make(1)
+    proxy_pool.use(pool.proxies[0], pool)
+    try:
+        proxy_pool.record("ok", 250)
+    finally:
+        proxy_pool.use(None, None)
+    proxy_pool.record("error")
+    assert (pool.proxies[0].ok, pool.proxies[0].errors, pool.proxies[0].median_ms) == (1, 0, 250)
+
+
+def test_concurrent_runs_sum_counters_for_a_shared_proxy(tmp_path):
+    path = tmp_path / "proxy_stats.json"
+    seed = make(1, path)
+    seed.record(seed.proxies[0], "ok", 100)
+    seed.save()
+    # 두 실행이 같은 통계에서 시작해 같은 프록시를 쓰고 차례로 저장
+    a, b = make(1, path), make(1, path)
+    for _ in range(2): a.record(a.proxies[0], "ok", 200)
+    b.record(b.proxies[0], "denied")
+    b.record(b.proxies[0], "ok", 300)
+    a.save()
+    b.save()
+    saved = json.loads(path.read_text(encoding="utf-8"))["http://10.0.0.0:8080"]
+    assert (saved["ok"], saved["denied"]) == (4, 1)
+    assert sorted(saved["latencies_ms"]) == [100, 200, 200, 300]
+    # 저장 후 다시 저장해도 같은 증가분을 두 번 더하지 않음
+    b.save()
+    assert json.loads(path.read_text(encoding="utf-8"))["http://10.0.0.0:8080"]["ok"] == 4
+    assert not list(tmp_path.glob("*.tmp")) and not list(tmp_path.glob("*.lock"))
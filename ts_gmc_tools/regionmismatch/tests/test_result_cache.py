@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from result_cache import ResultCache
+
+URL = "https://www.lg.com/uk/oled-tvs/OLED65C4/"
+SCHEMA = {"offers": {"price": "999.00"}}
+
+
+@pytest.fixture
+def root(tmp_path):
+    return tmp_path / "results"
+
+
+def saved(cache: ResultCache):
+    return json.loads(cache.index_path.read_text(encoding="utf-8"))
+
+
+def test_put_keeps_entries_written_by_another_process(root):
+    mine, other = ResultCache(root), ResultCache(root)
+    mine.put(URL, "region_id", "r01", SCHEMA, {})
+    # other 는 mine 의 항목을 모르는 상태로 자기 항목을 기록
+    other.put(URL, "region_id", "r02", SCHEMA, {})
+    assert {e["region"] for e in saved(other).values()} == {"r01", "r02"}
+    assert ResultCache(root).get(URL, "region_id", "r01", need_image=False)["region"] == "r01"
+
+
+def test_removed_entries_are_not_resurrected_by_merge(root):
+    mine = ResultCache(root)
+    mine.put(URL, "region_id", "r01", SCHEMA, {})
+    other = ResultCache(root)
+    # 파일이 사라진 항목은 get 에서 삭제 -> 다른 프로세스가 본 예전 index 로 되살아나지 않음
+    key = next(iter(mine.index))
+    (root / key / "schema.json").unlink()
+    assert mine.get(URL, "region_id", "r01", need_image=False) is None
+    mine.flush()
+    other.put(URL, "region_id", "r02", SCHEMA, {})
+    assert key not in saved(other)
+
+
+def test_get_updates_last_access_in_memory_until_flush(root):
+    cache = ResultCache(root)
+    cache.put(URL, "region_id", "r01", SCHEMA, {})
+    key = next(iter(cache.index))
+    before = saved(cache)[key]["last_access"]
+    cache.index[key]["last_access"] = before - 100
+    entry = cache.get(URL, "region_id", "r01", need_image=False)
+    assert entry["key"] == key and not entry["stale"]
+    # 조회만으로는 index.json 을 다시 쓰지 않음
+    assert saved(cache)[key]["last_access"] == before
+    cache.flush()
+    assert saved(cache)[key]["last_access"] == cache.index[key]["last_access"] >= before
+
+
+def test_stale_entries_are_only_returned_for_revalidation(root):
+    cache = ResultCache(root, ttl_sec=60)
+    cache.put(URL, "region_id", "r01", SCHEMA, {})
+    cache.index[next(iter(cache.index))]["created"] -= 120
+    assert cache.get(URL, "region_id", "r01", need_image=False) is None
+    assert cache.get(URL, "region_id", "r01", need_image=False, allow_stale=True)["stale"]
@@ -0,0 +1,40 @@
+import pytest
+
+import results_store
+
+
+@pytest.mark.parametrize("text, market, expected", [
+    ("£1,299.00", "uk", 1299.0),
+    ("1.299,00 €", "de", 1299.0),
+    ("1,299", "uk", 1299.0),
+    ("1.299", "de", 1299.0),
+    ("12,5", "fr", 12.5),
+    ("1299.", "uk", 1299.0),
+    ("KWD 12.345", "kw", 12.345),
+    ("1,234.500", "bh", 1234.5),
+    ("12.345", "ae", 12345.0),
+    (1299, "uk", 1299.0),
+    ("", "uk", None),
+    (None, "uk", None),
+    ("Call for price", "uk", None),
+])
+def test_price_value(text, market, expected):
+    assert results_store.price_value(text, market) == expected
+
+
+def test_make_row_uses_three_decimal_prices():
+    run = {"run_ts": "20240101_000000", "product_id": "P1", "market": "kw"}
+    schema = {"offers": {"price": "12.345", "priceCurrency": "KWD"}}
+    assert results_store.make_row(run, "r1", "u", schema, {"visual_price": "KWD 12.345"}, {})["mismatch"] == 0
+    assert results_store.make_row(run, "r1", "u", schema, {"visual_price": "KWD 12.400"}, {})["mismatch"] == 1
+
+
+def test_region_schemas_reads_only_requested_regions(tmp_path):
+    store = results_store.ResultsStore(tmp_path / results_store.DB_NAME)
+    run = {"run_ts": "20240101_000000", "product_id": "P1", "market": "uk"}
+    rows = [results_store.make_row(run, rid, "u", {"offers": {"price": str(k)}}, {}, {}) for k, rid in enumerate(["", "r1", "r2"])]
+    store.record_run({"run_ts": run["run_ts"], "product_id": "P1", "url": "u", "market": "uk", "param": "region_id", "out_dir": "",
+                      "report_path": "", "started_at": 0, "finished_at": 0}, rows)
+    got = store.region_schemas(run["run_ts"], ["", "r2", "missing"])
+    assert got == {"": {"offers": {"price": "0"}}, "r2": {"offers": {"price": "2"}}}
+    assert store.region_schemas(run["run_ts"], []) == {}
@@ -0,0 +1,48 @@
+import os
+import time
+
+import scheduler
+
+MB = 1024 * 1024
+
+
+def make_run(outs, name: str, mb: int):
+    d = outs / name
+    d.mkdir(parents=True)
+    (d / "data.bin").write_bytes(b"0" * (mb * MB))
+    return d
+
+
+def test_touched_old_run_survives_size_eviction(tmp_path):
+    # 오래된 순: 01 -> 02 -> 03. 01 을 최근에 봤으므로 용량 초과 시 02 가 먼저 삭제
+    old = time.time() - 86400
+    names = [f"out_{time.strftime('%Y%m%d_%H%M%S', time.localtime(old + k * 60))}_000000" for k in range(3)]
+    for n in names: make_run(tmp_path, n, 1)
+    svc = scheduler.RetentionService(tmp_path, dict(scheduler.DEFAULTS, max_total_mb=10, keep_latest=0, settle_sec=0))
+    svc.run_once()
+    assert sorted(svc.index) == names
+
+    svc.touch(tmp_path / names[0])
+    svc.cfg["max_total_mb"] = 2.5
+    report = svc.run_once()
+    assert report["deleted"] == 1
+    assert sorted(p.name for p in tmp_path.glob("out_*")) == [names[0], names[2]]
+
+
+def test_touch_indexes_new_folder_and_persists(tmp_path):
+    d = make_run(tmp_path, f"out_{time.strftime('%Y%m%d_%H%M%S', time.localtime(time.time() - 3600))}_000000", 0)
+    svc = scheduler.RetentionService(tmp_path, dict(scheduler.DEFAULTS))
+    svc.touch(d)
+    assert svc.index[d.name]["last_access"] > svc.index[d.name]["created"]
+    assert scheduler.RetentionService(tmp_path, dict(scheduler.DEFAULTS)).index[d.name]["last_access"] == svc.index[d.name]["last_access"]
+    # 아직 정리 주기 전이던 폴더도 run_once 에서 last_access 를 유지
+    touched = svc.index[d.name]["last_access"]
+    svc.run_once()
+    assert svc.index[d.name]["last_access"] == touched
+
+
+def test_touch_ignores_missing_folder(tmp_path):
+    svc = scheduler.RetentionService(tmp_path, dict(scheduler.DEFAULTS))
+    svc.touch(tmp_path / "out_20260101_000000_000000")
+    assert svc.index == {}
+    assert not os.path.exists(svc.index_path)
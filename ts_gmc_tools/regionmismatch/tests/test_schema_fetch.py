@@ -0,0 +1,111 @@
+import gzip
+import http.server
+import threading
+
+import pytest
+
+import fixture_server
+import local_proxy
+import proxy_pool
+import schema_fetch
+
+UA = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/124.0.0.0 Safari/537.36"}
+
+
+@pytest.fixture
+def server():
+    # JSON-LD 를 HTML 에 바로 넣는 설정 (jsonld_delay_ms=0), r09 는 403 Access Denied
+    srv = fixture_server.start(0, jsonld_delay_ms=0, block_regions=["r09"])
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+
+
+@pytest.fixture
+def client():
+    c = schema_fetch.HttpClient(UA, timeout=5)
+    yield c
+    c.close()
+
+
+def test_fetch_schema_reads_inline_jsonld(server, client):
+    res = schema_fetch.fetch_schema(client, f"{server}/uk/oled-tvs/BENCH-SKU?region_id=r01")
+    assert res["status"] == 200 and not res["blocked"] and not res["fallback"]
+    assert res["schema"]["sku"] == "BENCH-SKU"
+    assert res["schema"]["offers"]["price"] == f"{fixture_server.region_price('BENCH-SKU', 'r01'):.2f}"
+
+
+def test_fetch_schema_keeps_connection_alive(server, client):
+    for rid in ("r01", "r02", "r03"):
+        assert not schema_fetch.fetch_schema(client, f"{server}/uk/oled-tvs/BENCH-SKU?region_id={rid}")["fallback"]
+    # 같은 스레드/호스트는 연결 하나를 재사용
+    assert len(client._local.conns) == 1
+
+
+def test_blocked_region_falls_back_to_browser(server, client):
+    res = schema_fetch.fetch_schema(client, f"{server}/uk/oled-tvs/BENCH-SKU?region_id=r09")
+    assert res["status"] == 403 and res["blocked"] and res["fallback"] and res["schema"] is None
+
+
+def test_missing_jsonld_falls_back_to_browser(client):
+    # 기본 설정은 JSON-LD 를 JS 로 늦게 주입 -> 원본 HTML 에는 없음
+    srv = fixture_server.start(0)
+    try:
+        res = schema_fetch.fetch_schema(client, f"http://127.0.0.1:{srv.server_address[1]}/uk/oled-tvs/BENCH-SKU")
+    finally:
+        srv.shutdown()
+    assert res["status"] == 200 and not res["blocked"] and res["fallback"] and res["schema"] is None
+
+
+def test_fetch_schema_reports_bytes_received_before_decompression(client):
+    html = "<html>" + "<p>LG OLED</p>" * 500 + "</html>"
+    body = gzip.compress(html.encode("utf-8"))
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/old":
+                self.send_response(301); self.send_header("Location", "/new"); self.send_header("Content-Length", "0"); self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *a): pass
+
+    srv = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        res = schema_fetch.fetch_schema(client, f"http://127.0.0.1:{srv.server_address[1]}/old")
+    finally:
+        srv.shutdown()
+    assert res["final_url"].endswith("/new") and res["fallback"]
+    assert res["bytes"] == len(body) < len(html)
+
+
+def test_connection_error_falls_back(client):
+    res = schema_fetch.fetch_schema(client, "http://127.0.0.1:9/uk/p")
+    assert res["fallback"] and res["status"] == 0 and res["error"]
+
+
+def test_proxy_clients_send_each_fetch_through_the_leased_proxy(server):
+    proxies = [local_proxy.start(0), local_proxy.start(0, block_after=1)]
+    pool = proxy_pool.ProxyPool([{"server": f"http://127.0.0.1:{p.server_address[1]}"} for p in proxies])
+    clients = schema_fetch.ProxyClients(UA, timeout=5)
+    try:
+        for proxy in pool.proxies:
+            assert clients.for_proxy(proxy) is clients.for_proxy(proxy)
+            assert not schema_fetch.fetch_schema(clients.for_proxy(proxy), f"{server}/uk/oled-tvs/BENCH-SKU?region_id=r01")["fallback"]
+        # 두 번째 프록시의 출구가 차단되면 그 프록시 경로만 차단으로 보임
+        assert schema_fetch.fetch_schema(clients.for_proxy(pool.proxies[1]), f"{server}/uk/oled-tvs/BENCH-SKU?region_id=r02")["blocked"]
+    finally:
+        clients.close()
+        for p in proxies: p.shutdown()
+    assert [p.state.stats["requests"] for p in proxies] == [1, 2]
+
+
+def test_pick_product_offer_skips_non_product_blocks():
+    blocks = ['{"@type": "BreadcrumbList"}', "not json", '{"@type": ["Product"], "offers": {"price": "1"}}']
+    assert schema_fetch.pick_product_offer(blocks)["offers"]["price"] == "1"
+    assert schema_fetch.extract_jsonld_blocks('<script type="application/ld+json">{"a": 1}</script>') == ['{"a": 1}']
@@ -0,0 +1,143 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import throttle
+
+
+class Clock:
+    """throttle 모듈에만 주입하는 가짜 monotonic / sleep (실제로 기다리지 않음)"""
+    def __init__(self): self.now, self.slept = 1000.0, []
+    def monotonic(self): return self.now
+    async def sleep(self, sec):
+        self.slept.append(round(sec, 3))
+        self.now += sec
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(throttle, "time", SimpleNamespace(monotonic=c.monotonic))
+    monkeypatch.setattr(throttle, "asyncio", SimpleNamespace(sleep=c.sleep, Lock=asyncio.Lock))
+    return c
+
+
+def make(**settings):
+    return throttle.HostThrottle("www.lg.com", dict({"breaker_threshold": 3, "breaker_cooldown_sec": 10}, **settings))
+
+
+def test_acquire_spends_burst_then_waits_for_tokens(clock):
+    t = make(rate_per_sec=2, burst=2)
+    async def run():
+        for _ in range(4): await t.acquire()
+    asyncio.run(run())
+    # 버스트 2개는 바로, 그 뒤로는 1 / rate 초마다 하나
+    assert clock.slept == [0.5, 0.5]
+
+
+def test_tokens_refill_with_time_up_to_burst(clock):
+    t = make(rate_per_sec=1, burst=3)
+    async def run():
+        for _ in range(3): await t.acquire()
+        clock.now += 100
+        for _ in range(3): await t.acquire()
+    asyncio.run(run())
+    assert clock.slept == []
+    assert t.state()["tokens"] == 0
+
+
+def test_backoff_is_exponential_with_jitter_and_capped(monkeypatch):
+    t = make(backoff_base_sec=2, backoff_max_sec=60)
+    for jitter in (0.5, 1.5):
+        monkeypatch.setattr(throttle.random, "uniform", lambda a, b, j=jitter: j)
+        assert [t.backoff(n) for n in (1, 2, 3, 6, 10)] == [2 * jitter, 4 * jitter, 8 * jitter, 60 * jitter, 60 * jitter]
+
+
+def test_breaker_trips_after_threshold_and_half_opens(clock):
+    t = make()
+    t.record_failure("timeout")
+    t.record_failure("denied")
+    assert not t.is_open
+    t.record_failure("timeout")
+    assert t.is_open and t.open_until == clock.now + 10
+
+    # cooldown 이후 half-open: 첫 실패 한 번으로 바로 다시 열림
+    clock.now += 10
+    assert not t.is_open
+    t.record_failure("timeout")
+    assert t.is_open and t.open_until == clock.now + 10
+
+    # 성공하면 연속 실패 수가 초기화되어 다시 threshold 만큼 버팀
+    clock.now += 10
+    t.record_success()
+    t.record_failure("timeout")
+    t.record_failure("timeout")
+    assert not t.is_open
+
+
+def test_failures_while_open_do_not_extend_cooldown(clock):
+    t = make()
+    for _ in range(3): t.record_failure("timeout")
+    until = t.open_until
+    clock.now += 5
+    t.record_failure("timeout")
+    assert t.open_until == until
+
+
+def test_open_circuit_pauses_or_skips(clock):
+    paused = make(rate_per_sec=1, burst=1)
+    for _ in range(3): paused.record_failure("timeout")
+    asyncio.run(paused.acquire())
+    assert clock.slept == [10] and not paused.is_open
+
+    skipped = make(on_open="skip")
+    for _ in range(3): skipped.record_failure("timeout")
+    with pytest.raises(throttle.CircuitOpenError):
+        asyncio.run(skipped.acquire())
+
+
+def test_for_url_shares_one_throttle_per_host(monkeypatch):
+    monkeypatch.setattr(throttle, "_hosts", {})
+    cfg = {"default": {"rate_per_sec": 1}, "hosts": {"www.lg.com": {"burst": 7}}}
+    a = throttle.for_url("https://www.lg.com/uk/a", cfg)
+    assert a is throttle.for_url("https://WWW.LG.COM/de/b?region_id=x", cfg)
+    assert (a.rate, a.burst) == (1, 7)
+    assert throttle.for_url("https://other.example/", cfg).burst == throttle.DEFAULT_BURST
+
+
+def test_for_url_applies_a_later_config_to_the_same_host(monkeypatch):
+    # 오래 사는 worker: 다음 job 의 --throttle_config / --throttle_share 가 바로 반영되어야 함
+    monkeypatch.setattr(throttle, "_hosts", {})
+    a = throttle.for_url("https://www.lg.com/uk/a", {"hosts": {"www.lg.com": {"rate_per_sec": 1, "burst": 4}}})
+    a.consecutive_failures, a.open_until = 2, 99.0
+    b = throttle.for_url("https://www.lg.com/uk/a", {"hosts": {"www.lg.com": {"rate_per_sec": 0.25, "burst": 1, "max_retries": 1}}})
+    assert b is a
+    assert (b.rate, b.burst, b.max_retries, b.tokens) == (0.25, 1, 1, 1)
+    # 서킷 상태는 호스트 단위로 유지
+    assert (b.consecutive_failures, b.open_until) == (2, 99.0)
+
+
+def test_load_config_splits_host_budget_across_shards(tmp_path):
+    (tmp_path / throttle.CONFIG_FILE).write_text(json.dumps({
+        "default": {"max_retries": 3},
+        "hosts": {"www.lg.com": {"rate_per_sec": 1.0, "burst": 4}, "slow.example": {"max_retries": 1}},
+    }), encoding="utf-8")
+    cfg = throttle.load_config(tmp_path, share=4)
+    assert cfg["hosts"]["www.lg.com"] == {"rate_per_sec": 0.25, "burst": 1.0}
+    # 호스트 설정에 없는 값은 나눈 default 를 상속
+    assert cfg["default"]["rate_per_sec"] == throttle.DEFAULT_RATE / 4
+    assert cfg["default"]["burst"] == 1.0
+    assert "rate_per_sec" not in cfg["hosts"]["slow.example"]
+
+
+def test_load_config_without_share_is_unchanged(tmp_path):
+    assert throttle.load_config(tmp_path) == {"default": {}, "hosts": {}}
+    assert throttle.load_config(tmp_path, share=2)["default"] == {"rate_per_sec": throttle.DEFAULT_RATE / 2, "burst": 1.5}
+
+
+def test_load_config_reads_alternate_file(tmp_path):
+    (tmp_path / "bench.json").write_text(json.dumps({"hosts": {"127.0.0.1": {"rate_per_sec": 1000}}}), encoding="utf-8")
+    cfg = throttle.load_config(tmp_path, config_file="bench.json")
+    assert cfg == {"default": {}, "hosts": {"127.0.0.1": {"rate_per_sec": 1000}}}
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import random
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+# 호스트별 요청 조절: 토큰 버킷 + 지수 백오프(jitter) + 서킷 브레이커
+# 같은 프로세스 안의 모든 리전/제품/worker job 이 호스트 단위로 상태를 공유함
+# coordinator 샤드는 별도 프로세스이므로 --throttle_share (샤드 수) 로 호스트 예산(rate/burst)을 나눠 가짐
+CONFIG_FILE = "throttle_config.json"
+DEFAULT_RATE = 0.5
+DEFAULT_BURST = 3
+
+_hosts: Dict[str, "HostThrottle"] = {}
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+def load_config(script_dir: Path, share: int = 1, config_file: str = CONFIG_FILE) -> Dict:
+    # config_file: 상대 경로면 script_dir 기준 (bench 는 로컬 fixture 서버용 설정을 따로 넘김)
+    path = script_dir / (config_file or CONFIG_FILE)
+    cfg = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+    cfg.setdefault("default", {})
+    cfg.setdefault("hosts", {})
+    if share > 1:
+        # 샤드 n 개가 합쳐서 설정값을 넘지 않도록 1/n 씩 (호스트에 없는 값은 default 에서 상속되므로 default 는 기본값까지 채워서 나눔)
+        cfg["default"].setdefault("rate_per_sec", DEFAULT_RATE)
+        cfg["default"].setdefault("burst", DEFAULT_BURST)
+        for settings in [cfg["default"], *cfg["hosts"].values()]:
+            if "rate_per_sec" in settings: settings["rate_per_sec"] = float(settings["rate_per_sec"]) / share
+            if "burst" in settings: settings["burst"] = max(1.0, float(settings["burst"]) / share)
+    return cfg
+
+
+def for_url(url: str, cfg: Dict) -> "HostThrottle":
+    host = (urlparse(url).hostname or "").lower()
+    settings = dict(cfg.get("default", {}))
+    settings.update(cfg.get("hosts", {}).get(host, {}))
+    if host not in _hosts:
+        _hosts[host] = HostThrottle(host, settings)
+    elif _hosts[host].settings != settings:
+        # [수정] 오래 사는 worker: job 마다 다른 --throttle_config / --throttle_share / 설정 파일 수정을 반영
+        # 토큰 / 서킷 상태는 호스트 단위로 그대로 유지
+        _hosts[host].configure(settings)
+    return _hosts[host]
+
+
+class HostThrottle:
+    def __init__(self, host: str, settings: Dict):
+        self.host = host
+        self.tokens = None
+        self.configure(settings)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    def configure(self, settings: Dict):
+        self.settings = dict(settings)
+        self.rate = float(settings.get("rate_per_sec", DEFAULT_RATE))
+        self.burst = float(settings.get("burst", DEFAULT_BURST))
+        self.max_retries = int(settings.get("max_retries", 3))
+        self.backoff_base = float(settings.get("backoff_base_sec", 2))
+        self.backoff_max = float(settings.get("backoff_max_sec", 60))
+        self.goto_timeout_ms = int(settings.get("goto_timeout_ms", 45000))
+        self.threshold = int(settings.get("breaker_threshold", 4))
+        self.cooldown = float(settings.get("breaker_cooldown_sec", 120))
+        self.on_open = settings.get("on_open", "pause")  # pause | skip
+        # burst 가 줄었으면 이미 쌓인 토큰도 새 burst 까지만
+        if self.tokens is not None: self.tokens = min(self.tokens, self.burst)
+
+    @property
+    def is_open(self) -> bool:
+        return time.monotonic() < self.open_until
+
+    async def acquire(self, log: Optional[Callable[[str], None]] = None, log_prefix: str = ""):
+        # 서킷이 열려 있으면 cooldown 만큼 멈추거나(pause) 바로 포기(skip)
+        while self.is_open:
+            if self.on_open == "skip":
+                raise CircuitOpenError(f"circuit open for {self.host}")
+            wait = self.open_until - time.monotonic()
+            if log: log(f"[PROGRESS] {log_prefix} ⛔ Circuit open for {self.host}, pausing {wait:.0f}s")
+            await asyncio.sleep(wait)
+        async with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self.tokens = 1
+                self.updated = time.monotonic()
+            self.tokens -= 1
+
+    def backoff(self, attempt: int) -> float:
+        return min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))) * random.uniform(0.5, 1.5)
+
+    def record_success(self):
+        self.consecutive_failures = 0
+
+    def record_failure(self, kind: str, log: Optional[Callable[[str], None]] = None):
+        # kind: denied | timeout | error
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.threshold and not self.is_open:
+            self.open_until = time.monotonic() + self.cooldown
+            # half-open: cooldown 이후 첫 요청이 다시 실패하면 바로 재차단
+            self.consecutive_failures = self.threshold - 1
+            if log: log(f"[PROGRESS] ⛔ Circuit tripped for {self.host} after repeated {kind}, cooling down {self.cooldown:.0f}s")
+
+    def state(self) -> Dict:
+        return {"host": self.host, "open": self.is_open, "consecutive_failures": self.consecutive_failures,
+                "tokens": round(self.tokens, 2)}
@@ -0,0 +1,312 @@
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from playwright.async_api import async_playwright
+
+import events
+import job_queue
+import metrics
+import region_mismatch as rm
+
+# 상주 브라우저 워커: app.py 가 매번 새 파이썬/Chromium 을 띄우는 대신 여기로 job 을 보냄
+# [수정] 모든 세션의 job 은 하나의 우선순위 큐로 (동시 실행 --max_jobs, 대기 --max_queue), 같은 감사는 합류 (job_queue.py)
+# 실행: python worker.py --browsers 2
+HERE = Path(__file__).resolve().parent
+DEFAULT_PORT = 8765
+HEALTH_INTERVAL = 30  # 초
+QUEUE_ANNOUNCE_SEC = 5
+# 브라우저 실행 시점에 정해지는 인자: job 이 다른 값을 주면 거부 (브라우저와 HttpClient 가 다른 경로로 나가지 않도록)
+BROWSER_ARGS = ("proxy_server", "proxy_user", "proxy_pass")
+
+
+def _explicit(argv: List[str], *flags: str) -> bool:
+    return any(a == f or a.startswith(f + "=") for a in argv for f in flags)
+
+
+class BrowserSlot:
+    def __init__(self, idx: int):
+        self.idx = idx
+        self.browser = None
+        self.pages_served = 0
+        self.launched_at = 0.0
+        self.restarts = 0
+        self.busy = False
+
+    def info(self) -> Dict:
+        return {
+            "slot": self.idx,
+            "connected": bool(self.browser and self.browser.is_connected()),
+            "busy": self.busy,
+            "pages_served": self.pages_served,
+            "uptime_sec": round(time.time() - self.launched_at, 1) if self.launched_at else 0,
+            "restarts": self.restarts,
+        }
+
+
+class BrowserPool:
+    """미리 띄워 둔 Chromium 들을 job 단위로 빌려주고, N 페이지 / 메모리 초과 시 재시작"""
+
+    def __init__(self, args):
+        self.args = args
+        self.slots = [BrowserSlot(i) for i in range(max(1, args.browsers))]
+        self.idle: Optional[asyncio.Queue] = None
+        self.playwright = None
+
+    async def start(self):
+        self.playwright = await async_playwright().start()
+        self.idle = asyncio.Queue()
+        for slot in self.slots:
+            await self._launch(slot)
+            self.idle.put_nowait(slot)
+
+    async def _launch(self, slot: BrowserSlot):
+        slot.browser = await rm.launch_browser(self.playwright, self.args)
+        # 워밍업: 렌더러 프로세스와 stealth 스크립트를 한 번 로드해 둠
+        context = await slot.browser.new_context()
+        page = await context.new_page()
+        await rm.Stealth().apply_stealth_async(page)
+        await page.goto("about:blank")
+        await context.close()
+        slot.pages_served = 0
+        slot.launched_at = time.time()
+
+    async def _recycle(self, slot: BrowserSlot, reason: str):
+        print(f"[WORKER] slot {slot.idx} 재시작: {reason}", flush=True)
+        try:
+            if slot.browser and slot.browser.is_connected(): await slot.browser.close()
+        except Exception: pass
+        slot.restarts += 1
+        await self._launch(slot)
+
+    async def browser_rss_mb(self, slot: BrowserSlot) -> Optional[float]:
+        return await metrics.browser_rss_mb(slot.browser)
+
+    async def acquire(self) -> BrowserSlot:
+        slot = await self.idle.get()
+        if not slot.browser or not slot.browser.is_connected():
+            await self._recycle(slot, "disconnected")
+        slot.busy = True
+        return slot
+
+    async def release(self, slot: BrowserSlot, pages: int):
+        slot.pages_served += pages
+        slot.busy = False
+        try:
+            if slot.pages_served >= self.args.max_pages:
+                await self._recycle(slot, f"{slot.pages_served} pages")
+            else:
+                rss = await self.browser_rss_mb(slot)
+                if rss is not None and rss > self.args.max_rss_mb:
+                    await self._recycle(slot, f"rss {rss:.0f}MB")
+        finally:
+            self.idle.put_nowait(slot)
+
+    async def health_loop(self):
+        while True:
+            await asyncio.sleep(HEALTH_INTERVAL)
+            for slot in self.slots:
+                if slot.busy: continue
+                if not slot.browser or not slot.browser.is_connected():
+                    try: await self._recycle(slot, "health check failed")
+                    except Exception as e: print(f"[WORKER] slot {slot.idx} relaunch failed: {e}", flush=True)
+
+
+class WorkerService:
+    def __init__(self, args):
+        self.args = args
+        self.pool = BrowserPool(args)
+        self.loop = asyncio.new_event_loop()
+        self.queue = job_queue.JobQueue(args.max_jobs or len(self.pool.slots), args.max_queue, self._start, self._cancel,
+                                        job_queue.seed_sec_per_region(HERE / "outs"))
+
+    def start(self):
+        ready = threading.Event()
+
+        def run_loop():
+            asyncio.set_event_loop(self.loop)
+            self.loop.run_until_complete(self.pool.start())
+            self.loop.create_task(self.pool.health_loop())
+            ready.set()
+            self.loop.run_forever()
+
+        threading.Thread(target=run_loop, daemon=True).start()
+        ready.wait()
+
+        def announce_loop():
+            # 실행 중 job 이 진행되면서 예상 대기 시간이 바뀌므로 주기적으로 다시 알림
+            while True:
+                time.sleep(QUEUE_ANNOUNCE_SEC)
+                self.queue.announce()
+
+        threading.Thread(target=announce_loop, daemon=True).start()
+
+    def _start(self, job: job_queue.QueuedJob):
+        job.future = asyncio.run_coroutine_threadsafe(self._run(job), self.loop)
+
+    def _cancel(self, job: job_queue.QueuedJob):
+        if job.future: job.future.cancel()
+
+    async def _run(self, job: job_queue.QueuedJob):
+        # region_mismatch 의 emit() 출력과 구조화 이벤트를 이 job 의 모든 구독자에게 보냄 (task 단위 contextvar)
+        rm._output_sink.set(job.line)
+        events.use_sink(job.event)
+        ap = rm.build_arg_parser()
+        slot = None
+        pages = 0
+        returncode = 1
+        try:
+            args = self.job_args(ap.parse_args(job.argv))
+            jobs = rm.build_jobs(args)
+            slot = await self.pool.acquire()
+            browser = slot.browser
+
+            async def get_browser():
+                return browser
+
+            entries = await rm.run_jobs(get_browser, args, jobs, HERE)
+            pages = sum(len(e.get("regions", [])) for e in entries)
+            if args.batch: rm.write_manifest(args, entries, HERE)
+            returncode = 0
+        except asyncio.CancelledError:
+            job.line("[PROGRESS] ⛔ Job cancelled")
+            returncode = -15
+        except BaseException as e:
+            job.line(f"[PROGRESS] ❌ Job failed: {e}")
+            returncode = 1
+        finally:
+            # 결과 스트림을 먼저 닫고 다음 job 을 시작한 뒤 재시작 여부 판단 (사용자 대기 시간에 포함되지 않게)
+            self.queue.finished(job, returncode)
+            if slot: await self.pool.release(slot, pages)
+
+    def job_args(self, args):
+        # 프록시는 워커 값으로 통일 (submit 에서 다른 값은 이미 거부) -> schema-only / revalidate 의 HttpClient 도 같은 프록시 사용
+        for k in BROWSER_ARGS: setattr(args, k, getattr(self.args, k))
+        args.headless, args.headed = self.args.headless, False
+        return args
+
+    def check_browser_args(self, argv: List[str], args):
+        """job 의 프록시/헤드리스 인자가 워커 브라우저와 다르면 ValueError (HTTP 400 -> app 은 subprocess 로 실행)"""
+        conflicts = []
+        if args.proxy_server and tuple(getattr(args, k) for k in BROWSER_ARGS) != tuple(getattr(self.args, k) for k in BROWSER_ARGS):
+            conflicts.append(f"proxy_server={args.proxy_server} (worker: {self.args.proxy_server or 'none'})")
+        if args.proxy_pool and not self.args.proxy_pool:
+            conflicts.append("proxy_pool (worker started without --proxy_pool)")
+        if _explicit(argv, "--headless", "--headed") and rm.headless_mode(args) != rm.headless_mode(self.args):
+            conflicts.append(f"headless={rm.headless_mode(args)} (worker: {rm.headless_mode(self.args)})")
+        if conflicts: raise ValueError(f"job browser args differ from this worker: {', '.join(conflicts)}")
+
+    def submit(self, argv: List[str], priority: str = "normal") -> Tuple[job_queue.QueuedJob, job_queue.Subscriber, bool]:
+        """반환: (job, 구독자, 합류 여부). 인자 오류는 ValueError, 대기열이 가득 차면 job_queue.QueueFull"""
+        try: args = rm.build_arg_parser().parse_args(argv)
+        except SystemExit: raise ValueError(f"invalid argv: {argv}")
+        self.check_browser_args(argv, args)
+        jobs = rm.build_jobs(args)
+        regions = 0
+        for j in jobs:
+            try: regions += len(rm.target_regions_for(j, HERE, args.exact_regions)[0])
+            except Exception: regions += 1
+        # 구조화 이벤트는 구독자별 소켓으로 (job 실행에는 --events_addr 를 쓰지 않음)
+        sub = job_queue.Subscriber(args.events_addr, job_queue.PRIORITIES.get(priority, job_queue.PRIORITIES["normal"]))
+        job, coalesced = self.queue.submit(job_queue.job_key(args, jobs), argv, regions, sub)
+        return job, sub, coalesced
+
+    def cancel(self, job_id: str, sub_id: Optional[str] = None) -> bool:
+        return self.queue.leave(job_id, sub_id)
+
+    def health(self) -> Dict:
+        q = self.queue.snapshot()
+        return {"ok": True, "slots": [s.info() for s in self.pool.slots], "jobs": [j["id"] for j in q["running"] + q["queued"]], "queue": q}
+
+
+def make_handler(service: WorkerService):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *a): pass
+
+        def _json(self, code: int, payload: Dict):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health": return self._json(200, service.health())
+            if self.path == "/queue": return self._json(200, service.queue.snapshot())
+            self._json(404, {"error": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try: payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError: return self._json(400, {"error": "invalid json"})
+
+            if self.path.startswith("/jobs/") and self.path.endswith("/cancel"):
+                # subscriber 가 있으면 그 구독자만 나감 (합류한 다른 세션의 job 은 계속), 없으면 job 취소
+                job_id = self.path.split("/")[2]
+                return self._json(200 if service.cancel(job_id, payload.get("subscriber")) else 404, {"id": job_id})
+            if self.path != "/jobs": return self._json(404, {"error": "not found"})
+
+            argv = payload.get("argv")
+            if not isinstance(argv, list): return self._json(400, {"error": "argv must be a list"})
+            try:
+                job, sub, coalesced = service.submit([str(a) for a in argv], str(payload.get("priority") or "normal"))
+            except job_queue.QueueFull as e:
+                return self._json(429, {"error": "queue full", "detail": str(e)})
+            except (ValueError, OSError) as e:
+                return self._json(400, {"error": str(e)})
+            # region_mismatch.py stdout 과 같은 줄 단위 프로토콜로 스트리밍 (연결 종료 = 스트림 끝)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            try:
+                self.wfile.write(f"[JOB] {json.dumps({'id': job.id, 'subscriber': sub.id, 'coalesced': coalesced})}\n".encode("utf-8"))
+                if coalesced: self.wfile.write(f"[PROGRESS] 🔗 Joined identical audit already in progress (job {job.id})\n".encode("utf-8"))
+                self.wfile.flush()
+                while True:
+                    line = sub.lines.get()
+                    if line is None: break
+                    self.wfile.write((line + "\n").encode("utf-8"))
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # 클라이언트가 끊으면 구독 해제 (마지막 구독자면 job 도 중단)
+                service.cancel(job.id, sub.id)
+
+    return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--browsers", type=int, default=2, help="미리 띄워 둘 Chromium 수")
+    ap.add_argument("--max_pages", type=int, default=200, help="이 페이지 수 이후 브라우저 재시작")
+    ap.add_argument("--max_rss_mb", type=float, default=2048, help="브라우저 메모리 상한 (psutil 필요)")
+    ap.add_argument("--headless", default="off", choices=rm.HEADLESS_MODES, help="디스플레이 없는 서버에서는 new 권장")
+    ap.add_argument("--max_jobs", type=int, default=0, help="동시에 실행할 job 수 (0: --browsers 와 같음)")
+    ap.add_argument("--max_queue", type=int, default=50, help="대기 job 상한 (초과 시 429)")
+    ap.add_argument("--proxy_server", default="")
+    ap.add_argument("--proxy_user", default="")
+    ap.add_argument("--proxy_pass", default="")
+    ap.add_argument("--proxy_pool", default="", help="job 에서 --proxy_pool 을 쓸 때 지정 (브라우저를 context 별 프록시 모드로 띄움)")
+    args = ap.parse_args()
+
+    service = WorkerService(args)
+    print(f"[WORKER] Chromium {args.browsers}개 준비 중...", flush=True)
+    service.start()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"[WORKER] http://{args.host}:{args.port} 대기 중", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()